@@ -4,11 +4,11 @@
 Usage:
   defrag-ops.py print-bootstrap-address --mnemonics M_PATH (--testnet | --staging | --mainnet) [--magic NUM] [--raw] [-d]
   defrag-ops.py frag   --mnemonics M_PATH --wid W_ID --wpass W_PATH --wdb DB_PATH --outputs O_COUNT --total LOVELACE (--testnet | --staging | --mainnet) [--magic NUM]
-                     (--bootstrap | --random | --new) [--even] [--min UTXO] [--max INPUTS] [--repeat COUNT] [--timers] [--filter TARGET METHOD EXPR]
-                     [--socket S_PATH] [--ip IP] [--port PORT] [--tls] [--live] [--no-confirm] [--timeout SECS] [--dynamic] [-d]
+                     (--bootstrap | --random | --new | --local-new) [--even] [--prefill TXS] [--chain-depth DEPTH] [--min UTXO] [--max INPUTS] [--repeat COUNT] [--timers] [--filter TARGET METHOD EXPR]
+                     [--socket S_PATH] [--ip IP] [--port PORT] [--tls] [--live] [--no-confirm] [--timeout SECS] [--pool-size CONNS] [--dynamic] [--cli-check] [--pipeline-depth DEPTH] [--warmup MB] [--key-cache C_PATH] [--params-refresh SECS] [--chain BACKEND] [--slot-length SECS] [--track SECS] [-d]
   defrag-ops.py defrag --mnemonics M_PATH --wid W_ID --wpass W_PATH --wdb DB_PATH (--testnet | --staging | --mainnet) [--magic NUM]
-                     [--min UTXO] [--max INPUTS] [--repeat COUNT] [--timers] [--filter TARGET METHOD EXPR]
-                     [--socket S_PATH] [--ip IP] [--port PORT] [--tls] [--live] [--no-confirm] [--timeout SECS] [--dynamic] [-d]
+                     [--min UTXO] [--max INPUTS] [--repeat COUNT] [--batch TXS] [--timers] [--filter TARGET METHOD EXPR] [--where FILTER]
+                     [--socket S_PATH] [--ip IP] [--port PORT] [--tls] [--live] [--no-confirm] [--timeout SECS] [--pool-size CONNS] [--dynamic] [--cli-check] [--pipeline-depth DEPTH] [--warmup MB] [--key-cache C_PATH] [--params-refresh SECS] [--chain BACKEND] [--slot-length SECS] [--track SECS] [-d]
   defrag-ops.py (-h | --help)
   defrag-ops.py --version
 
@@ -52,6 +52,16 @@ Options:
                                the address list will be non-unique.
   --new                        Sets all tx_out addresses to newly created Byron legacy addresses for `frag` ops.
                                Note that even with dry run operation, new addresses will still be created.
+                               New addresses are created concurrently, up to `--pool-size` at a time.
+  --local-new                  Sets all tx_out addresses to new Byron legacy addresses derived locally from the
+                               mnemonics at random unused indices for `frag` ops, without the wallet API.  The
+                               wallet discovers these addresses once they receive funds.
+  --prefill TXS                Sets `frag --new` ops to keep up to TXS Txs worth of new addresses created ahead in
+                               the background, never more than the remaining `--repeat` Txs need.  A value of 0
+                               creates each Tx's addresses only when it is generated.  [default: 1]
+  --chain-depth DEPTH          Sets `frag` ops to re-spend each Tx's change in following Txs of the same run without
+                               waiting for confirmation, up to DEPTH unconfirmed Txs deep.  Cannot be combined with
+                               `--pipeline-depth` or `--dynamic`.  [default: 0]
   --min UTXO                   Overrides the network default minimum allowed UTxO amount, in Lovelace, for an output.
                                This option is provided for advanced frag operations testing.  For basic `frag` or
                                `defrag` ops, it is best to leave this option undeclared which will then
@@ -61,6 +71,9 @@ Options:
   --max INPUTS                 Sets the maximum number of inputs allowed in a Tx.  [default: 70]
                                Minimum is 1 for `frag` or 2 for `defrag` operations.
   --repeat COUNT               Sets the `frag` or `defrag` operations to repeat COUNT times.  [default: 1]
+  --batch TXS                  Sets `defrag` ops to select up to TXS disjoint input sets at once and to build and
+                               sign those Txs concurrently across the available CPU cores before submitting them
+                               in order.  Cannot be combined with `--pipeline-depth`.  [default: 1]
   --timers                     Enable info level logging of various operation times for optimization purposes.
   --filter TARGET METHOD EXPR  Apply a filter against tx_inputs, removing them if EXPR is true.
                                Where TARGET can be one of "utxo", "address", or "lovelace".
@@ -69,6 +82,12 @@ Options:
                                positive integer used with the other integer comparison methods, equal,
                                not equal, greater than, greater than or equal, less than, less than or equal.
                                Note that when using the "address" TARGET, it must be given in hex format not base58.
+  --where FILTER               Apply a compound filter against defrag tx_inputs, keeping only those for which FILTER
+                               is true.  FILTER combines TARGET METHOD VALUE predicates with "and", "or", "not" and
+                               parentheses, where TARGET can also be "account_ix" or "address_ix", METHOD can also be
+                               "in" with an integer VALUE range of LOW..HIGH, and "eq" and "ne" also compare "utxo"
+                               and hex "address" strings.  Quote VALUEs containing spaces or parentheses.
+                               Defrag filters are evaluated within the wallet db query.
   --socket S_PATH              Sets the path to the cardano-node socket file.
                                If not set, reads the path from env var $CARDANO_NODE_SOCKET_PATH.
   --ip IP                      Sets the wallet server ip to an ipv4 or ipv6 address. [default: 127.0.0.1]
@@ -79,10 +98,42 @@ Options:
                                fee estimate for the operation.
   --no-confirm                 Disables the confirmation prompt when running a frag or defrag live (`--live`).
   --timeout SECS               Sets the default connection and read timeout for wallet API calls.  [default: 30]
+  --pool-size CONNS            Sets the maximum number of kept-alive connections shared by wallet API calls.  Read only
+                               GET calls returning a transient 5xx status are retried with backoff.  [default: 10]
   --dynamic                    Enables fresh wallet state checks with each transaction to purge utxos which have
                                gone missing.  This may be needed to avoid runtime errors on a wallet which is
                                actively sending or receiving transactions while defrag-ops is being used.  This
                                option WILL slow down operations significantly when used with a large wallet.
+  --cli-check                  Cross-check each natively calculated fee, built transaction body and signed transaction
+                               against cardano-cli.  Transactions are built and signed natively by default; this
+                               option is provided for verification and WILL slow down operations.
+  --pipeline-depth DEPTH       Overlaps Tx building, signing and submission with the input selection of following
+                               Txs, holding up to DEPTH Txs between each stage.  [default: 0]
+                               The default of 0 processes each Tx fully before selecting the next one.
+  --warmup MB                  Pre-derives the skeys of all runtime input addresses in the background at startup, in
+                               planned selection order, caching at most MB megabytes of skeys.  [default: 0]
+                               The default of 0 derives each skey only when a Tx first needs it.
+  --key-cache C_PATH           Persists derived skeys and derivation paths between runs in an sqlite3 file at C_PATH,
+                               encrypted and authenticated with a key derived from the mnemonics.  Entries failing
+                               authentication are evicted, as are the oldest entries beyond a fixed size bound.
+                               Without this option, no files are written.
+  --params-refresh SECS        Sets the maximum age of the cached network protocol parameters.  Parameters are
+                               otherwise only re-queried when the tip reports a new epoch.  [default: 3600]
+  --chain BACKEND              Sets the backend for chain tip, protocol parameter and UTxO queries and for `--live`
+                               Tx submission.  [default: cli]
+                               Where BACKEND is "cli" to spawn cardano-cli for each query, or "socket" to keep one
+                               persistent node-to-client connection to the cardano-node socket and use it directly.
+                               With "socket", `--batch` Txs are submitted together with pipelining.
+  --slot-length SECS           Sets the network slot length, used to estimate the current slot between tip queries
+                               and to bound the wait for in-flight Txs.  Without this option, it is read from the
+                               node era history with `--chain socket`, or otherwise taken to be 1 second, the
+                               Shelley era slot length of all Cardano networks.
+  --track SECS                 Tracks `--live` Txs in flight, polling every SECS seconds for their change outputs at
+                               the bootstrap address, which are only queried once a new block reaches the tip.
+                               Inputs of Txs still unconfirmed once the tip passes their ttl are released for re-use.
+                               With `--chain socket`, only the change outputs are queried where the node supports it,
+                               and Txs unconfirmed after two minutes are resubmitted once.  At the end of a run, in-flight Txs are awaited and confirmation
+                               latency percentiles are reported.  The default of 0 disables tracking.  [default: 0]
   --raw                        Applicable to only the `print-bootstrap-address` sub-command, this option will
                                print only the bootstrap address with no additional context information.  Useful
                                for scripting.
@@ -107,10 +158,12 @@ from functools import partial
 from logging import Formatter
 from logging import handlers
 from signal import signal, SIGINT
-from typing import cast
 import lib.cardano
 import lib.db
+import lib.node
 import lib.objects
+import lib.pipeline
+import lib.tracker
 import lib.utility
 import lib.utxo
 import lib.validate
@@ -187,9 +240,13 @@ if __name__ == "__main__":
     setattr(
         ops,
         "g_runtime_utxos",
-        ops.g_cardano_cli_utxo.copy() if ops.g_frag else ops.g_wallet_utxo.copy(),
+        lib.objects.RuntimeUtxos(
+            ops.g_cardano_cli_utxo if ops.g_frag else ops.g_wallet_utxo
+        ),
     )
     lib.utxo.filter_inputs(ops)
+    lib.db.key_cache_read(ops)
+    lib.cardano.cardano_native_skey_warmup(ops)
 
     logger.debug(
         f"Global cardano-cli starting bootstrap address utxo count (excluding asset utxos): {len(ops.g_cardano_cli_utxo)}"
@@ -221,18 +278,36 @@ if __name__ == "__main__":
     setattr(ops, "g_sum_tx_count", 0)
     setattr(ops, "g_sum_tx_inputs", 0)
     setattr(ops, "g_sum_tx_outputs", 0)
-    g_sum_tx_fees = 0
-    g_sum_tx_count = 0
-    g_sum_tx_inputs = 0
-    g_sum_tx_outputs = 0
-    last_lookup_hits_sql_drvs = 0
-    last_lookup_hits_cli_skey = 0
+
+    # Overlap Tx building, signing and submission with selection of the next Tx;
+    # stages only work on their Tx and its queue time ttl and params snapshot, while
+    # selection, parameter refreshes, reconciliation and the runtime utxo swap stay
+    # on this thread and the totals are only read here once the pipeline stops
+    if ops.g_pipeline_depth > 0:
+        lib.pipeline.pipeline_start(
+            ops,
+            [
+                lib.cardano.cardano_cli_tx_build,
+                lib.cardano.cardano_cli_tx_witness,
+                lib.cardano.cardano_cli_tx_publish,
+            ],
+        )
+
+    # Track submitted Txs in the background until they confirm or drop
+    lib.tracker.tracker_start(ops)
+
+    # Create new frag output addresses in the background ahead of each Tx
+    lib.wallet.wallet_address_prefill_start(ops)
+
     for i in range(0, ops.g_tx_repeat):
         # Provide a status update for each operation repeat iteration
         iter_start_time = time.time()
 
-        # Poll for updated chain state information at the start of each tx
-        lib.cardano.cardano_cli_protocol_params(ops)
+        # Refresh cached chain state information at the start of each tx if stale
+        lib.cardano.cardano_cli_protocol_params_refresh(ops)
+
+        # Release the inputs of any tracked Txs which were dropped unconfirmed
+        lib.tracker.tracker_reconcile(ops)
 
         # Perform a fresh state check with each Tx if the wallet is specified as dynamic
         # This has a significant performance cost on large wallets!
@@ -250,36 +325,16 @@ if __name__ == "__main__":
             f"{len(ops.g_runtime_utxos)} non-asset utxo inputs {'available' if ops.g_frag else 'to be processed'}:"
         )
 
-        status = lib.cardano.cardano_cli_tx_compose(ops)
-
-        iter_end_time = time.time()
-        logger.info(
-            "Cache (drvHits, skeyHits, drvLen, skeyLen): "
-            + f"({ops.g_lookup_hits_sql_drvs - last_lookup_hits_sql_drvs}, "
-            + f"{ops.g_lookup_hits_cli_skey - last_lookup_hits_cli_skey}, "
-            + f"{len(ops.g_wallet_db_address_drvs)}, {len(ops.g_cardano_cli_skeys)})"
-            + f'{"" if ops.g_frag else ", Dust algorithm: " + cast(str, status["algorithm"])}'
-        )
-        logger.info(
-            f"Operation time: {lib.utility.time_delta_to_str(iter_end_time - iter_start_time)}, "
-            + f"Elapsed time: {lib.utility.time_delta_to_str(iter_end_time - ops.g_start_time, ms=False)}"
-        )
-        logger.info("")
-        logger.info("")
-
-        last_lookup_hits_sql_drvs = ops.g_lookup_hits_sql_drvs
-        last_lookup_hits_cli_skey = ops.g_lookup_hits_cli_skey
-
-        if status["state"] is True:
-            g_sum_tx_count += 1
-            g_sum_tx_fees += cast(int, status["fee"])
-            g_sum_tx_inputs += cast(int, status["inputs"])
-            g_sum_tx_outputs += cast(int, status["outputs"])
-            setattr(ops, "g_sum_tx_count", g_sum_tx_count)
-            setattr(ops, "g_sum_tx_fees", g_sum_tx_fees)
-            setattr(ops, "g_sum_tx_inputs", g_sum_tx_inputs)
-            setattr(ops, "g_sum_tx_outputs", g_sum_tx_outputs)
-        else:
+        status = lib.cardano.cardano_cli_tx_compose(ops, iter_start_time)
+        if status["state"] is not True:
             break
 
+    lib.pipeline.pipeline_stop(ops)
+    lib.wallet.wallet_address_prefill_stop(ops)
+    lib.tracker.tracker_stop(ops)
+    lib.cardano.cardano_native_skey_warmup_join(ops)
+    lib.db.key_cache_write(ops)
     lib.utility.summary_footer(ops)
+    lib.node.node_close(ops)
+    lib.wallet.wallet_session_close(ops)
+    lib.utility.shell_pool_stop(ops)
@@ -1,12 +1,23 @@
-from typing import Any, Callable, cast, Dict, List, Tuple, Union
+from typing import Any, Callable, cast, Dict, List, Optional, Tuple, Union
+import binascii
+import concurrent.futures
 import json
+import lib.cbor
+import lib.crypto
+import lib.node
 import lib.objects
+import lib.pipeline
+import lib.tracker
+import lib.tx
 import lib.utility
 import lib.utxo
 import lib.wallet
+import os
+import random
 import semver
 import subprocess
 import sys
+import threading
 import time
 
 
@@ -137,6 +148,10 @@ def cardano_address_inspect(
         account_index = f"{ops.g_wallet_db_address_drvs[address]['account_ix']}H"
         address_index = f"{ops.g_wallet_db_address_drvs[address]['address_ix']}H"
         g_lookup_hits_sql_drvs += 1
+    elif address in cardano_native_address_inspect(ops, [address]):
+        # The native decryption adds the derivation path to the lookup table
+        account_index = f"{ops.g_wallet_db_address_drvs[address]['account_ix']}H"
+        address_index = f"{ops.g_wallet_db_address_drvs[address]['address_ix']}H"
     else:
         cmd = f'cardano-address address inspect --root "{root_pub}" <<< "{address}"'
         result = lib.utility.shell_cmd(ops, cmd, self_check=True, shell=True)
@@ -175,6 +190,8 @@ def cardano_address_inspect(
 def cardano_address_key_prep(ops: lib.objects.OpsState) -> None:
     """ Prepare the public and private keys required with cardano-address and set ops state """
 
+    logger = ops.g_logger
+
     root_prv = cardano_address_gen_byron_prv_from_mnemonics(ops)
     root_pub = cardano_address_gen_pub(ops, root_prv)
     child_prv = cardano_address_gen_child_prv(
@@ -190,7 +207,18 @@ def cardano_address_key_prep(ops: lib.objects.OpsState) -> None:
         child_pub,
     )
 
+    try:
+        hrp, root_xprv = lib.crypto.crypto_bech32_decode(root_prv)
+        hrp, root_xpub = lib.crypto.crypto_bech32_decode(root_pub)
+    except ValueError:
+        logger.error("ERROR: Unable to decode the root keys.")
+        sys.exit(1)
+
+    setattr(
+        ops, "g_shelley_root_hd_passphrase", lib.crypto.crypto_hd_passphrase(root_xpub)
+    )
     setattr(ops, "g_shelley_root_prv", root_prv)
+    setattr(ops, "g_shelley_root_xprv", root_xprv)
     setattr(ops, "g_shelley_root_pub", root_pub)
     setattr(ops, "g_shelley_prv", child_prv)
     setattr(ops, "g_shelley_address", bootstrap_addr)
@@ -250,6 +278,8 @@ def cardano_cli_key_prep(ops: lib.objects.OpsState) -> None:
     setattr(ops, "g_shelley_skey", shelley_skey)
     setattr(ops, "g_shelley_vkey", shelley_vkey)
 
+    cardano_native_key_check(ops)
+
 
 def cardano_cli_protocol_params(ops: lib.objects.OpsState) -> None:
     """ Queries cardano cli for protocol parameters and sets ops state """
@@ -273,13 +303,12 @@ def cardano_cli_protocol_params(ops: lib.objects.OpsState) -> None:
         args.append("--mary-era")
 
     # fmt: on
-    result = lib.utility.shell_cmd(ops, cmd, args, self_check=True, shell=False)
-    network_protocol_params = json.dumps(
-        json.loads(result.stdout), separators=(",", ":")
-    )
-
     try:
-        network_protocol_params_parsed = json.loads(network_protocol_params)
+        if ops.g_chain_backend == "socket":
+            network_protocol_params = lib.node.node_protocol_params(ops)
+        else:
+            result = lib.utility.shell_cmd(ops, cmd, args, self_check=True, shell=False)
+            network_protocol_params = json.loads(result.stdout)
     except Exception:
         logger.error(
             "ERROR: invalid json returned when parsing cardano-cli protocol parameters."
@@ -288,11 +317,35 @@ def cardano_cli_protocol_params(ops: lib.objects.OpsState) -> None:
         logger.exception("")
         sys.exit(1)
 
+    # The parameters are parsed once into typed fields; the escaped compact json is
+    # only kept for the cardano-cli cross-check command lines
     setattr(ops, "g_network_protocol_params", network_protocol_params)
+    setattr(
+        ops,
+        "g_network_protocol_params_arg",
+        json.dumps(network_protocol_params, separators=(",", ":")).replace('"', r"\""),
+    )
+    setattr(ops, "g_network_protocol_params_epoch", ops.g_tip_sync_epoch)
+    setattr(ops, "g_network_protocol_params_time", time.time())
     setattr(
         ops,
         "g_network_protocol_params_min_utxo",
-        network_protocol_params_parsed["minUTxOValue"],
+        int(network_protocol_params["minUTxOValue"]),
+    )
+    setattr(
+        ops,
+        "g_network_protocol_params_min_fee_a",
+        int(network_protocol_params["txFeePerByte"]),
+    )
+    setattr(
+        ops,
+        "g_network_protocol_params_min_fee_b",
+        int(network_protocol_params["txFeeFixed"]),
+    )
+    setattr(
+        ops,
+        "g_network_protocol_params_max_tx_size",
+        int(network_protocol_params["maxTxSize"]),
     )
 
     if not ops.g_network_min_utxo_override:
@@ -304,6 +357,21 @@ def cardano_cli_protocol_params(ops: lib.objects.OpsState) -> None:
         )
 
 
+def cardano_cli_protocol_params_refresh(ops: lib.objects.OpsState) -> None:
+    """ Refreshes the cached protocol parameters on an epoch change or refresh interval and sets ops state """
+
+    # Parameters only change at epoch boundaries; the tip epoch is at most
+    # TIP_ESTIMATE_MAX_SLOTS stale and is unknown (-1) for node <= 1.25.1
+    cardano_cli_tip_slot(ops)
+    if (
+        ops.g_network_protocol_params_time == 0
+        or ops.g_tip_sync_epoch != ops.g_network_protocol_params_epoch
+        or time.time() - ops.g_network_protocol_params_time
+        >= ops.g_network_protocol_params_refresh
+    ):
+        cardano_cli_protocol_params(ops)
+
+
 def cardano_cli_query_utxo(
     ops: lib.objects.OpsState, address: str, ascending: bool = True
 ) -> None:
@@ -312,6 +380,30 @@ def cardano_cli_query_utxo(
     logger = ops.g_logger
 
     timer = time.time()
+    dict_utxos = cardano_cli_query_utxo_dict(ops, address)
+
+    unsorted_utxos = cardano_cli_utxo_dict_to_list(ops, dict_utxos)
+
+    # Sort the utxos list primarily by amount (descending), then utxo (tx_hash#tx_ix, descending)
+    utxos = cardano_cli_utxo_list_sort(
+        unsorted_utxos, sort_lambda=lambda x: (x[1], x[0]), ascending=False
+    )
+
+    setattr(ops, "g_cardano_cli_utxo", lib.objects.UtxoStore.from_rows(utxos))
+
+    if ops.g_timers:
+        logger.info(
+            f"Time to query cardano-cli utxos: {lib.utility.time_delta_to_str(time.time() - timer)}"
+        )
+
+
+def cardano_cli_query_utxo_dict(
+    ops: lib.objects.OpsState, address: str
+) -> Dict[str, Any]:
+    """ Queries a cardano cli address for utxos and returns the cardano cli utxo dict """
+
+    logger = ops.g_logger
+
     # Query cardano-cli for the address UTxOs
     # fmt: off
     cmd = (
@@ -322,29 +414,33 @@ def cardano_cli_query_utxo(
     )
     # fmt: on
 
-    result = lib.utility.shell_cmd(ops, cmd, self_check=True, shell=True)
-
     try:
-        utxos = json.loads(result.stdout)
+        if ops.g_chain_backend == "socket":
+            dict_utxos = lib.node.node_query_utxo(ops, address)
+        else:
+            result = lib.utility.shell_cmd(ops, cmd, self_check=True, shell=True)
+            dict_utxos = json.loads(result.stdout)
     except Exception:
         logger.error("ERROR: invalid json returned when querying shelley address utxo.")
         logger.error(cmd)
         logger.exception("")
         sys.exit(1)
 
-    unsorted_utxos = cardano_cli_utxo_dict_to_list(ops, utxos)
+    return dict_utxos
 
-    # Sort the utxos list primarily by amount (descending), then utxo (tx_hash#tx_ix, descending)
-    utxos = cardano_cli_utxo_list_sort(
-        unsorted_utxos, sort_lambda=lambda x: (x[1], x[0]), ascending=False
-    )
 
-    setattr(ops, "g_cardano_cli_utxo", utxos)
+def cardano_cli_slot_length(ops: lib.objects.OpsState) -> float:
+    """ Returns the network slot length in seconds and sets ops state """
 
-    if ops.g_timers:
-        logger.info(
-            f"Time to query cardano-cli utxos: {lib.utility.time_delta_to_str(time.time() - timer)}"
-        )
+    # A `--slot-length` is used as given; otherwise the node era history is queried
+    # once over a socket, as cardano-cli does not report it
+    if ops.g_network_slot_length == 0:
+        if ops.g_chain_backend == "socket":
+            setattr(ops, "g_network_slot_length", lib.node.node_slot_length(ops))
+        else:
+            setattr(ops, "g_network_slot_length", ops.NETWORK_SLOT_LENGTH_SECONDS)
+
+    return ops.g_network_slot_length
 
 
 def cardano_cli_tip_get(ops: lib.objects.OpsState) -> Dict[str, Union[int, str]]:
@@ -359,10 +455,12 @@ def cardano_cli_tip_get(ops: lib.objects.OpsState) -> Dict[str, Union[int, str]]
         + (f"--testnet-magic {ops.g_network_id} " if ops.g_network == "testnet" or ops.g_network == "staging" else "--mainnet")
     )
     # fmt: on
-    result = lib.utility.shell_cmd(ops, cmd, self_check=True, shell=True)
-
     try:
-        tip = json.loads(result.stdout)
+        if ops.g_chain_backend == "socket":
+            tip = lib.node.node_tip_get(ops)
+        else:
+            result = lib.utility.shell_cmd(ops, cmd, self_check=True, shell=True)
+            tip = json.loads(result.stdout)
     except Exception:
         logger.error("ERROR: invalid json returned when querying cardano-cli tip.")
         logger.error(cmd)
@@ -376,8 +474,253 @@ def cardano_cli_tip_get(ops: lib.objects.OpsState) -> Dict[str, Union[int, str]]
     return tip
 
 
+def cardano_cli_tip_parse_slot(
+    ops: lib.objects.OpsState, tip: Dict[str, Union[int, str]]
+) -> int:
+    """ Returns the slot number of cardano cli tip information """
+
+    logger = ops.g_logger
+
+    if "slot" in tip:
+        # For node > 1.25.1
+        slot = cast(int, tip["slot"])
+    elif "slotNo" in tip:
+        # For node <= 1.25.1
+        slot = cast(int, tip["slotNo"])
+    else:
+        logger.error("ERROR: unable to obtain the current cardano node slot number.")
+        sys.exit(1)
+
+    return int(slot)
+
+
+def cardano_cli_tip_slot(ops: lib.objects.OpsState) -> int:
+    """ Returns the current slot, estimated from the wall clock between tip queries, and sets ops state """
+
+    # Slots advance with wall clock time, so the tip is only re-queried once an
+    # estimate would have consumed TIP_ESTIMATE_MAX_SLOTS of the Tx ttl margin
+    elapsed_slots = int(
+        (time.time() - ops.g_tip_sync_time) / cardano_cli_slot_length(ops)
+    )
+    if ops.g_tip_sync_time > 0 and 0 <= elapsed_slots < ops.TIP_ESTIMATE_MAX_SLOTS:
+        return ops.g_tip_sync_slot + elapsed_slots
+
+    sync_time = time.time()
+    tip = cardano_cli_tip_get(ops)
+    slot = cardano_cli_tip_parse_slot(ops, tip)
+
+    setattr(ops, "g_tip_sync_epoch", cast(int, tip.get("epoch", -1)))
+    setattr(ops, "g_tip_sync_slot", slot)
+    setattr(ops, "g_tip_sync_time", sync_time)
+
+    return slot
+
+
+def cardano_cli_tx_batch(ops: lib.objects.OpsState) -> None:
+    """ Selects disjoint `defrag` input sets and builds and signs their Txs concurrently and sets ops state """
+
+    logger = ops.g_logger
+
+    # Partition the runtime utxos into disjoint input sets without exceeding the
+    # remaining repeat count
+    timer = time.time()
+    count = min(ops.g_tx_batch, ops.g_tx_repeat - ops.g_sum_tx_count)
+    txs: List[Dict[str, Any]] = []
+    while len(txs) < count and len(ops.g_runtime_utxos) >= 2:
+        inputs, input_addresses, selected_utxo, algorithm = lib.utxo.generate_tx_inputs(
+            ops,
+            ops.g_runtime_utxos,
+            min_total=ops.g_tx_output_min_utxo,
+            max_count=ops.g_tx_max_inputs,
+            strategy="max",
+        )
+        txs.append(
+            {
+                "inputs": inputs,
+                "outputs": {"string": "", "count": 0, "sum": 0},
+                "input_addresses": input_addresses,
+                "selected_utxo": selected_utxo,
+                "tx_outs": [],
+                "algorithm": algorithm,
+            }
+        )
+
+        # Remove runtime utxos that were consumed so the next input set is disjoint
+        lib.utxo.selection_consume(ops, selected_utxo)
+        for utxo in selected_utxo:
+            ops.g_runtime_utxos.remove(utxo)
+
+    if ops.g_timers:
+        logger.info(
+            f"Time to select {len(txs)} batch tx input sets: {lib.utility.time_delta_to_str(time.time() - timer)}"
+        )
+
+    # The tip and protocol parameters are read once for the whole batch, and the
+    # derivation paths of uncached input addresses are resolved here, so workers
+    # only read ops state while this thread waits on them
+    cardano_native_skey_warmup_join(ops)
+    snapshot = cardano_cli_tx_snapshot(ops)
+    paths: Dict[str, Tuple[int, int]] = {}
+    for tx in txs:
+        tx.update(snapshot)
+        tx["lookup_hits"] = (ops.g_lookup_hits_sql_drvs, 0)
+        for address in tx["input_addresses"]:
+            if (
+                address != ops.g_shelley_address
+                and address not in ops.g_cardano_cli_skeys
+                and address not in paths
+            ):
+                account_index, address_index = cardano_address_inspect(
+                    ops, ops.g_shelley_root_pub, address
+                )
+                paths[address] = (
+                    lib.crypto.crypto_index_parse(account_index)
+                    - lib.crypto.HARDENED_OFFSET,
+                    lib.crypto.crypto_index_parse(address_index)
+                    - lib.crypto.HARDENED_OFFSET,
+                )
+        tx["lookup_hits"] = (ops.g_lookup_hits_sql_drvs - tx["lookup_hits"][0], 0)
+
+    # Workers return the skeys they derived and their cache hit count for this thread
+    # to merge in; threads overlap the cli cross-check subprocesses and libsodium
+    # calls, but pure python derivation and fee calculation stay GIL bound
+    def build_and_witness(
+        tx: Dict[str, Any]
+    ) -> Tuple[Dict[str, Any], Dict[str, str], int]:
+        cardano_cli_tx_build(ops, tx)
+        skeys: Dict[str, str] = {}
+        hits = 0
+        witness_keys = []
+        for address in tx["input_addresses"]:
+            if address == ops.g_shelley_address:
+                witness_keys.append(ops.g_shelley_skey)
+            elif address in ops.g_cardano_cli_skeys:
+                witness_keys.append(ops.g_cardano_cli_skeys[address])
+                hits += 1
+            else:
+                if address not in skeys:
+                    skeys[address] = cardano_native_skey_derive(
+                        ops.g_shelley_root_xprv,
+                        ops.g_shelley_root_hd_passphrase,
+                        [(address, paths[address])],
+                    )[0][3]
+                witness_keys.append(skeys[address])
+        cardano_native_tx_witness(ops, tx, witness_keys)
+        return tx, skeys, hits
+
+    timer = time.time()
+    workers = min(len(txs), os.cpu_count() or 1)
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+        results = list(executor.map(build_and_witness, txs))
+    for tx, skeys, hits in results:
+        getattr(ops, "g_cardano_cli_skeys").update(skeys)
+        setattr(ops, "g_lookup_hits_cli_skey", ops.g_lookup_hits_cli_skey + hits)
+        tx["lookup_hits"] = (tx["lookup_hits"][0], hits)
+        getattr(ops, "g_tx_batch_txs").append(tx)
+
+    if ops.g_timers:
+        logger.info(
+            f"Time to build and sign {len(txs)} batch txs with {workers} threads: {lib.utility.time_delta_to_str(time.time() - timer)}"
+        )
+
+    # Over a socket, the whole batch is submitted with pipelining and each Tx's
+    # accept or reject result is reported when it is published in order
+    if ops.g_live and ops.g_chain_backend == "socket" and txs:
+        cardano_node_tx_submit(ops, txs)
+
+
+def cardano_cli_tx_build(ops: lib.objects.OpsState, tx: Dict[str, Any]) -> None:
+    """ Obtain a stable fee estimation and build the transaction body """
+
+    logger = ops.g_logger
+
+    inputs = tx["inputs"]
+    outputs = tx["outputs"]
+    input_addresses = tx["input_addresses"]
+    tx_outs = tx["tx_outs"]
+
+    ttl = tx["ttl"]
+    params = tx["params"]
+
+    # The ttl and protocol parameters were snapshot when the Tx was selected
+    # The fee is calculated natively from an exact serialized tx size model
+    timer = time.time()
+    tx_ins = [utxo for utxo, amount, address in tx["selected_utxo"]]
+    tx_fee, tx_change, tx_size = lib.tx.tx_fee_calc(
+        ops,
+        tx_ins,
+        tx_outs,
+        cast(int, inputs["sum"]),
+        ops.g_shelley_address,
+        input_addresses,
+        ttl,
+        params,
+    )
+    tx_body = lib.tx.tx_body_build(
+        tx_ins, tx_outs + [(ops.g_shelley_address, tx_change)], tx_fee, ttl
+    )
+    tx_draft = lib.tx.tx_body_envelope(tx_body)
+
+    if ops.g_cli_check:
+        cardano_cli_tx_fee_check(
+            ops,
+            tx_draft,
+            inputs,
+            outputs,
+            input_addresses,
+            tx_fee,
+            tx_change,
+            tx_size,
+            ttl,
+            params,
+        )
+
+    if ops.g_timers:
+        logger.info(
+            f"Time to generate a stable fee estimation: {lib.utility.time_delta_to_str(time.time() - timer)}"
+        )
+
+    tx["fee"] = tx_fee
+    tx["change"] = tx_change
+    tx["body"] = tx_body
+    tx["draft"] = tx_draft
+
+
+def cardano_cli_tx_chain(ops: lib.objects.OpsState, tx: Dict[str, Any]) -> None:
+    """ Adds a `frag` Tx's change output to the runtime utxos before it confirms and sets ops state """
+
+    logger = ops.g_logger
+
+    # A Tx is one deeper than its deepest unconfirmed input; inputs from the initial
+    # utxo query are confirmed and have a depth of 0
+    depths = ops.g_tx_chain_depths
+    depth = 1 + max(
+        [depths.pop(utxo, 0) for utxo, amount, address in tx["selected_utxo"]]
+    )
+    if depth > ops.g_tx_chain_depth:
+        logger.info(
+            f"    ...Tx chain depth limit of {ops.g_tx_chain_depth} reached; change is not re-spent this run"
+        )
+        return
+
+    # The change output follows the frag outputs and returns to the bootstrap address,
+    # which is kept in the same form as the bootstrap runtime utxos that funded it
+    change_utxo = (
+        f"{tx['id']}#{len(tx['tx_outs'])}",
+        tx["change"],
+        tx["selected_utxo"][0][2],
+    )
+
+    # The runtime utxos are kept in descending lovelace order for the "min" input
+    # selection strategy
+    ops.g_runtime_utxos.insert_sorted(change_utxo, ascending=False)
+    depths[change_utxo[0]] = depth
+
+    logger.debug(f"Chained change utxo {change_utxo[0]} at depth {depth}")
+
+
 def cardano_cli_tx_compose(
-    ops: lib.objects.OpsState,
+    ops: lib.objects.OpsState, started: float
 ) -> Dict[str, Union[bool, int, str]]:
     """ Generates fragmentation transactions and sets ops state """
 
@@ -391,7 +734,6 @@ def cardano_cli_tx_compose(
             logger.info("")
             return {
                 "state": False,
-                "fee": 0,
                 "inputs": 0,
                 "outputs": 0,
                 "algorithm": "none",
@@ -412,12 +754,41 @@ def cardano_cli_tx_compose(
             ops, ops.g_tx_output_count, ops.g_tx_output_lovelace
         )
         outputs = lib.utxo.generate_tx_outputs(output_addresses, output_amounts)
+        tx_outs = list(zip(output_addresses, output_amounts))
 
         if ops.g_timers:
             logger.info(
                 f"Time to generate tx inputs and outputs: {lib.utility.time_delta_to_str(time.time() - timer)}"
             )
 
+    # Defragmentation batch operation, which selects and builds Txs ahead of submission
+    if not ops.g_frag and ops.g_tx_batch > 1:
+        if not ops.g_tx_batch_txs:
+            if len(ops.g_runtime_utxos) < 2:
+                logger.info("")
+                logger.info(
+                    "Defragmentation complete: less than 2 UTxO remain (excluding new defrag Tx change UTxOs)"
+                )
+                logger.info("")
+                return {
+                    "state": False,
+                    "inputs": 0,
+                    "outputs": 0,
+                    "algorithm": "none",
+                }
+            cardano_cli_tx_batch(ops)
+
+        tx = ops.g_tx_batch_txs.popleft()
+        tx["started"] = started
+        cardano_cli_tx_publish(ops, tx)
+
+        return {
+            "state": True,
+            "inputs": tx["inputs"]["count"],
+            "outputs": tx["outputs"]["count"],
+            "algorithm": tx["algorithm"],
+        }
+
     # Defragmentation operation setup
     if not ops.g_frag:
         if len(ops.g_runtime_utxos) < 2:
@@ -428,7 +799,6 @@ def cardano_cli_tx_compose(
             logger.info("")
             return {
                 "state": False,
-                "fee": 0,
                 "inputs": 0,
                 "outputs": 0,
                 "algorithm": "none",
@@ -443,6 +813,7 @@ def cardano_cli_tx_compose(
             strategy="max",
         )
         outputs = {"string": "", "count": 0, "sum": 0}
+        tx_outs = []
 
         if ops.g_timers:
             logger.info(
@@ -450,10 +821,18 @@ def cardano_cli_tx_compose(
             )
 
     # Operation execution
-    tx_fee = cardano_cli_tx_process(ops, inputs, outputs, input_addresses)
+    tx = {
+        "inputs": inputs,
+        "outputs": outputs,
+        "input_addresses": input_addresses,
+        "selected_utxo": selected_utxo,
+        "tx_outs": tx_outs,
+        "algorithm": algorithm,
+        "started": started,
+    }
+    cardano_cli_tx_process(ops, tx)
     status = {
         "state": True,
-        "fee": tx_fee,
         "inputs": inputs["count"],
         "outputs": outputs["count"],
         "algorithm": algorithm,
@@ -461,9 +840,10 @@ def cardano_cli_tx_compose(
 
     # Remove runtime utxos that were consumed in this tx
     timer = time.time()
+    lib.utxo.selection_consume(ops, selected_utxo)
     for utxo in selected_utxo:
         try:
-            getattr(ops, "g_runtime_utxos").remove(utxo)
+            ops.g_runtime_utxos.remove(utxo)
         except ValueError:
             logger.exception(
                 "ERROR: An expected runtime utxo was found not in the list during runtime cleanup."
@@ -475,6 +855,10 @@ def cardano_cli_tx_compose(
             f"Time to purge consumed utxos: {lib.utility.time_delta_to_str(time.time() - timer)}"
         )
 
+    # Chain the change back into the runtime utxos so following Txs can spend it
+    if ops.g_frag and ops.g_tx_chain_depth > 0:
+        cardano_cli_tx_chain(ops, tx)
+
     return status
 
 
@@ -510,6 +894,8 @@ def cardano_cli_tx_fee_calc(
     tx_body: str,
     inputs: Dict[str, Union[int, str]],
     outputs: Dict[str, Union[int, str]],
+    byron_witness_count: int,
+    protocol_params_arg: str,
 ) -> int:
     """ Queries cardano cli for a minimum fee calculation """
 
@@ -523,10 +909,10 @@ def cardano_cli_tx_fee_calc(
         + '") '
         + (f"--testnet-magic {ops.g_network_id} " if ops.g_network == "testnet" or ops.g_network == "staging" else "--mainnet ")
         + '--protocol-params-file <(echo -n "'
-        + ops.g_network_protocol_params.replace('"', r"\"")
+        + protocol_params_arg
         + '") '
         + f"--tx-in-count {cast(int, inputs['count'])} --tx-out-count {cast(int, outputs['count']) + 1} "
-        + f"--witness-count {cast(int, inputs['count'])} --byron-witness-count 0'"
+        + f"--witness-count 0 --byron-witness-count {byron_witness_count}'"
     )
     # fmt: on
     result = lib.utility.shell_cmd(ops, cmd, self_check=True, shell=True)
@@ -553,6 +939,73 @@ def cardano_cli_tx_fee_calc(
     return tx_fee_int
 
 
+def cardano_cli_tx_fee_check(
+    ops: lib.objects.OpsState,
+    tx_draft: str,
+    inputs: Dict[str, Union[int, str]],
+    outputs: Dict[str, Union[int, str]],
+    input_addresses: List[str],
+    tx_fee: int,
+    tx_change: int,
+    tx_size: int,
+    ttl: int,
+    params: Dict[str, Any],
+) -> None:
+    """ Cross-checks a native tx body and fee calculation against cardano cli """
+
+    logger = ops.g_logger
+
+    timer = time.time()
+    tx_draft_cli = cardano_cli_tx_draft(
+        ops, inputs, outputs, ops.g_shelley_address, tx_fee, tx_change, ttl
+    )
+    tx_fee_cli = cardano_cli_tx_fee_calc(
+        ops, tx_draft_cli, inputs, outputs, len(input_addresses), params["arg"]
+    )
+
+    # The cardano-cli body envelope cbor is [tx_body, scripts, metadata]
+    try:
+        tx_body_cbor = binascii.unhexlify(json.loads(tx_draft)["cborHex"])
+        major, info, argument, offset = lib.cbor.cbor_decode_head(tx_body_cbor, 0)
+        tx_body_size_native = lib.cbor.cbor_skip_item(tx_body_cbor, offset) - offset
+    except Exception:
+        logger.exception("ERROR: Unable to parse the native draft Tx body.")
+        sys.exit(1)
+    tx_body_size = tx_size - lib.tx.tx_witness_set_size(input_addresses) - 2
+
+    logger.debug(
+        "Fee check (native size, native body size, modeled body size, native fee, cli fee): "
+        + f"({tx_size}, {tx_body_size_native}, {tx_body_size}, {tx_fee}, {tx_fee_cli})"
+    )
+
+    if tx_draft != tx_draft_cli:
+        logger.error(
+            "ERROR: The native Tx body does not match the cardano-cli Tx body."
+        )
+        logger.error(f"Native: {tx_draft}")
+        logger.error(f"cardano-cli: {tx_draft_cli}")
+        sys.exit(1)
+
+    if tx_body_size != tx_body_size_native:
+        logger.error(
+            f"ERROR: The modeled Tx body size of {tx_body_size} bytes does not match the serialized Tx body size of {tx_body_size_native} bytes."
+        )
+        sys.exit(1)
+
+    # The cardano-cli estimate uses dummy Byron witnesses without derivation path
+    # attributes, so it should never exceed the exact native fee
+    if tx_fee < tx_fee_cli:
+        logger.error(
+            f"ERROR: The native Tx fee of {tx_fee} lovelace is less than the cardano-cli estimated fee of {tx_fee_cli} lovelace."
+        )
+        sys.exit(1)
+
+    if ops.g_timers:
+        logger.info(
+            f"Time to cross-check the Tx body and fee with cardano-cli: {lib.utility.time_delta_to_str(time.time() - timer)}"
+        )
+
+
 def cardano_cli_tx_id(ops: lib.objects.OpsState, tx_signed: str) -> str:
     """ Obtains a cardano transaction id """
 
@@ -569,48 +1022,27 @@ def cardano_cli_tx_id(ops: lib.objects.OpsState, tx_signed: str) -> str:
     return tx_id
 
 
-def cardano_cli_tx_process(
-    ops: lib.objects.OpsState,
-    inputs: Dict[str, Union[int, str]],
-    outputs: Dict[str, Union[int, str]],
-    input_addresses: List[str],
-) -> int:
-    """ Obtain a stable fee estimation and submit the transaction if `--live` """
+def cardano_cli_tx_process(ops: lib.objects.OpsState, tx: Dict[str, Any]) -> None:
+    """ Builds, signs and submits a transaction, through the pipeline if enabled """
 
-    logger = ops.g_logger
-
-    tip = cardano_cli_tip_get(ops)
-    if "slot" in tip:
-        # For node > 1.25.1
-        ttl = cast(int, tip["slot"]) + ops.TX_TTL_TOLERANCE
-    elif "slotNo" in tip:
-        # For node <= 1.25.1
-        ttl = cast(int, tip["slotNo"]) + ops.TX_TTL_TOLERANCE
+    tx.update(cardano_cli_tx_snapshot(ops))
+    if ops.g_pipeline_depth > 0:
+        lib.pipeline.pipeline_put(ops, tx)
     else:
-        logger.error("ERROR: unable to obtain the current cardano node slot number.")
-        sys.exit(1)
+        cardano_cli_tx_build(ops, tx)
+        cardano_cli_tx_witness(ops, tx)
+        cardano_cli_tx_publish(ops, tx)
 
-    # Time to obtain cardano-cli tip is reported separately, so not included here
-    timer = time.time()
-    tx_fee = -1
-    tx_fee_last = 0
-    count = 0
-    while tx_fee != tx_fee_last and count <= ops.TX_FEE_CALC_ATTEMPTS:
-        tx_fee = tx_fee_last
-        tx_change = cast(int, inputs["sum"]) - cast(int, outputs["sum"]) - tx_fee
-        tx_draft = cardano_cli_tx_draft(
-            ops, inputs, outputs, ops.g_shelley_address, tx_fee, tx_change, ttl
-        )
 
-        tx_fee_last = cardano_cli_tx_fee_calc(ops, tx_draft, inputs, outputs)
-        count += 1
+def cardano_cli_tx_publish(ops: lib.objects.OpsState, tx: Dict[str, Any]) -> None:
+    """ Submits a signed transaction if `--live` and sets ops state """
 
-    if tx_fee != tx_fee_last and count > ops.TX_FEE_CALC_ATTEMPTS:
-        logger.error(
-            f"ERROR: unable to obtain a stable fee calculation after {count} attempts."
-        )
-        sys.exit(1)
+    logger = ops.g_logger
 
+    inputs = tx["inputs"]
+    outputs = tx["outputs"]
+
+    # Tx status is reported here so each Tx's lines stay together when pipelined
     logger.info(
         (
             "Tx ready: (inputs, outputs, inSum, outSum, change, fees) = ("
@@ -618,26 +1050,11 @@ def cardano_cli_tx_process(
             + (f"{outputs['count']} + change_addr, ")
             + (f"{inputs['sum']}, ")
             + (f"{outputs['sum']}, ")
-            + (f"{tx_change}, ")
-            + (f"{tx_fee})...")
+            + (f"{tx['change']}, ")
+            + (f"{tx['fee']})...")
         )
     )
 
-    if ops.g_timers:
-        logger.info(
-            f"Time to generate a stable fee estimation: {lib.utility.time_delta_to_str(time.time() - timer)}"
-        )
-
-    # Sign the raw transaction and obtain the transaction id
-    timer = time.time()
-    tx_signed = cardano_cli_tx_sign(ops, tx_draft, input_addresses)
-    tx_id = cardano_cli_tx_id(ops, tx_signed)
-
-    if ops.g_timers:
-        logger.info(
-            f"Time to sign the tx and obtain a tx_id: {lib.utility.time_delta_to_str(time.time() - timer)}"
-        )
-
     logger.debug("")
     logger.debug("DEBUG Tx INPUTS:")
     logger.debug(json.dumps(inputs, indent=2))
@@ -650,12 +1067,22 @@ def cardano_cli_tx_process(
     timer = time.time()
     if ops.g_live:
         logger.info(
-            f"    ...submitted to network {ops.g_network} ({ops.g_network_id}) as tx_id: {tx_id}"
+            f"    ...submitted to network {ops.g_network} ({ops.g_network_id}) as tx_id: {tx['id']}"
         )
-        cardano_cli_tx_submit(ops, tx_signed)
+        if ops.g_chain_backend == "socket":
+            # Batch Txs may already have been submitted together over the socket
+            if "submit_result" not in tx:
+                cardano_node_tx_submit(ops, [tx])
+            if tx["submit_result"] is not None:
+                logger.error(
+                    f"ERROR: The cardano-node rejected tx_id {tx['id']}: {tx['submit_result']}"
+                )
+                sys.exit(1)
+        else:
+            cardano_cli_tx_submit(ops, tx["signed"])
     else:
         logger.info(
-            f"    ...dry run -- not submitting Tx to the network (txid: {tx_id})"
+            f"    ...dry run -- not submitting Tx to the network (txid: {tx['id']})"
         )
 
     if ops.g_timers:
@@ -663,46 +1090,39 @@ def cardano_cli_tx_process(
             f"Time to submit the tx: {lib.utility.time_delta_to_str(time.time() - timer)}"
         )
 
-    return tx_fee
+    # Submitted Txs are tracked until they confirm or can no longer be included
+    if ops.g_live and ops.g_tracker_interval > 0:
+        lib.tracker.tracker_add(ops, tx)
 
+    # Totals only count Txs which have reached this final stage
+    setattr(ops, "g_sum_tx_count", ops.g_sum_tx_count + 1)
+    setattr(ops, "g_sum_tx_fees", ops.g_sum_tx_fees + tx["fee"])
+    setattr(ops, "g_sum_tx_inputs", ops.g_sum_tx_inputs + inputs["count"])
+    setattr(ops, "g_sum_tx_outputs", ops.g_sum_tx_outputs + outputs["count"])
 
-def cardano_cli_tx_sign(
-    ops: lib.objects.OpsState, tx_body: str, addresses: List[str]
-) -> str:
-    """ Signs a cardano cli raw transaction and sets ops state """
-
-    g_lookup_hits_cli_skey = ops.g_lookup_hits_cli_skey
-
-    # Generate the witness skeys
-    if addresses == [ops.g_shelley_address]:
-        witness_keys = [ops.g_shelley_skey]
-    else:
-        witness_keys = []
-        for address in addresses:
-            # See if the skey already exists for this address in the lookup table
-            if address in ops.g_cardano_cli_skeys:
-                witness_keys.append(ops.g_cardano_cli_skeys[address])
-                g_lookup_hits_cli_skey += 1
-            else:
-                account_index, address_index = cardano_address_inspect(
-                    ops, ops.g_shelley_root_pub, address
-                )
+    # Per-Tx cache and timing lines are logged here, once the Tx has been published
+    published = time.time()
+    logger.info(
+        "Cache (drvHits, skeyHits, drvLen, skeyLen): "
+        + f"({tx['lookup_hits'][0]}, {tx['lookup_hits'][1]}, "
+        + f"{len(ops.g_wallet_db_address_drvs)}, {len(ops.g_cardano_cli_skeys)})"
+        + f'{"" if ops.g_frag else ", Dust algorithm: " + tx["algorithm"]}'
+    )
+    logger.info(
+        f"Operation time: {lib.utility.time_delta_to_str(published - tx['started'])}, "
+        + f"Elapsed time: {lib.utility.time_delta_to_str(published - ops.g_start_time, ms=False)}"
+    )
+    logger.info("")
+    logger.info("")
 
-                # Use two commands piped through the same shell subprocess to minimize overhead
-                address_skey = cardano_address_child_prv_and_skey_gen(
-                    ops, ops.g_shelley_root_prv, account_index, address_index
-                )
 
-                # For debug, individual commands can be used instead at the cost of performance
-                #
-                # address_prv = cardano_address_gen_child_prv(
-                #     ops,
-                #     ops.g_shelley_root_prv, account_index, address_index
-                # )
-                # address_skey = cardano_cli_gen_byron_skey(ops, address_prv)
-                witness_keys.append(address_skey)
-                getattr(ops, "g_cardano_cli_skeys")[address] = address_skey
-        setattr(ops, "g_lookup_hits_cli_skey", g_lookup_hits_cli_skey)
+def cardano_cli_tx_sign(
+    ops: lib.objects.OpsState,
+    tx_body: str,
+    addresses: List[str],
+    witness_keys: List[str],
+) -> str:
+    """ Signs a cardano cli raw transaction """
 
     # Assembly the witness cli arguments
     witness_text = [
@@ -730,6 +1150,59 @@ def cardano_cli_tx_sign(
     return tx_signed
 
 
+def cardano_cli_tx_sign_check(
+    ops: lib.objects.OpsState,
+    tx_draft: str,
+    addresses: List[str],
+    witness_keys: List[str],
+    tx_signed: str,
+    tx_id: str,
+) -> None:
+    """ Cross-checks a natively signed transaction and tx_id against cardano cli """
+
+    logger = ops.g_logger
+
+    timer = time.time()
+    tx_signed_cli = cardano_cli_tx_sign(ops, tx_draft, addresses, witness_keys)
+
+    # Ed25519 signatures are deterministic, so the signed txs must be identical
+    if tx_signed != tx_signed_cli:
+        logger.error(
+            "ERROR: The native signed Tx does not match the cardano-cli signed Tx."
+        )
+        logger.error(f"Native: {tx_signed}")
+        logger.error(f"cardano-cli: {tx_signed_cli}")
+        sys.exit(1)
+
+    tx_id_cli = cardano_cli_tx_id(ops, tx_signed_cli)
+    if tx_id != tx_id_cli:
+        logger.error(
+            f"ERROR: The native tx_id {tx_id} does not match the cardano-cli tx_id {tx_id_cli}."
+        )
+        sys.exit(1)
+
+    if ops.g_timers:
+        logger.info(
+            f"Time to cross-check the signed Tx and tx_id with cardano-cli: {lib.utility.time_delta_to_str(time.time() - timer)}"
+        )
+
+
+def cardano_cli_tx_snapshot(ops: lib.objects.OpsState) -> Dict[str, Any]:
+    """ Returns the ttl and protocol parameters to build a transaction with """
+
+    # Txs are built from this snapshot rather than live ops state, so a Tx built on
+    # another thread is unaffected by a later tip query or parameter refresh
+    return {
+        "ttl": cardano_cli_tip_slot(ops) + ops.TX_TTL_TOLERANCE,
+        "params": {
+            "min_fee_a": ops.g_network_protocol_params_min_fee_a,
+            "min_fee_b": ops.g_network_protocol_params_min_fee_b,
+            "max_tx_size": ops.g_network_protocol_params_max_tx_size,
+            "arg": ops.g_network_protocol_params_arg,
+        },
+    }
+
+
 def cardano_cli_tx_submit(
     ops: lib.objects.OpsState, tx_signed: str
 ) -> subprocess.CompletedProcess:
@@ -748,6 +1221,18 @@ def cardano_cli_tx_submit(
     return result
 
 
+def cardano_cli_tx_witness(ops: lib.objects.OpsState, tx: Dict[str, Any]) -> None:
+    """ Signs a transaction body and obtains the transaction id and sets ops state """
+
+    hits = (ops.g_lookup_hits_sql_drvs, ops.g_lookup_hits_cli_skey)
+    witness_keys = cardano_native_witness_skeys(ops, tx["input_addresses"])
+    cardano_native_tx_witness(ops, tx, witness_keys)
+    tx["lookup_hits"] = (
+        ops.g_lookup_hits_sql_drvs - hits[0],
+        ops.g_lookup_hits_cli_skey - hits[1],
+    )
+
+
 def cardano_cli_utxo_dict_to_list(
     ops: lib.objects.OpsState, dict_utxos: Dict[str, Dict[str, Any]]
 ) -> List[Tuple[str, int, str]]:
@@ -794,3 +1279,497 @@ def cardano_cli_utxo_list_sort(
 
     reverse = True if ascending is False else False
     return sorted(utxos, key=sort_lambda, reverse=reverse)
+
+
+def cardano_native_address_inspect(
+    ops: lib.objects.OpsState, addresses: List[str]
+) -> Dict[str, Tuple[int, int]]:
+    """ Decrypts the derivation paths of a batch of Byron addresses and sets ops state """
+
+    logger = ops.g_logger
+
+    # Addresses that fail to decrypt belong to another root key or are not random
+    # derivation Byron addresses, so they are omitted from the results
+    drvs = {}
+    passphrase = ops.g_shelley_root_hd_passphrase
+    for address in set(addresses):
+        try:
+            path = lib.crypto.crypto_hd_payload_decrypt(
+                passphrase, lib.tx.tx_byron_address_hd_payload(address)
+            )
+        except ValueError:
+            logger.debug(f"Unable to natively decrypt the derivation path: {address}")
+            continue
+        if len(path) != 2:
+            continue
+        account_ix, address_ix = [
+            x - lib.crypto.HARDENED_OFFSET if x >= lib.crypto.HARDENED_OFFSET else x
+            for x in path
+        ]
+        drvs[address] = (account_ix, address_ix)
+
+        # Add the new key to the lookup table to optimize future lookups
+        getattr(ops, "g_wallet_db_address_drvs")[address] = {
+            "account_ix": account_ix,
+            "address_ix": address_ix,
+        }
+
+    return drvs
+
+
+def cardano_native_address_build(
+    ops: lib.objects.OpsState, account_ix: int, address_ix: int
+) -> str:
+    """ Natively builds the random derivation Byron address of a derivation path """
+
+    # The staging network addresses, like mainnet ones, carry no network magic
+    network_magic = int(ops.g_network_id) if ops.g_network == "testnet" else None
+    child_xprv = cardano_native_child_xprv(ops, account_ix, address_ix)
+
+    return lib.tx.tx_byron_address_build(
+        lib.crypto.crypto_ed25519_public_key(child_xprv[0:32]) + child_xprv[64:96],
+        lib.crypto.crypto_hd_payload_encrypt(
+            ops.g_shelley_root_hd_passphrase, [account_ix, address_ix]
+        ),
+        network_magic,
+    )
+
+
+def cardano_native_address_gen(ops: lib.objects.OpsState, count: int) -> List[str]:
+    """ Natively generates new random derivation Byron addresses at unused indices and sets ops state """
+
+    # Like cardano-wallet, pick random hardened address indices of the default account,
+    # skipping those the wallet db already knows about and those generated this run;
+    # the db may hold indices with or without the hardened offset, so used indices
+    # are kept without it, as in the address lookup table
+    used = ops.g_wallet_local_indices
+    if not used:
+        used.update(
+            [
+                (
+                    account_ix % lib.crypto.HARDENED_OFFSET,
+                    address_ix % lib.crypto.HARDENED_OFFSET,
+                )
+                for address, account_ix, address_ix, status in ops.g_wallet_db_addresses
+            ]
+        )
+        used.add(
+            (
+                lib.crypto.crypto_index_parse(ops.DEFAULT_ACCOUNT_INDEX)
+                % lib.crypto.HARDENED_OFFSET,
+                lib.crypto.crypto_index_parse(ops.DEFAULT_ADDRESS_INDEX)
+                % lib.crypto.HARDENED_OFFSET,
+            )
+        )
+
+    account_ix = lib.crypto.crypto_index_parse(ops.DEFAULT_ACCOUNT_INDEX)
+    addresses: List[str] = []
+    while len(addresses) < count:
+        address_ix = lib.crypto.HARDENED_OFFSET + random.randrange(
+            lib.crypto.HARDENED_OFFSET
+        )
+        indices = (
+            account_ix % lib.crypto.HARDENED_OFFSET,
+            address_ix % lib.crypto.HARDENED_OFFSET,
+        )
+        if indices in used:
+            continue
+        used.add(indices)
+
+        address = cardano_native_address_build(ops, account_ix, address_ix)
+        addresses.append(address)
+
+        # Add the new address to the lookup table so its key is found if it is spent
+        getattr(ops, "g_wallet_db_address_drvs")[address] = {
+            "account_ix": account_ix - lib.crypto.HARDENED_OFFSET,
+            "address_ix": address_ix - lib.crypto.HARDENED_OFFSET,
+        }
+
+    return addresses
+
+
+def cardano_native_child_skey_gen(
+    ops: lib.objects.OpsState, account_index: str, address_index: str
+) -> str:
+    """ Natively generate a child private key and cardano shelley skey from the root private key """
+
+    child_xprv = cardano_native_child_xprv(
+        ops,
+        lib.crypto.crypto_index_parse(account_index),
+        lib.crypto.crypto_index_parse(address_index),
+    )
+    skey = cardano_native_skey_envelope(
+        lib.crypto.crypto_xprv_to_signing_key(child_xprv)
+    )
+
+    return skey
+
+
+def cardano_native_child_xprv(
+    ops: lib.objects.OpsState, account_ix: int, address_ix: int
+) -> bytes:
+    """ Natively derives a child extended private key from the root private key and sets ops state """
+
+    # Account keys are shared by many addresses, so they are cached for re-use
+    if account_ix not in ops.g_shelley_account_xprvs:
+        getattr(ops, "g_shelley_account_xprvs")[
+            account_ix
+        ] = lib.crypto.crypto_xprv_child_v1(ops.g_shelley_root_xprv, account_ix)
+
+    return lib.crypto.crypto_xprv_child_v1(
+        ops.g_shelley_account_xprvs[account_ix], address_ix
+    )
+
+
+def cardano_native_key_check(ops: lib.objects.OpsState) -> None:
+    """ Verifies native key derivation against cardano-address and cardano-cli generated keys """
+
+    logger = ops.g_logger
+
+    # The bootstrap address key was derived and converted by cardano-address and
+    # cardano-cli, so it serves as a known answer check for the native derivation
+    try:
+        hrp, child_prv = lib.crypto.crypto_bech32_decode(ops.g_shelley_prv)
+        child_xprv = lib.crypto.crypto_xprv_derive_v1(
+            ops.g_shelley_root_xprv,
+            [
+                lib.crypto.crypto_index_parse(ops.DEFAULT_ACCOUNT_INDEX),
+                lib.crypto.crypto_index_parse(ops.DEFAULT_ADDRESS_INDEX),
+            ],
+        )
+        skey = cardano_native_child_skey_gen(
+            ops, ops.DEFAULT_ACCOUNT_INDEX, ops.DEFAULT_ADDRESS_INDEX
+        )
+        skey_match = (
+            json.loads(skey)["cborHex"] == json.loads(ops.g_shelley_skey)["cborHex"]
+        )
+
+        # Locally generated frag output addresses must be discoverable by the wallet,
+        # so they are checked against the cardano-address generated bootstrap address
+        address_match = (
+            ops.g_tx_output_frag_address != "local-new"
+            or cardano_native_address_build(
+                ops,
+                lib.crypto.crypto_index_parse(ops.DEFAULT_ACCOUNT_INDEX),
+                lib.crypto.crypto_index_parse(ops.DEFAULT_ADDRESS_INDEX),
+            )
+            == ops.g_shelley_address
+        )
+    except Exception:
+        logger.error("ERROR: Unable to verify native key derivation.")
+        sys.exit(1)
+
+    if (
+        child_prv[0:64] != child_xprv[0:64]
+        or child_prv[-32:] != child_xprv[64:96]
+        or not skey_match
+        or not address_match
+    ):
+        logger.error(
+            "ERROR: Native key derivation does not match cardano-address and cardano-cli key derivation."
+        )
+        sys.exit(1)
+
+
+def cardano_native_skey_derive(
+    root_xprv: bytes,
+    passphrase: bytes,
+    items: List[Tuple[str, Optional[Tuple[int, int]]]],
+) -> List[Tuple[str, int, int, str]]:
+    """ Derives the skeys of (address, derivation path or None) items without ops state, for worker processes """
+
+    account_xprvs: Dict[int, bytes] = {}
+    results = []
+    for address, drv in items:
+        if drv is None:
+            try:
+                path = lib.crypto.crypto_hd_payload_decrypt(
+                    passphrase, lib.tx.tx_byron_address_hd_payload(address)
+                )
+            except ValueError:
+                continue
+            if len(path) != 2:
+                continue
+            drv = (
+                path[0] % lib.crypto.HARDENED_OFFSET,
+                path[1] % lib.crypto.HARDENED_OFFSET,
+            )
+        account_ix, address_ix = drv
+        if account_ix not in account_xprvs:
+            account_xprvs[account_ix] = lib.crypto.crypto_xprv_child_v1(
+                root_xprv, account_ix + lib.crypto.HARDENED_OFFSET
+            )
+        child_xprv = lib.crypto.crypto_xprv_child_v1(
+            account_xprvs[account_ix], address_ix + lib.crypto.HARDENED_OFFSET
+        )
+        results.append(
+            (
+                address,
+                account_ix,
+                address_ix,
+                cardano_native_skey_envelope(
+                    lib.crypto.crypto_xprv_to_signing_key(child_xprv)
+                ),
+            )
+        )
+
+    return results
+
+
+def cardano_native_skey_envelope(signing_key: bytes) -> str:
+    """ Wraps a 128 byte Byron signing key in a compact cardano-cli text envelope """
+
+    skey = json.dumps(
+        {
+            "type": "PaymentSigningKeyByron_ed25519_bip32",
+            "description": "",
+            "cborHex": lib.cbor.cbor_encode(signing_key).hex(),
+        },
+        separators=(",", ":"),
+    )
+
+    return skey
+
+
+def cardano_native_skey_warmup(ops: lib.objects.OpsState) -> None:
+    """ Starts a background pre-derivation of the runtime utxo input address skeys and sets ops state """
+
+    logger = ops.g_logger
+
+    # Frag inputs are only ever the bootstrap address, already witnessed by its skey
+    if ops.g_skey_warmup_mb == 0 or ops.g_frag:
+        return
+
+    # Unique input addresses in planned selection order
+    addresses = [
+        address
+        for address in dict.fromkeys(
+            [
+                lib.utility.base58_encode(address)
+                for utxo, amount, address in ops.g_runtime_utxos
+            ]
+        )
+        if address != ops.g_shelley_address and address not in ops.g_cardano_cli_skeys
+    ]
+    if not addresses:
+        return
+
+    # Every cached skey envelope is the same size, so the memory ceiling is an entry count
+    entry_size = (
+        sys.getsizeof(ops.g_shelley_skey) + sys.getsizeof(addresses[0]) + 2 * 8 + 64
+    )
+    max_entries = ops.g_skey_warmup_mb * 1024 * 1024 // entry_size
+    addresses = addresses[: max(0, max_entries - len(ops.g_cardano_cli_skeys))]
+    if not addresses:
+        logger.info(
+            f"Skey warm-up skipped: {len(ops.g_cardano_cli_skeys)} cached skeys already fill {ops.g_skey_warmup_mb} MB"
+        )
+        return
+
+    # Workers get the paths already known to the wallet db and decrypt the others,
+    # so they never touch the shared caches, which are merged in once on join
+    items = [
+        (
+            address,
+            (drv["account_ix"], drv["address_ix"]) if drv is not None else None,
+        )
+        for address, drv in [
+            (address, ops.g_wallet_db_address_drvs.get(address))
+            for address in addresses
+        ]
+    ]
+    workers = os.cpu_count() or 1
+    chunk_size = max(1, -(-len(items) // (4 * workers)))
+    chunks = [items[i : i + chunk_size] for i in range(0, len(items), chunk_size)]
+    skeys = ops.g_skey_warmup_skeys
+
+    def warmup() -> None:
+        timer = time.time()
+
+        # Key derivation is pure python and GIL bound, so it runs in worker processes;
+        # addresses which cannot be resolved are left for the lazy fallback on signing
+        with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
+            for results in executor.map(
+                cardano_native_skey_derive,
+                [ops.g_shelley_root_xprv] * len(chunks),
+                [ops.g_shelley_root_hd_passphrase] * len(chunks),
+                chunks,
+            ):
+                for address, account_ix, address_ix, skey in results:
+                    skeys[address] = (account_ix, address_ix, skey)
+
+        elapsed = time.time() - timer
+        logger.info(
+            f"Skey warm-up derived {len(skeys)} skeys in {lib.utility.time_delta_to_str(elapsed)} "
+            + f"({len(skeys) / max(elapsed, 1e-6):.0f} skeys/s) with {workers} processes "
+            + f"(~{len(skeys) * entry_size / 1024 / 1024:.1f} of {ops.g_skey_warmup_mb} MB)"
+        )
+
+    thread = threading.Thread(target=warmup, name="skey_warmup", daemon=True)
+    setattr(ops, "g_skey_warmup_thread", thread)
+    thread.start()
+
+
+def cardano_native_skey_warmup_join(ops: lib.objects.OpsState) -> None:
+    """ Waits for the skey warm-up, if started, and merges its skeys into the caches and sets ops state """
+
+    with ops.g_skey_warmup_lock:
+        thread = ops.g_skey_warmup_thread
+        if thread is None:
+            return
+        thread.join()
+
+        # Skeys derived lazily meanwhile are kept, as are their derivation paths
+        for address, (account_ix, address_ix, skey) in ops.g_skey_warmup_skeys.items():
+            getattr(ops, "g_cardano_cli_skeys").setdefault(address, skey)
+            getattr(ops, "g_wallet_db_address_drvs").setdefault(
+                address, {"account_ix": account_ix, "address_ix": address_ix}
+            )
+        setattr(ops, "g_skey_warmup_skeys", {})
+        setattr(ops, "g_skey_warmup_thread", None)
+
+
+def cardano_native_tx_id(tx_body: bytes) -> str:
+    """ Returns the transaction id of a serialized transaction body """
+
+    # The tx_id is the Blake2b-256 hash of the body only, so witnesses do not affect it
+    return lib.tx.tx_body_hash(tx_body).hex()
+
+
+def cardano_native_tx_sign(
+    ops: lib.objects.OpsState,
+    tx_body: bytes,
+    addresses: List[str],
+    witness_keys: List[str],
+) -> str:
+    """ Natively signs a raw transaction body with Byron bootstrap witnesses """
+
+    logger = ops.g_logger
+
+    tx_body_hash = lib.tx.tx_body_hash(tx_body)
+    try:
+        witnesses = [
+            lib.tx.tx_bootstrap_witness(
+                lib.cbor.cbor_decode(binascii.unhexlify(json.loads(skey)["cborHex"])),
+                address,
+                tx_body_hash,
+            )
+            for skey, address in zip(witness_keys, addresses)
+        ]
+    except Exception:
+        logger.error("ERROR: Unable to create a bootstrap witness for the Tx.")
+        sys.exit(1)
+
+    tx_signed = lib.tx.tx_signed_envelope(lib.tx.tx_signed_build(tx_body, witnesses))
+
+    return tx_signed
+
+
+def cardano_native_tx_witness(
+    ops: lib.objects.OpsState, tx: Dict[str, Any], witness_keys: List[str]
+) -> None:
+    """ Signs a transaction body with its witness skeys and obtains the transaction id """
+
+    logger = ops.g_logger
+
+    # Sign the raw transaction and obtain the transaction id
+    timer = time.time()
+    tx_signed = cardano_native_tx_sign(
+        ops, tx["body"], tx["input_addresses"], witness_keys
+    )
+    tx_id = cardano_native_tx_id(tx["body"])
+
+    if ops.g_cli_check:
+        cardano_cli_tx_sign_check(
+            ops, tx["draft"], tx["input_addresses"], witness_keys, tx_signed, tx_id
+        )
+
+    if ops.g_timers:
+        logger.info(
+            f"Time to sign the tx and obtain a tx_id: {lib.utility.time_delta_to_str(time.time() - timer)}"
+        )
+
+    tx["signed"] = tx_signed
+    tx["id"] = tx_id
+
+
+def cardano_native_witness_skeys(
+    ops: lib.objects.OpsState, addresses: List[str]
+) -> List[str]:
+    """ Obtains the witness skeys for a list of addresses and sets ops state """
+
+    # The warm-up skeys are merged in before the caches are first read for signing
+    if ops.g_skey_warmup_thread is not None:
+        cardano_native_skey_warmup_join(ops)
+
+    g_lookup_hits_cli_skey = ops.g_lookup_hits_cli_skey
+
+    # Generate the witness skeys
+    if addresses == [ops.g_shelley_address]:
+        witness_keys = [ops.g_shelley_skey]
+    else:
+        # Resolve the derivation paths of all unknown addresses in a single pass
+        cardano_native_address_inspect(
+            ops,
+            [
+                address
+                for address in addresses
+                if address not in ops.g_cardano_cli_skeys
+                and address not in ops.g_wallet_db_address_drvs
+            ],
+        )
+
+        witness_keys = []
+        for address in addresses:
+            # See if the skey already exists for this address in the lookup table
+            if address in ops.g_cardano_cli_skeys:
+                witness_keys.append(ops.g_cardano_cli_skeys[address])
+                g_lookup_hits_cli_skey += 1
+            else:
+                account_index, address_index = cardano_address_inspect(
+                    ops, ops.g_shelley_root_pub, address
+                )
+
+                # Derive the child key and skey natively to avoid subprocess overhead
+                address_skey = cardano_native_child_skey_gen(
+                    ops, account_index, address_index
+                )
+
+                # For debug, cardano-address and cardano-cli can be used instead at the cost of performance
+                #
+                # address_skey = cardano_address_child_prv_and_skey_gen(
+                #     ops, ops.g_shelley_root_prv, account_index, address_index
+                # )
+                #
+                # or as individual commands:
+                #
+                # address_prv = cardano_address_gen_child_prv(
+                #     ops,
+                #     ops.g_shelley_root_prv, account_index, address_index
+                # )
+                # address_skey = cardano_cli_gen_byron_skey(ops, address_prv)
+                witness_keys.append(address_skey)
+                getattr(ops, "g_cardano_cli_skeys")[address] = address_skey
+        setattr(ops, "g_lookup_hits_cli_skey", g_lookup_hits_cli_skey)
+
+    return witness_keys
+
+
+def cardano_node_tx_submit(
+    ops: lib.objects.OpsState, txs: List[Dict[str, Any]]
+) -> None:
+    """ Submits signed transactions over the node socket and sets each tx's submit result """
+
+    logger = ops.g_logger
+
+    timer = time.time()
+    results = lib.node.node_tx_submit(
+        ops, [bytes.fromhex(json.loads(tx["signed"])["cborHex"]) for tx in txs]
+    )
+    for tx, result in zip(txs, results):
+        tx["submit_result"] = result
+
+    if ops.g_timers and len(txs) > 1:
+        logger.info(
+            f"Time to submit {len(txs)} pipelined txs to the node: {lib.utility.time_delta_to_str(time.time() - timer)}"
+        )
@@ -0,0 +1,193 @@
+from typing import Any, Dict, List, NamedTuple, Tuple
+import struct
+
+
+class CborTag(NamedTuple):
+    """ A CBOR tagged data item (major type 6) """
+
+    tag: int
+    value: Any
+
+
+class CborRaw(bytes):
+    """ Pre-encoded CBOR bytes which are emitted verbatim by cbor_encode """
+
+
+CBOR_NULL_BYTE: bytes = b"\xf6"
+CBOR_BREAK: int = 0xFF
+
+
+def cbor_head(major: int, argument: int) -> bytes:
+    """ Returns the CBOR initial byte(s) for a major type and argument """
+
+    if argument < 24:
+        return bytes([(major << 5) | argument])
+    elif argument < 2 ** 8:
+        return bytes([(major << 5) | 24, argument])
+    elif argument < 2 ** 16:
+        return bytes([(major << 5) | 25]) + struct.pack(">H", argument)
+    elif argument < 2 ** 32:
+        return bytes([(major << 5) | 26]) + struct.pack(">I", argument)
+    elif argument < 2 ** 64:
+        return bytes([(major << 5) | 27]) + struct.pack(">Q", argument)
+    else:
+        raise ValueError(f"CBOR argument out of range: {argument}")
+
+
+def cbor_head_len(argument: int) -> int:
+    """ Returns the serialized size of a CBOR head for a given argument """
+
+    if argument < 24:
+        return 1
+    elif argument < 2 ** 8:
+        return 2
+    elif argument < 2 ** 16:
+        return 3
+    elif argument < 2 ** 32:
+        return 5
+    else:
+        return 9
+
+
+def cbor_bytes_len(length: int) -> int:
+    """ Returns the serialized size of a CBOR byte string of a given length """
+
+    return cbor_head_len(length) + length
+
+
+def cbor_encode(value: Any) -> bytes:
+    """ Encodes a python value as canonical definite length CBOR """
+
+    if isinstance(value, CborRaw):
+        return bytes(value)
+    elif value is None:
+        return CBOR_NULL_BYTE
+    elif value is True:
+        return b"\xf5"
+    elif value is False:
+        return b"\xf4"
+    elif isinstance(value, int):
+        if value >= 0:
+            return cbor_head(0, value)
+        else:
+            return cbor_head(1, -1 - value)
+    elif isinstance(value, (bytes, bytearray)):
+        return cbor_head(2, len(value)) + bytes(value)
+    elif isinstance(value, str):
+        encoded = value.encode()
+        return cbor_head(3, len(encoded)) + encoded
+    elif isinstance(value, CborTag):
+        return cbor_head(6, value.tag) + cbor_encode(value.value)
+    elif isinstance(value, (list, tuple)):
+        return cbor_head(4, len(value)) + b"".join(cbor_encode(x) for x in value)
+    elif isinstance(value, dict):
+        return cbor_head(5, len(value)) + b"".join(
+            cbor_encode(k) + cbor_encode(v) for k, v in value.items()
+        )
+    else:
+        raise ValueError(f"Unsupported type for CBOR encoding: {type(value)}")
+
+
+def cbor_decode_head(data: bytes, offset: int) -> Tuple[int, int, int, int]:
+    """ Decodes a CBOR head and returns (major, additional info, argument, offset) """
+
+    try:
+        initial = data[offset]
+    except IndexError:
+        raise ValueError("Truncated CBOR data item")
+    major = initial >> 5
+    info = initial & 0x1F
+    offset += 1
+    if info < 24:
+        return major, info, info, offset
+    elif info in (24, 25, 26, 27):
+        size = 1 << (info - 24)
+        if offset + size > len(data):
+            raise ValueError("Truncated CBOR head")
+        argument = int.from_bytes(data[offset : offset + size], "big")
+        return major, info, argument, offset + size
+    elif info == 31:
+        return major, info, -1, offset
+    else:
+        raise ValueError(f"Reserved CBOR additional info: {info}")
+
+
+def cbor_decode_item(data: bytes, offset: int = 0) -> Tuple[Any, int]:
+    """ Decodes a single CBOR data item at offset and returns (value, offset) """
+
+    major, info, argument, offset = cbor_decode_head(data, offset)
+
+    if major == 0:
+        return argument, offset
+    elif major == 1:
+        return -1 - argument, offset
+    elif major in (2, 3):
+        if info == 31:
+            chunks = []
+            while data[offset] != CBOR_BREAK:
+                chunk, offset = cbor_decode_item(data, offset)
+                chunks.append(chunk)
+            offset += 1
+            return (b"" if major == 2 else "").join(chunks), offset
+        if offset + argument > len(data):
+            raise ValueError("Truncated CBOR string")
+        raw = data[offset : offset + argument]
+        return (raw if major == 2 else raw.decode()), offset + argument
+    elif major == 4:
+        items: List[Any] = []
+        if info == 31:
+            while data[offset] != CBOR_BREAK:
+                item, offset = cbor_decode_item(data, offset)
+                items.append(item)
+            return items, offset + 1
+        for _ in range(argument):
+            item, offset = cbor_decode_item(data, offset)
+            items.append(item)
+        return items, offset
+    elif major == 5:
+        entries: Dict[Any, Any] = {}
+        count = 0
+        while (info == 31 and data[offset] != CBOR_BREAK) or (
+            info != 31 and count < argument
+        ):
+            key, offset = cbor_decode_item(data, offset)
+            entry, offset = cbor_decode_item(data, offset)
+            # Compound keys such as tx inputs are made hashable
+            entries[tuple(key) if isinstance(key, list) else key] = entry
+            count += 1
+        return entries, (offset + 1 if info == 31 else offset)
+    elif major == 6:
+        item, offset = cbor_decode_item(data, offset)
+        return CborTag(argument, item), offset
+    else:
+        if info == 20:
+            return False, offset
+        elif info == 21:
+            return True, offset
+        elif info in (22, 23):
+            return None, offset
+        elif info == 25:
+            return struct.unpack(">e", argument.to_bytes(2, "big"))[0], offset
+        elif info == 26:
+            return struct.unpack(">f", argument.to_bytes(4, "big"))[0], offset
+        elif info == 27:
+            return struct.unpack(">d", argument.to_bytes(8, "big"))[0], offset
+        return argument, offset
+
+
+def cbor_decode(data: bytes) -> Any:
+    """ Decodes a complete CBOR byte string into python values """
+
+    value, offset = cbor_decode_item(data, 0)
+    if offset != len(data):
+        raise ValueError(
+            f"Trailing bytes after CBOR data item: {len(data) - offset} bytes"
+        )
+
+    return value
+
+
+def cbor_skip_item(data: bytes, offset: int) -> int:
+    """ Returns the offset just past the CBOR data item at offset """
+
+    return cbor_decode_item(data, offset)[1]
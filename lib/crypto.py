@@ -0,0 +1,237 @@
+from typing import List, Tuple
+import hashlib
+import hmac
+import lib.cbor
+import nacl.bindings
+import nacl.exceptions
+import os
+
+
+BECH32_CHARSET: str = "qpzry9x8gf2tvdw0s3jn54khce6mua7l"
+ED25519_ORDER: int = 2 ** 252 + 27742317777372353535851937790883648493
+HARDENED_OFFSET: int = 2 ** 31
+CACHE_KEY_CONTEXT: bytes = b"defrag-ops key cache"
+CACHE_NONCE_SIZE: int = 12
+HD_PASSPHRASE_ITERATIONS: int = 500
+HD_PASSPHRASE_SALT: bytes = b"address-hashing"
+HD_PAYLOAD_NONCE: bytes = b"serokellfore"
+
+
+def crypto_bech32_polymod(values: List[int]) -> int:
+    """ Computes the bech32 checksum polymod over a list of 5 bit values """
+
+    generator = [0x3B6A57B2, 0x26508E6D, 0x1EA119FA, 0x3D4233DD, 0x2A1462B3]
+    checksum = 1
+    for value in values:
+        top = checksum >> 25
+        checksum = (checksum & 0x1FFFFFF) << 5 ^ value
+        for i in range(5):
+            checksum ^= generator[i] if ((top >> i) & 1) else 0
+
+    return checksum
+
+
+def crypto_bech32_hrp_expand(hrp: str) -> List[int]:
+    """ Expands a bech32 human readable part for checksum computation """
+
+    return [ord(x) >> 5 for x in hrp] + [0] + [ord(x) & 31 for x in hrp]
+
+
+def crypto_bech32_convert_bits(
+    data: List[int], from_bits: int, to_bits: int, pad: bool = True
+) -> List[int]:
+    """ Regroups a list of from_bits sized integers into to_bits sized integers """
+
+    accumulator = 0
+    bits = 0
+    result = []
+    max_value = (1 << to_bits) - 1
+    for value in data:
+        accumulator = (accumulator << from_bits) | value
+        bits += from_bits
+        while bits >= to_bits:
+            bits -= to_bits
+            result.append((accumulator >> bits) & max_value)
+    if pad and bits:
+        result.append((accumulator << (to_bits - bits)) & max_value)
+    elif not pad and (
+        bits >= from_bits or ((accumulator << (to_bits - bits)) & max_value)
+    ):
+        raise ValueError("Invalid bech32 padding")
+
+    return result
+
+
+def crypto_bech32_decode(bech: str) -> Tuple[str, bytes]:
+    """ Decodes a bech32 string of any length and returns (hrp, data) """
+
+    bech = bech.strip()
+    if bech.lower() != bech and bech.upper() != bech:
+        raise ValueError("Mixed case bech32 string")
+    bech = bech.lower()
+    separator = bech.rfind("1")
+    if separator < 1 or separator + 7 > len(bech):
+        raise ValueError("Invalid bech32 separator position")
+    hrp = bech[:separator]
+    try:
+        values = [BECH32_CHARSET.index(x) for x in bech[separator + 1 :]]
+    except ValueError:
+        raise ValueError("Invalid bech32 character")
+    if crypto_bech32_polymod(crypto_bech32_hrp_expand(hrp) + values) != 1:
+        raise ValueError("Invalid bech32 checksum")
+
+    return hrp, bytes(crypto_bech32_convert_bits(values[:-6], 5, 8, pad=False))
+
+
+def crypto_bech32_encode(hrp: str, data: bytes) -> str:
+    """ Encodes data as a bech32 string of any length """
+
+    values = crypto_bech32_convert_bits(list(data), 8, 5)
+    polymod = (
+        crypto_bech32_polymod(crypto_bech32_hrp_expand(hrp) + values + [0] * 6) ^ 1
+    )
+    checksum = [(polymod >> 5 * (5 - i)) & 31 for i in range(6)]
+
+    return hrp + "1" + "".join([BECH32_CHARSET[x] for x in values + checksum])
+
+
+def crypto_cache_key(root_xprv: bytes) -> bytes:
+    """ Derives the persistent key cache encryption key from the root extended private key """
+
+    return hmac.new(root_xprv, CACHE_KEY_CONTEXT, hashlib.sha512).digest()[0:32]
+
+
+def crypto_cache_open(key: bytes, aad: bytes, sealed: bytes) -> bytes:
+    """ Authenticates and decrypts a sealed key cache entry bound to aad """
+
+    try:
+        return nacl.bindings.crypto_aead_chacha20poly1305_ietf_decrypt(
+            sealed[CACHE_NONCE_SIZE:], aad, sealed[0:CACHE_NONCE_SIZE], key
+        )
+    except nacl.exceptions.CryptoError:
+        raise ValueError("Key cache entry failed authentication")
+
+
+def crypto_cache_seal(key: bytes, aad: bytes, plaintext: bytes) -> bytes:
+    """ Encrypts and authenticates a key cache entry bound to aad and returns nonce || ciphertext """
+
+    nonce = os.urandom(CACHE_NONCE_SIZE)
+
+    return nonce + nacl.bindings.crypto_aead_chacha20poly1305_ietf_encrypt(
+        plaintext, aad, nonce, key
+    )
+
+
+def crypto_ed25519_public_key(kl: bytes) -> bytes:
+    """ Returns the ed25519 public key for the left half of an extended private key """
+
+    # Extended keys are already clamped, so the scalar is only reduced, not hashed
+    scalar = nacl.bindings.crypto_core_ed25519_scalar_reduce(kl + bytes(32))
+
+    return nacl.bindings.crypto_scalarmult_ed25519_base_noclamp(scalar)
+
+
+def crypto_hd_passphrase(xpub: bytes) -> bytes:
+    """ Derives the Byron HD payload passphrase from a 64 byte root extended public key """
+
+    return hashlib.pbkdf2_hmac(
+        "sha512", xpub, HD_PASSPHRASE_SALT, HD_PASSPHRASE_ITERATIONS, 32
+    )
+
+
+def crypto_hd_payload_encrypt(passphrase: bytes, path: List[int]) -> bytes:
+    """ Encrypts a derivation path as a Byron HD address payload """
+
+    # The path is serialized as an indefinite length CBOR list, as cardano-sl does
+    plaintext = b"\x9f" + b"".join([lib.cbor.cbor_encode(x) for x in path]) + b"\xff"
+
+    return nacl.bindings.crypto_aead_chacha20poly1305_ietf_encrypt(
+        plaintext, None, HD_PAYLOAD_NONCE, passphrase
+    )
+
+
+def crypto_hd_payload_decrypt(passphrase: bytes, payload: bytes) -> List[int]:
+    """ Decrypts a Byron HD address payload and returns the derivation path """
+
+    # The payload is ChaCha20-Poly1305 encrypted CBOR of the path as a list of uint32
+    try:
+        plaintext = nacl.bindings.crypto_aead_chacha20poly1305_ietf_decrypt(
+            payload, None, HD_PAYLOAD_NONCE, passphrase
+        )
+    except nacl.exceptions.CryptoError:
+        raise ValueError("Unable to decrypt the HD payload with this passphrase")
+    path = lib.cbor.cbor_decode(plaintext)
+    if not isinstance(path, list) or not all(isinstance(x, int) for x in path):
+        raise ValueError(f"Unexpected HD payload derivation path: {path}")
+
+    return path
+
+
+def crypto_index_parse(index: str) -> int:
+    """ Parses a cardano-address style derivation index such as "14H" """
+
+    if index.endswith("H"):
+        return int(index[:-1], 10) + HARDENED_OFFSET
+    else:
+        return int(index, 10)
+
+
+def crypto_xprv_child_v1(xprv: bytes, index: int) -> bytes:
+    """ Derives a hardened Byron (derivation scheme V1) child of a 96 byte extended private key """
+
+    # Extended private keys are kL (32) || kR (32) || chain code (32)
+    if index < HARDENED_OFFSET:
+        raise ValueError(f"Only hardened derivation is supported: {index}")
+    kl, kr, chain_code = xprv[0:32], xprv[32:64], xprv[64:96]
+
+    # Derivation scheme V1 serializes the index big endian
+    data = kl + kr + index.to_bytes(4, "big")
+    z = hmac.new(chain_code, b"\x00" + data, hashlib.sha512).digest()
+    child_chain_code = hmac.new(chain_code, b"\x01" + data, hashlib.sha512).digest()
+    child_chain_code = child_chain_code[32:]
+
+    # Derivation scheme V1 multiplies zL by 8 and adds zR bytewise, both without
+    # carry, while kL is added modulo the curve order
+    zl8 = bytes([(x << 3) & 0xFF for x in z[0:32]])
+    child_kl = (
+        (int.from_bytes(zl8, "little") + int.from_bytes(kl, "little")) % ED25519_ORDER
+    ).to_bytes(32, "little")
+    child_kr = bytes([(x + y) & 0xFF for x, y in zip(z[32:64], kr)])
+
+    return child_kl + child_kr + child_chain_code
+
+
+def crypto_xprv_derive_v1(xprv: bytes, path: List[int]) -> bytes:
+    """ Derives a Byron (derivation scheme V1) extended private key along a path """
+
+    for index in path:
+        xprv = crypto_xprv_child_v1(xprv, index)
+
+    return xprv
+
+
+def crypto_xprv_to_signing_key(xprv: bytes) -> bytes:
+    """ Expands a 96 byte extended private key to the 128 byte cardano-crypto XPrv """
+
+    # cardano-crypto XPrv is kL (32) || kR (32) || public key (32) || chain code (32)
+    return xprv[0:64] + crypto_ed25519_public_key(xprv[0:32]) + xprv[64:96]
+
+
+def crypto_ed25519_sign_extended(signing_key: bytes, message: bytes) -> bytes:
+    """ Signs a message with a 128 byte cardano-crypto XPrv and returns the signature """
+
+    # Ed25519 signing with a pre-expanded secret: kL is the scalar and kR the nonce prefix
+    kl, kr, public_key = signing_key[0:32], signing_key[32:64], signing_key[64:96]
+    r = int.from_bytes(hashlib.sha512(kr + message).digest(), "little") % ED25519_ORDER
+    r_point = nacl.bindings.crypto_scalarmult_ed25519_base_noclamp(
+        r.to_bytes(32, "little")
+    )
+    h = (
+        int.from_bytes(
+            hashlib.sha512(r_point + public_key + message).digest(), "little"
+        )
+        % ED25519_ORDER
+    )
+    s = (r + h * int.from_bytes(kl, "little")) % ED25519_ORDER
+
+    return r_point + s.to_bytes(32, "little")
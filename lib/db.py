@@ -1,10 +1,191 @@
+from typing import Any, Dict, List, Tuple, Union
+import binascii
+import hashlib
+import json
+import lib.cardano
+import lib.cbor
+import lib.crypto
 import lib.utility
 import logging
+import os
+import re
+import shlex
 import sqlite3
 import sys
 import time
 
 
+# Compound input filter SQL, keyed by filter TARGET, METHOD and boolean operator
+FILTER_SQL_COLUMNS: Dict[str, str] = {
+    "utxo": "(utxo.input_tx_id || '#' || utxo.input_index)",
+    "address": "utxo.output_address",
+    "lovelace": "utxo.output_coin",
+    "account_ix": "(address_table.account_ix % 2147483648)",
+    "address_ix": "(address_table.address_ix % 2147483648)",
+}
+FILTER_SQL_COMPARISONS: Dict[str, str] = {
+    "eq": "=",
+    "ne": "!=",
+    "gt": ">",
+    "gte": ">=",
+    "lt": "<",
+    "lte": "<=",
+}
+FILTER_SQL_OPERATORS: Dict[str, int] = {"or": 0, "and": 1}
+
+
+def key_cache_read(ops: lib.objects.OpsState) -> None:
+    """ Loads derivation paths and skeys from the encrypted persistent key cache and sets ops state """
+
+    logger = ops.g_logger
+
+    if not ops.g_key_cache_path:
+        return
+
+    timer = time.time()
+    key = lib.crypto.crypto_cache_key(ops.g_shelley_root_xprv)
+    db = key_cache_conn(ops)
+    try:
+        cur = db.cursor()
+        cur.execute(
+            "SELECT address_id, payload FROM key_cache WHERE wallet_id = ?",
+            (ops.g_wallet_id,),
+        )
+        rows = cur.fetchall()
+    except sqlite3.Error:
+        logger.exception(
+            "ERROR: An sqlite3 database exception occurred while attempting to read the key cache."
+        )
+        sys.exit(1)
+
+    # Entries which fail authentication were written with other mnemonics or were
+    # tampered with, so they are evicted rather than trusted
+    invalid = []
+    g_key_cache_addresses = set()
+    for address_id, payload in rows:
+        try:
+            address, account_ix, address_ix, signing_key = lib.cbor.cbor_decode(
+                lib.crypto.crypto_cache_open(
+                    key, ops.g_wallet_id.encode() + address_id, payload
+                )
+            )
+        except ValueError:
+            invalid.append((ops.g_wallet_id, address_id))
+            continue
+        getattr(ops, "g_cardano_cli_skeys")[
+            address
+        ] = lib.cardano.cardano_native_skey_envelope(signing_key)
+        if address not in ops.g_wallet_db_address_drvs:
+            getattr(ops, "g_wallet_db_address_drvs")[address] = {
+                "account_ix": account_ix,
+                "address_ix": address_ix,
+            }
+        g_key_cache_addresses.add(address)
+    setattr(ops, "g_key_cache_addresses", g_key_cache_addresses)
+
+    if invalid:
+        logger.warning(
+            f"WARNING: Evicting {len(invalid)} key cache entries which failed authentication."
+        )
+        try:
+            db.executemany(
+                "DELETE FROM key_cache WHERE wallet_id = ? AND address_id = ?", invalid
+            )
+            db.commit()
+        except sqlite3.Error:
+            logger.exception(
+                "ERROR: An sqlite3 database exception occurred while attempting to evict key cache entries."
+            )
+            sys.exit(1)
+    db.close()
+
+    if ops.g_timers:
+        logger.info(
+            f"Time to load {len(g_key_cache_addresses)} key cache entries: {lib.utility.time_delta_to_str(time.time() - timer)}"
+        )
+
+
+def key_cache_conn(ops: lib.objects.OpsState) -> sqlite3.Connection:
+    """ Opens the persistent key cache, creating it owner read/write only if needed """
+
+    logger = ops.g_logger
+
+    try:
+        os.close(os.open(ops.g_key_cache_path, os.O_CREAT | os.O_WRONLY, 0o600))
+        db = sqlite3.connect(ops.g_key_cache_path)
+        db.execute(
+            "CREATE TABLE IF NOT EXISTS key_cache (wallet_id TEXT NOT NULL, address_id BLOB NOT NULL, "
+            + "created REAL NOT NULL, payload BLOB NOT NULL, PRIMARY KEY (wallet_id, address_id))"
+        )
+    except (OSError, sqlite3.Error):
+        logger.exception(
+            f"ERROR: Unable to open the key cache at {ops.g_key_cache_path}"
+        )
+        sys.exit(1)
+
+    return db
+
+
+def key_cache_write(ops: lib.objects.OpsState) -> None:
+    """ Persists newly derived skeys to the encrypted key cache and evicts the oldest entries """
+
+    logger = ops.g_logger
+
+    if not ops.g_key_cache_path:
+        return
+
+    timer = time.time()
+    key = lib.crypto.crypto_cache_key(ops.g_shelley_root_xprv)
+    created = time.time()
+    rows = []
+    for address, skey in list(ops.g_cardano_cli_skeys.items()):
+        drv = ops.g_wallet_db_address_drvs.get(address)
+        if address in ops.g_key_cache_addresses or drv is None:
+            continue
+
+        # Addresses are only stored encrypted; the row id is a keyed hash
+        address_id = hashlib.blake2b(address.encode(), key=key, digest_size=32).digest()
+        payload = lib.cbor.cbor_encode(
+            [
+                address,
+                drv["account_ix"],
+                drv["address_ix"],
+                lib.cbor.cbor_decode(binascii.unhexlify(json.loads(skey)["cborHex"])),
+            ]
+        )
+        rows.append(
+            (
+                ops.g_wallet_id,
+                address_id,
+                created,
+                lib.crypto.crypto_cache_seal(
+                    key, ops.g_wallet_id.encode() + address_id, payload
+                ),
+            )
+        )
+
+    db = key_cache_conn(ops)
+    try:
+        db.executemany("INSERT OR REPLACE INTO key_cache VALUES (?, ?, ?, ?)", rows)
+        db.execute(
+            "DELETE FROM key_cache WHERE wallet_id = ? AND address_id NOT IN "
+            + "(SELECT address_id FROM key_cache WHERE wallet_id = ? ORDER BY created DESC LIMIT ?)",
+            (ops.g_wallet_id, ops.g_wallet_id, ops.KEY_CACHE_MAX_ENTRIES),
+        )
+        db.commit()
+    except sqlite3.Error:
+        logger.exception(
+            "ERROR: An sqlite3 database exception occurred while attempting to write the key cache."
+        )
+        sys.exit(1)
+    db.close()
+
+    if ops.g_timers:
+        logger.info(
+            f"Time to persist {len(rows)} new key cache entries: {lib.utility.time_delta_to_str(time.time() - timer)}"
+        )
+
+
 def sqlite3_db_conn(logger: logging.Logger, path: str) -> sqlite3.Connection:
     """ Create a database connection to an sqlite3 database """
 
@@ -17,6 +198,142 @@ def sqlite3_db_conn(logger: logging.Logger, path: str) -> sqlite3.Connection:
     return db
 
 
+def wallet_db_filter_clause(ops: lib.objects.OpsState) -> Tuple[str, List[Any], bool]:
+    """ Returns the SQL clause, parameters and address index join need of all defrag input filters """
+
+    clauses = []
+    params: List[Any] = []
+    indices = False
+
+    # A `--filter` removes matching inputs, so it is pushed down negated
+    if ops.g_filter_tx_in:
+        clause, clause_params = wallet_db_filter_predicate(
+            ops.g_filter_tx_in_target,
+            ops.g_filter_tx_in_method,
+            str(ops.g_filter_tx_in_expr),
+        )
+        clauses.append(f"NOT {clause}")
+        params.extend(clause_params)
+
+    # A `--where` expression keeps matching inputs
+    if ops.g_filter_where:
+        clause, clause_params, indices = wallet_db_filter_compile(ops.g_filter_where)
+        clauses.append(clause)
+        params.extend(clause_params)
+
+    return " AND ".join(clauses), params, indices
+
+
+def wallet_db_filter_compile(expression: str) -> Tuple[str, List[Any], bool]:
+    """ Compiles a compound input filter expression and returns (sql_clause, params, indices) """
+
+    # Parentheses are tokens of their own and quoted values are kept whole; "#" is
+    # part of utxo values rather than the start of a comment
+    lexer = shlex.shlex(expression, posix=True, punctuation_chars="()")
+    lexer.whitespace_split = True
+    lexer.commenters = ""
+    try:
+        tokens = list(lexer)
+    except ValueError as e:
+        raise ValueError(f"Unable to tokenize the filter expression: {e}")
+    if not tokens:
+        raise ValueError("The filter expression is empty")
+
+    clause, params, offset = wallet_db_filter_parse(tokens, 0)
+    if offset != len(tokens):
+        raise ValueError(f'Unexpected filter expression token: "{tokens[offset]}"')
+    indices = any(token in ["account_ix", "address_ix"] for token in tokens)
+
+    return clause, params, indices
+
+
+def wallet_db_filter_parse(
+    tokens: List[str], offset: int, precedence: int = 0
+) -> Tuple[str, List[Any], int]:
+    """ Parses a filter expression at offset, binding operators of at least precedence """
+
+    # Precedence from loosest to tightest is: or, and, not, then a parenthesized
+    # expression or a single TARGET METHOD VALUE predicate
+    if offset >= len(tokens):
+        raise ValueError("The filter expression ends unexpectedly")
+    token = tokens[offset]
+    if token.lower() == "not":
+        clause, params, offset = wallet_db_filter_parse(tokens, offset + 1, 2)
+        clause = f"NOT {clause}"
+    elif token == "(":
+        clause, params, offset = wallet_db_filter_parse(tokens, offset + 1)
+        if offset >= len(tokens) or tokens[offset] != ")":
+            raise ValueError("The filter expression has an unclosed parenthesis")
+        offset += 1
+    elif offset + 2 < len(tokens):
+        clause, params = wallet_db_filter_predicate(*tokens[offset : offset + 3])
+        offset += 3
+    else:
+        raise ValueError(f'Incomplete filter predicate: "{" ".join(tokens[offset:])}"')
+
+    while offset < len(tokens):
+        operator = tokens[offset].lower()
+        operator_precedence = FILTER_SQL_OPERATORS.get(operator, -1)
+        if operator_precedence < precedence:
+            break
+        right, right_params, offset = wallet_db_filter_parse(
+            tokens, offset + 1, operator_precedence + 1
+        )
+        clause = f"({clause} {operator.upper()} {right})"
+        params = params + right_params
+
+    return clause, params, offset
+
+
+def wallet_db_filter_predicate(
+    target: str, method: str, value: str
+) -> Tuple[str, List[Any]]:
+    """ Translates a single TARGET METHOD VALUE filter predicate to parameterized SQL """
+
+    if target not in FILTER_SQL_COLUMNS:
+        raise ValueError(
+            f'Filter TARGET must be one of {", ".join(FILTER_SQL_COLUMNS)}: {target}'
+        )
+    column = FILTER_SQL_COLUMNS[target]
+
+    # Inputs whose address is not a wallet rnd address have no indices, so predicates
+    # are coalesced to false to keep NOT from propagating an SQL NULL
+    if method == "re":
+        try:
+            re.compile(value)
+        except re.error as e:
+            raise ValueError(f"Invalid python regular expression {value}: {e}")
+        return f"COALESCE({column} REGEXP ?, 0)", [value]
+    elif method == "in":
+        bounds = value.split("..")
+        try:
+            low, high = [int(bound, 10) for bound in bounds]
+        except ValueError:
+            raise ValueError(
+                f"Filter METHOD in requires an integer LOW..HIGH range: {value}"
+            )
+        if target in ["utxo", "address"] or low < 0 or low > high:
+            raise ValueError(f"Invalid filter range for {target}: {value}")
+        return f"COALESCE({column} BETWEEN ? AND ?, 0)", [low, high]
+    elif method in FILTER_SQL_COMPARISONS:
+        if target in ["utxo", "address"]:
+            if method not in ["eq", "ne"]:
+                raise ValueError(
+                    f'Filter TARGET {target} must use a METHOD of "re", "eq" or "ne": {method}'
+                )
+            param: Union[int, str] = value
+        else:
+            try:
+                param = int(value, 10)
+            except ValueError:
+                raise ValueError(f"Filter TARGET {target} requires an integer: {value}")
+        return f"COALESCE({column} {FILTER_SQL_COMPARISONS[method]} ?, 0)", [param]
+    else:
+        raise ValueError(
+            f'Filter METHOD must be one of "re", "in", {", ".join(FILTER_SQL_COMPARISONS)}: {method}'
+        )
+
+
 def wallet_db_query_address_count(
     ops: lib.objects.OpsState, db: sqlite3.Connection
 ) -> None:
@@ -63,29 +380,51 @@ def wallet_db_query_utxo(ops: lib.objects.OpsState, db: sqlite3.Connection) -> N
     logger = ops.g_logger
 
     timer = time.time()
+
+    # Defrag input filters are evaluated by sqlite so filtered rows never reach python;
+    # frag inputs come from the bootstrap address and are filtered in python instead
+    clause, params, indices = (
+        ("", [], False) if ops.g_frag else wallet_db_filter_clause(ops)
+    )
+    join = (
+        "LEFT JOIN (SELECT address, account_ix, address_ix FROM rnd_state_address WHERE slot = (SELECT max(slot) FROM rnd_state_address) "
+        + "UNION SELECT address, account_ix, address_ix FROM rnd_state_pending_address) AS address_table "
+        + "ON address_table.address = utxo.output_address "
+        if indices
+        else ""
+    )
     try:
+        db.create_function("REGEXP", 2, wallet_db_regexp, deterministic=True)
         cur = db.cursor()
         cur.execute(
-            "WITH utxo_table AS (SELECT input_tx_id || '#' || input_index as utxo, output_coin, output_address FROM utxo WHERE slot = (SELECT max(slot) FROM utxo)), "
+            "WITH utxo_table AS (SELECT utxo.input_tx_id || '#' || utxo.input_index as utxo, utxo.output_coin, utxo.output_address FROM utxo "
+            + f"{join}WHERE utxo.slot = (SELECT max(slot) FROM utxo){' AND ' + clause if clause else ''}), "
             + "utxo_asset_table AS (SELECT tx_id || '#' || tx_index as utxo_asset FROM utxo_token WHERE slot = (SELECT max(slot) FROM utxo_token)) "
-            + "SELECT * FROM utxo_table where utxo NOT IN (SELECT DISTINCT utxo_asset FROM utxo_asset_table) ORDER BY output_coin ASC"
+            + "SELECT * FROM utxo_table where utxo NOT IN (SELECT DISTINCT utxo_asset FROM utxo_asset_table) ORDER BY output_coin ASC",
+            params,
         )
-        rows = cur.fetchall()
+
+        # Rows are streamed straight into columnar form rather than fetched as tuples
+        rows = lib.objects.UtxoStore.from_rows(cur)
     except sqlite3.Error:
         logger.exception(
             "ERROR: An sqlite3 database exception occurred while attempting to fetch tables rows."
         )
         sys.exit(1)
 
-    if len(rows) == 0:
+    # Wallet statistics cover every non-asset utxo, so a filtered query needs its own
+    # unfiltered totals; a filter matching nothing leaves an empty run, as before
+    stats = wallet_db_query_utxo_stats(ops, db) if clause else None
+    if len(rows) == 0 and (stats is None or stats[0] == 0):
         logger.error(f"ERROR: No UTxO found at {ops.g_wallet_db_path}")
         sys.exit(1)
 
     setattr(ops, "g_wallet_utxo", rows)
+    setattr(ops, "g_wallet_db_stats", stats)
 
     if ops.g_timers:
         logger.info(
-            f"Time to query wallet utxo state: {lib.utility.time_delta_to_str(time.time() - timer)}"
+            f"Time to query {'filtered ' if clause else ''}wallet utxo state: {lib.utility.time_delta_to_str(time.time() - timer)}"
         )
 
 
@@ -135,6 +474,37 @@ def wallet_db_query_utxo_asset(
         )
 
 
+def wallet_db_query_utxo_stats(
+    ops: lib.objects.OpsState, db: sqlite3.Connection
+) -> Tuple[int, int, int]:
+    """ Returns the unfiltered non-asset (utxo, address, lovelace) counts for the given sqlite3 database """
+
+    logger = ops.g_logger
+
+    timer = time.time()
+    try:
+        cur = db.cursor()
+        cur.execute(
+            "WITH utxo_table AS (SELECT input_tx_id || '#' || input_index as utxo, output_coin, output_address FROM utxo WHERE slot = (SELECT max(slot) FROM utxo)), "
+            + "utxo_asset_table AS (SELECT tx_id || '#' || tx_index as utxo_asset FROM utxo_token WHERE slot = (SELECT max(slot) FROM utxo_token)) "
+            + "SELECT COUNT(*), COUNT(DISTINCT output_address), COALESCE(SUM(output_coin), 0) FROM utxo_table "
+            + "WHERE utxo NOT IN (SELECT DISTINCT utxo_asset FROM utxo_asset_table)"
+        )
+        row = cur.fetchone()
+    except sqlite3.Error:
+        logger.exception(
+            "ERROR: An sqlite3 database exception occurred while attempting to fetch tables rows."
+        )
+        sys.exit(1)
+
+    if ops.g_timers:
+        logger.info(
+            f"Time to query unfiltered wallet utxo statistics: {lib.utility.time_delta_to_str(time.time() - timer)}"
+        )
+
+    return int(row[0]), int(row[1]), int(row[2])
+
+
 def wallet_db_read(ops: lib.objects.OpsState) -> None:
     """ Reads the required state from the cardano-wallet sqlite3 database and sets ops state """
 
@@ -145,3 +515,10 @@ def wallet_db_read(ops: lib.objects.OpsState) -> None:
         wallet_db_query_utxo(ops, db)
         wallet_db_query_utxo_asset(ops, db)
         wallet_db_query_address_count(ops, db)
+
+
+def wallet_db_regexp(pattern: str, value: Any) -> bool:
+    """ Implements the sqlite3 REGEXP operator with python regular expression search semantics """
+
+    # The re module caches compiled patterns, so each row only pays for the search
+    return value is not None and re.search(pattern, str(value)) is not None
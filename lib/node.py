@@ -0,0 +1,484 @@
+from typing import Any, cast, Dict, List, Tuple
+import binascii
+import lib.cbor
+import lib.crypto
+import lib.objects
+import lib.utility
+import select
+import socket
+import struct
+import sys
+import time
+
+
+# Ouroboros multiplexer segment header of (timestamp, mode | protocol id, length)
+NODE_MUX_HEADER: struct.Struct = struct.Struct(">IHH")
+NODE_MUX_RESPONDER: int = 0x8000
+NODE_MUX_SDU_SIZE: int = 12288
+
+# Node-to-client mini-protocol ids
+NODE_PROTOCOL_HANDSHAKE: int = 0
+NODE_PROTOCOL_CHAIN_SYNC: int = 5
+NODE_PROTOCOL_LOCAL_TX_SUBMISSION: int = 6
+NODE_PROTOCOL_LOCAL_STATE_QUERY: int = 7
+
+# NodeToClientV_4 through NodeToClientV_8, as supported by cardano-node 1.26, and
+# NodeToClientV_9, which adds the utxo by tx input query
+NODE_TO_CLIENT_VERSIONS: List[int] = [32772, 32773, 32774, 32775, 32776, 32777]
+NODE_TO_CLIENT_V8: int = 32776
+NODE_TO_CLIENT_V9: int = 32777
+
+# Hard fork combinator and Shelley based era ledger queries
+NODE_QUERY_CURRENT_ERA: List[Any] = [2, [1]]
+NODE_QUERY_ERA_HISTORY: List[Any] = [2, [0]]
+NODE_QUERY_EPOCH_NO: List[Any] = [1]
+NODE_QUERY_CURRENT_PPARAMS: List[Any] = [3]
+NODE_QUERY_UTXO_BY_ADDRESS: int = 6
+NODE_QUERY_UTXO_BY_TXIN: int = 15
+NODE_ERA_NAMES: List[str] = ["Byron", "Shelley", "Allegra", "Mary"]
+
+# CBOR tag for embedded serialized CBOR, which wraps transactions for submission
+NODE_CBOR_IN_CBOR_TAG: int = 24
+
+# Shelley era protocol parameters in ledger order, as named by cardano-cli
+NODE_PPARAMS_FIELDS: List[str] = [
+    "txFeePerByte",
+    "txFeeFixed",
+    "maxBlockBodySize",
+    "maxTxSize",
+    "maxBlockHeaderSize",
+    "keyDeposit",
+    "poolDeposit",
+    "poolRetireMaxEpoch",
+    "stakePoolTargetNum",
+    "poolPledgeInfluence",
+    "monetaryExpansion",
+    "treasuryCut",
+    "decentralisationParam",
+    "extraPraosEntropy",
+    "protocolVersionMajor",
+    "protocolVersionMinor",
+    "minUTxOValue",
+    "minPoolCost",
+]
+
+
+def node_address_bytes(address: str) -> bytes:
+    """ Returns the raw bytes of a base58 Byron or bech32 Shelley address """
+
+    if address.startswith("addr"):
+        return lib.crypto.crypto_bech32_decode(address)[1]
+    else:
+        return binascii.unhexlify(lib.utility.base58_decode(address))
+
+
+def node_address_render(address: bytes) -> str:
+    """ Renders raw address bytes the way cardano-cli does, base58 for Byron or bech32 """
+
+    # Byron addresses have a header type of 8; the low nibble is the network id otherwise
+    if address[0] >> 4 == 8:
+        return lib.utility.base58_encode(address.hex())
+    else:
+        return lib.crypto.crypto_bech32_encode(
+            "addr" if address[0] & 0x0F == 1 else "addr_test", address
+        )
+
+
+def node_chain_tip(ops: lib.objects.OpsState) -> Tuple[List[Any], int]:
+    """ Returns the node's chain tip (point, block number) using chain-sync """
+
+    logger = ops.g_logger
+
+    # MsgFindIntersect with no points always replies MsgIntersectNotFound with the tip
+    node_send(ops, NODE_PROTOCOL_CHAIN_SYNC, [4, []])
+    reply = node_recv(ops, NODE_PROTOCOL_CHAIN_SYNC)
+    if reply[0] == 6:
+        point, block_no = reply[1]
+    elif reply[0] == 5:
+        point, block_no = reply[2]
+    else:
+        logger.error(f"ERROR: Unexpected node chain-sync reply: {reply}")
+        sys.exit(1)
+
+    return point, block_no
+
+
+def node_close(ops: lib.objects.OpsState) -> None:
+    """ Ends the node-to-client session, if connected, and sets ops state """
+
+    with ops.g_node_lock:
+        if ops.g_node_socket is None:
+            return
+
+        # MsgDone ends the local-tx-submission protocol cleanly before disconnecting
+        try:
+            node_send(ops, NODE_PROTOCOL_LOCAL_TX_SUBMISSION, [3])
+        finally:
+            ops.g_node_socket.close()
+            setattr(ops, "g_node_socket", None)
+            setattr(ops, "g_node_buffers", {})
+
+
+def node_connect(ops: lib.objects.OpsState) -> None:
+    """ Connects to the node socket and negotiates a node-to-client version and sets ops state """
+
+    logger = ops.g_logger
+
+    if ops.g_node_socket is not None:
+        return
+
+    timer = time.time()
+    try:
+        node_socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        node_socket.settimeout(ops.g_api_timeout)
+        node_socket.connect(ops.g_socket_path)
+    except OSError:
+        logger.exception(
+            f"ERROR: Unable to connect to the cardano-node socket: {ops.g_socket_path}"
+        )
+        sys.exit(1)
+    setattr(ops, "g_node_socket", node_socket)
+    setattr(ops, "g_node_buffers", {})
+
+    # MsgProposeVersions is answered by MsgAcceptVersion or MsgRefuse
+    node_send(
+        ops,
+        NODE_PROTOCOL_HANDSHAKE,
+        [0, {version: int(ops.g_network_id) for version in NODE_TO_CLIENT_VERSIONS}],
+    )
+    reply = node_recv(ops, NODE_PROTOCOL_HANDSHAKE)
+    if reply[0] != 1 or reply[2] != int(ops.g_network_id):
+        logger.error(f"ERROR: The cardano-node refused the handshake: {reply}")
+        node_socket.close()
+        setattr(ops, "g_node_socket", None)
+        setattr(ops, "g_node_buffers", {})
+        sys.exit(1)
+    setattr(ops, "g_node_version", reply[1])
+    setattr(ops, "g_node_era", node_state_query(ops, [NODE_QUERY_CURRENT_ERA])[0])
+
+    if ops.g_timers:
+        logger.info(
+            f"Time to connect to the cardano-node socket: {lib.utility.time_delta_to_str(time.time() - timer)}"
+        )
+
+
+def node_era_query(ops: lib.objects.OpsState, query: List[Any]) -> List[Any]:
+    """ Wraps a Shelley based ledger query to run only in the current era """
+
+    return [0, [ops.g_node_era, query]]
+
+
+def node_era_result(ops: lib.objects.OpsState, result: List[Any]) -> Any:
+    """ Unwraps an era query result, exiting on an era mismatch """
+
+    logger = ops.g_logger
+
+    # Either MismatchEraInfo result: a single element list is a match
+    if len(result) != 1:
+        logger.error(f"ERROR: The node ledger query was for the wrong era: {result}")
+        sys.exit(1)
+
+    return result[0]
+
+
+def node_protocol_params(ops: lib.objects.OpsState) -> Dict[str, Any]:
+    """ Queries the current protocol parameters and returns them as cardano-cli json """
+
+    with ops.g_node_lock:
+        node_connect(ops)
+        pparams = node_era_result(
+            ops,
+            node_state_query(ops, [node_era_query(ops, NODE_QUERY_CURRENT_PPARAMS)])[0],
+        )
+
+    params: Dict[str, Any] = {}
+    for field, value in zip(NODE_PPARAMS_FIELDS, pparams):
+        # Unit intervals are tag 30 rationals and extra entropy is [0] or [1, nonce]
+        if isinstance(value, lib.cbor.CborTag):
+            value = value.value[0] / value.value[1]
+        elif field == "extraPraosEntropy":
+            value = None if value == [0] else value[1].hex()
+        params[field] = value
+    params["protocolVersion"] = {
+        "major": params.pop("protocolVersionMajor"),
+        "minor": params.pop("protocolVersionMinor"),
+    }
+
+    return params
+
+
+def node_query_utxo(ops: lib.objects.OpsState, address: str) -> Dict[str, Any]:
+    """ Queries the utxos of an address and returns them as cardano-cli json """
+
+    with ops.g_node_lock:
+        node_connect(ops)
+        utxos = node_era_result(
+            ops,
+            node_state_query(
+                ops,
+                [
+                    node_era_query(
+                        ops,
+                        [
+                            NODE_QUERY_UTXO_BY_ADDRESS,
+                            lib.cbor.CborTag(258, [node_address_bytes(address)]),
+                        ],
+                    )
+                ],
+            )[0],
+        )
+
+    return node_utxo_render(utxos)
+
+
+def node_query_utxo_txin(
+    ops: lib.objects.OpsState, tx_ins: List[str]
+) -> Dict[str, Any]:
+    """ Queries the utxos of tx inputs which are unspent and returns them as cardano-cli json """
+
+    logger = ops.g_logger
+
+    # Only nodes from NodeToClientV_9 answer a query by tx input; older ones disconnect
+    with ops.g_node_lock:
+        node_connect(ops)
+        if ops.g_node_version < NODE_TO_CLIENT_V9:
+            logger.error(
+                f"ERROR: The cardano-node does not support utxo queries by tx input: {ops.g_node_version}"
+            )
+            sys.exit(1)
+        utxos = node_era_result(
+            ops,
+            node_state_query(
+                ops,
+                [
+                    node_era_query(
+                        ops,
+                        [
+                            NODE_QUERY_UTXO_BY_TXIN,
+                            lib.cbor.CborTag(
+                                258,
+                                [
+                                    [binascii.unhexlify(tx_hash), int(tx_ix)]
+                                    for tx_hash, tx_ix in [
+                                        tx_in.split("#") for tx_in in tx_ins
+                                    ]
+                                ],
+                            ),
+                        ],
+                    )
+                ],
+            )[0],
+        )
+
+    return node_utxo_render(utxos)
+
+
+def node_recv(ops: lib.objects.OpsState, protocol: int) -> Any:
+    """ Receives the next complete CBOR message of a mini-protocol from the node """
+
+    logger = ops.g_logger
+
+    # Segments are appended in place, and a buffered message is only decoded once no
+    # further segment is already waiting, so a reply spanning many segments is decoded
+    # about once rather than re-decoded from the start after each of its segments
+    # A closed socket also reads as waiting, so what is buffered is decoded first
+    # before a failed read is treated as a connection failure
+    buffers = ops.g_node_buffers
+    node_socket = cast(socket.socket, ops.g_node_socket)
+    while True:
+        buffer = buffers.setdefault(protocol, bytearray())
+        if buffer and not select.select([node_socket], [], [], 0)[0]:
+            message = node_recv_message(buffer)
+            if message is not None:
+                return message
+
+        try:
+            header = node_recv_exact(ops, NODE_MUX_HEADER.size)
+            timestamp, mode_protocol, length = NODE_MUX_HEADER.unpack(header)
+            payload = node_recv_exact(ops, length)
+        except OSError:
+            message = node_recv_message(buffer) if buffer else None
+            if message is not None:
+                return message
+            logger.exception("ERROR: The cardano-node socket connection failed.")
+            sys.exit(1)
+        segment_protocol = mode_protocol & ~NODE_MUX_RESPONDER
+        buffers.setdefault(segment_protocol, bytearray()).extend(payload)
+
+
+def node_recv_exact(ops: lib.objects.OpsState, length: int) -> bytes:
+    """ Reads exactly length bytes from the node socket """
+
+    node_socket = cast(socket.socket, ops.g_node_socket)
+    data = b""
+    while len(data) < length:
+        chunk = node_socket.recv(length - len(data))
+        if not chunk:
+            raise ConnectionResetError("The cardano-node closed the socket")
+        data += chunk
+
+    return data
+
+
+def node_recv_message(buffer: bytearray) -> Any:
+    """ Removes and returns the first complete CBOR message of a buffer, or None """
+
+    try:
+        message, offset = lib.cbor.cbor_decode_item(bytes(buffer), 0)
+    except (IndexError, ValueError):
+        return None
+    del buffer[:offset]
+
+    return message
+
+
+def node_send(ops: lib.objects.OpsState, protocol: int, message: Any) -> None:
+    """ Sends a CBOR message to a node mini-protocol, split into mux segments """
+
+    logger = ops.g_logger
+
+    node_socket = cast(socket.socket, ops.g_node_socket)
+    payload = lib.cbor.cbor_encode(message)
+    try:
+        for offset in range(0, len(payload), NODE_MUX_SDU_SIZE):
+            chunk = payload[offset : offset + NODE_MUX_SDU_SIZE]
+            timestamp = int(time.monotonic() * 1000000) & 0xFFFFFFFF
+            node_socket.sendall(
+                NODE_MUX_HEADER.pack(timestamp, protocol, len(chunk)) + chunk
+            )
+    except OSError:
+        logger.exception("ERROR: The cardano-node socket connection failed.")
+        sys.exit(1)
+
+
+def node_slot_length(ops: lib.objects.OpsState) -> float:
+    """ Queries the era history and returns the current era's slot length in seconds """
+
+    logger = ops.g_logger
+
+    with ops.g_node_lock:
+        node_connect(ops)
+        summaries = node_state_query(ops, [NODE_QUERY_ERA_HISTORY])[0]
+
+    # The interpreter is a list of [start, end, params] era summaries, where the era
+    # params begin with [epoch_size, slot_length_ms, ...]
+    try:
+        slot_length = summaries[ops.g_node_era][2][1] / 1000
+    except (IndexError, KeyError, TypeError):
+        logger.error(f"ERROR: Unexpected node era history: {summaries}")
+        sys.exit(1)
+
+    return slot_length
+
+
+def node_state_query(ops: lib.objects.OpsState, queries: List[Any]) -> List[Any]:
+    """ Runs local-state-queries against a single acquired tip ledger state """
+
+    logger = ops.g_logger
+
+    # MsgAcquire of the volatile tip, then MsgQuery/MsgResult pairs and MsgRelease;
+    # before NodeToClientV_8 the tip must be acquired by point, found by chain-sync
+    if ops.g_node_version >= NODE_TO_CLIENT_V8:
+        node_send(ops, NODE_PROTOCOL_LOCAL_STATE_QUERY, [8])
+    else:
+        point, block_no = node_chain_tip(ops)
+        node_send(ops, NODE_PROTOCOL_LOCAL_STATE_QUERY, [0, point])
+    reply = node_recv(ops, NODE_PROTOCOL_LOCAL_STATE_QUERY)
+    if reply[0] != 1:
+        logger.error(f"ERROR: Unable to acquire the node ledger state: {reply}")
+        sys.exit(1)
+
+    results = []
+    for query in queries:
+        node_send(ops, NODE_PROTOCOL_LOCAL_STATE_QUERY, [3, query])
+        reply = node_recv(ops, NODE_PROTOCOL_LOCAL_STATE_QUERY)
+        if reply[0] != 4:
+            logger.error(f"ERROR: Unexpected node local-state-query reply: {reply}")
+            sys.exit(1)
+        results.append(reply[1])
+    node_send(ops, NODE_PROTOCOL_LOCAL_STATE_QUERY, [5])
+
+    return results
+
+
+def node_tip_get(ops: lib.objects.OpsState) -> Dict[str, Any]:
+    """ Queries the node tip and returns it as cardano-cli json """
+
+    with ops.g_node_lock:
+        node_connect(ops)
+        point, block_no = node_chain_tip(ops)
+        epoch = node_era_result(
+            ops, node_state_query(ops, [node_era_query(ops, NODE_QUERY_EPOCH_NO)])[0]
+        )
+
+    slot, tip_hash = point if point else [0, b""]
+
+    return {
+        "epoch": epoch,
+        "hash": tip_hash.hex(),
+        "slot": slot,
+        "block": block_no,
+        "era": NODE_ERA_NAMES[ops.g_node_era]
+        if ops.g_node_era < len(NODE_ERA_NAMES)
+        else str(ops.g_node_era),
+    }
+
+
+def node_tx_submit(ops: lib.objects.OpsState, txs: List[bytes]) -> List[Any]:
+    """ Submits signed transactions using local-tx-submission and returns None or a reject reason for each """
+
+    logger = ops.g_logger
+
+    with ops.g_node_lock:
+        node_connect(ops)
+
+        # All MsgSubmitTx are pipelined ahead of their in order MsgAcceptTx or MsgRejectTx
+        # replies; each tx is wrapped for the current hard fork era as [era, tag24(tx)]
+        for tx in txs:
+            node_send(
+                ops,
+                NODE_PROTOCOL_LOCAL_TX_SUBMISSION,
+                [
+                    0,
+                    [
+                        ops.g_node_era,
+                        lib.cbor.CborTag(NODE_CBOR_IN_CBOR_TAG, tx),
+                    ],
+                ],
+            )
+        replies = [node_recv(ops, NODE_PROTOCOL_LOCAL_TX_SUBMISSION) for tx in txs]
+
+    results: List[Any] = []
+    for reply in replies:
+        if reply[0] == 1:
+            results.append(None)
+        elif reply[0] == 2:
+            results.append(reply[1])
+        else:
+            logger.error(f"ERROR: Unexpected node local-tx-submission reply: {reply}")
+            sys.exit(1)
+
+    return results
+
+
+def node_utxo_render(utxos: Dict[Any, Any]) -> Dict[str, Any]:
+    """ Renders a ledger utxo map as cardano-cli json """
+
+    # Mary era values are either a coin or [coin, {policy_id: {asset_name: quantity}}]
+    cli_utxos: Dict[str, Any] = {}
+    for (tx_hash, tx_ix), (tx_address, value) in utxos.items():
+        if isinstance(value, list):
+            coin, assets = value
+        else:
+            coin, assets = value, {}
+        cli_value: Dict[str, Any] = {"lovelace": coin}
+        for policy_id, tokens in assets.items():
+            cli_value[policy_id.hex()] = {
+                name.hex(): quantity for name, quantity in tokens.items()
+            }
+        cli_utxos[f"{tx_hash.hex()}#{tx_ix}"] = {
+            "address": node_address_render(tx_address),
+            "value": cli_value,
+        }
+
+    return cli_utxos
@@ -1,8 +1,279 @@
-from typing import Dict, List, Tuple, Union
+from typing import (
+    Any,
+    Deque,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Set,
+    Tuple,
+    Union,
+)
+import array
+import collections
 import logging
+import numpy
+import queue
+import requests
+import socket
+import threading
 import time
 
 
+class UtxoStore:
+    """ An immutable columnar utxo table whose rows read as (tx_hash#tx_ix, lovelace, address) tuples """
+
+    # Rows converted to tuples per step when iterating
+    CHUNK_ROWS: int = 4096
+
+    def __init__(
+        self,
+        tx_hashes: numpy.ndarray,
+        tx_ixs: numpy.ndarray,
+        coins: numpy.ndarray,
+        address_ids: numpy.ndarray,
+        addresses: List[str],
+        address_index: Dict[str, int],
+    ) -> None:
+        # Each row takes 46 bytes: a 32 byte tx hash, a uint16 tx index, a uint64
+        # lovelace amount and an int32 id into an address table shared between stores
+        self.tx_hashes = tx_hashes
+        self.tx_ixs = tx_ixs
+        self.coins = coins
+        self.address_ids = address_ids
+        self.addresses = addresses
+        self.address_index = address_index
+        self.lookup: Optional[Tuple[numpy.ndarray, numpy.ndarray, memoryview]] = None
+
+    def __contains__(self, utxo: object) -> bool:
+        return isinstance(utxo, tuple) and self.find(utxo) >= 0
+
+    def __iter__(self) -> Iterator[Tuple[str, int, str]]:
+        return self.rows(numpy.arange(len(self)))
+
+    def __len__(self) -> int:
+        return len(self.coins)
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[Tuple[str, int, str]]) -> "UtxoStore":
+        """ Builds a store from (tx_hash#tx_ix, lovelace, address) rows, streaming them once """
+
+        tx_hashes = bytearray()
+        tx_ixs = array.array("H")
+        coins = array.array("Q")
+        address_ids = array.array("i")
+        addresses: List[str] = []
+        address_index: Dict[str, int] = {}
+        for utxo, coin, address in rows:
+            tx_hash, tx_ix = utxo.split("#")
+            tx_hashes += bytes.fromhex(tx_hash)
+            tx_ixs.append(int(tx_ix))
+            coins.append(coin)
+            address_id = address_index.get(address)
+            if address_id is None:
+                address_id = address_index[address] = len(addresses)
+                addresses.append(address)
+            address_ids.append(address_id)
+
+        return cls(
+            numpy.frombuffer(tx_hashes, dtype="V32"),
+            numpy.frombuffer(tx_ixs, dtype=numpy.uint16),
+            numpy.frombuffer(coins, dtype=numpy.uint64),
+            numpy.frombuffer(address_ids, dtype=numpy.int32),
+            addresses,
+            address_index,
+        )
+
+    def find(self, utxo: Tuple[str, int, str]) -> int:
+        """ Returns the row holding a utxo tuple, or -1, in O(log n) """
+
+        # Rows are looked up by binary search over sorted int64 keys of the first 47
+        # bits of the tx hash and the 16 bit tx index, with the matching row order,
+        # built once on first use at 12 bytes per row; candidates sharing a key are
+        # told apart by comparing the whole row, reading tx hashes through a byte view
+        if self.lookup is None:
+            tx_hashes = numpy.ascontiguousarray(self.tx_hashes)
+            prefixes = tx_hashes.view(">u8")[::4] >> 17
+            keys = (prefixes.astype(numpy.int64) << 16) | self.tx_ixs
+            order = numpy.argsort(keys, kind="stable").astype(numpy.int32)
+            self.lookup = (keys[order], order, memoryview(tx_hashes.view(numpy.uint8)))
+        keys, order, hashes = self.lookup
+
+        try:
+            tx_hash, tx_ix = utxo[0].split("#")
+            tx_hash_bytes = bytes.fromhex(tx_hash)
+            ix = int(tx_ix)
+        except (AttributeError, ValueError):
+            return -1
+        if len(tx_hash_bytes) != 32 or not 0 <= ix < 2 ** 16:
+            return -1
+        key = ((int.from_bytes(tx_hash_bytes[:8], "big") >> 17) << 16) | ix
+        position = int(keys.searchsorted(key))
+        while position < len(keys) and keys[position] == key:
+            row = int(order[position])
+            if (
+                hashes[row * 32 : row * 32 + 32] == tx_hash_bytes
+                and self.tx_ixs[row] == ix
+                and self.coins[row] == utxo[1]
+                and self.addresses[self.address_ids[row]] == utxo[2]
+            ):
+                return row
+            position += 1
+
+        return -1
+
+    def insert(self, row: int, utxo: Tuple[str, int, str]) -> "UtxoStore":
+        """ Returns a new store with a utxo inserted ahead of a row """
+
+        single = UtxoStore.from_rows([utxo])
+        address_id = self.address_index.get(utxo[2])
+        if address_id is None:
+            address_id = self.address_index[utxo[2]] = len(self.addresses)
+            self.addresses.append(utxo[2])
+
+        return UtxoStore(
+            numpy.insert(self.tx_hashes, row, single.tx_hashes),
+            numpy.insert(self.tx_ixs, row, single.tx_ixs),
+            numpy.insert(self.coins, row, single.coins),
+            numpy.insert(self.address_ids, row, address_id),
+            self.addresses,
+            self.address_index,
+        )
+
+    def row(self, row: int) -> Tuple[str, int, str]:
+        """ Returns a single row as a utxo tuple """
+
+        return (
+            f"{self.tx_hashes[row].tobytes().hex()}#{self.tx_ixs[row]}",
+            int(self.coins[row]),
+            self.addresses[self.address_ids[row]],
+        )
+
+    def rows(self, rows: numpy.ndarray) -> Iterator[Tuple[str, int, str]]:
+        """ Yields the given rows as utxo tuples, converting them a chunk at a time """
+
+        addresses = self.addresses
+        for start in range(0, len(rows), self.CHUNK_ROWS):
+            chunk = rows[start : start + self.CHUNK_ROWS]
+            for tx_hash, tx_ix, coin, address_id in zip(
+                self.tx_hashes[chunk].tolist(),
+                self.tx_ixs[chunk].tolist(),
+                self.coins[chunk].tolist(),
+                self.address_ids[chunk].tolist(),
+            ):
+                yield (
+                    f"{tx_hash.hex()}#{tx_ix}",
+                    coin,
+                    addresses[address_id],
+                )
+
+    def take(self, rows: numpy.ndarray) -> "UtxoStore":
+        """ Returns a new store of the given rows, in order """
+
+        return UtxoStore(
+            self.tx_hashes[rows],
+            self.tx_ixs[rows],
+            self.coins[rows],
+            self.address_ids[rows],
+            self.addresses,
+            self.address_index,
+        )
+
+
+class RuntimeUtxos:
+    """ Runtime utxos in selection order over a shared utxo store with tombstoned removal """
+
+    # Tombstones tolerated before compaction is considered
+    COMPACT_MIN_TOMBSTONES: int = 1024
+
+    def __init__(
+        self, utxos: Union[UtxoStore, Iterable[Tuple[str, int, str]]] = ()
+    ) -> None:
+        # Removed utxos are cleared in an alive mask, so the rows of all other utxos
+        # stay valid and the store can be shared until the next compaction
+        self.store: UtxoStore = (
+            utxos if isinstance(utxos, UtxoStore) else UtxoStore.from_rows(utxos)
+        )
+        self.alive: numpy.ndarray = numpy.ones(len(self.store), dtype=bool)
+        self.tombstones: int = 0
+
+    def __contains__(self, utxo: object) -> bool:
+        return isinstance(utxo, tuple) and self.find(utxo) >= 0
+
+    def __iter__(self) -> Iterator[Tuple[str, int, str]]:
+        return self.store.rows(numpy.flatnonzero(self.alive))
+
+    def __len__(self) -> int:
+        return len(self.store) - self.tombstones
+
+    def compact(self) -> None:
+        """ Drops tombstones, keeping the remaining utxos in order """
+
+        if self.tombstones:
+            self.store = self.store.take(numpy.flatnonzero(self.alive))
+            self.alive = numpy.ones(len(self.store), dtype=bool)
+            self.tombstones = 0
+
+    def copy(self) -> "RuntimeUtxos":
+        """ Returns a compacted copy """
+
+        return RuntimeUtxos(self.to_store())
+
+    def discard(self, utxo: Tuple[str, int, str]) -> bool:
+        """ Removes a utxo if present and returns whether it was """
+
+        row = self.find(utxo)
+        if row < 0:
+            return False
+        self.alive[row] = False
+        self.tombstones += 1
+
+        # Compacting once tombstones outnumber the remaining utxos keeps iteration
+        # proportional to the remaining utxos at an amortized O(1) cost per removal
+        if (
+            self.tombstones >= self.COMPACT_MIN_TOMBSTONES
+            and self.tombstones * 2 > len(self.store)
+        ):
+            self.compact()
+
+        return True
+
+    def find(self, utxo: Tuple[str, int, str]) -> int:
+        """ Returns the store row of a remaining utxo, or -1 """
+
+        row = self.store.find(utxo)
+
+        return row if row >= 0 and self.alive[row] else -1
+
+    def insert_sorted(self, utxo: Tuple[str, int, str], ascending: bool = True) -> None:
+        """ Inserts a utxo ahead of the first utxo after it in lovelace order, in O(n) """
+
+        self.compact()
+        coins = self.store.coins
+        if ascending:
+            row = int(numpy.searchsorted(coins, utxo[1], side="right"))
+        else:
+            row = len(coins) - int(
+                numpy.searchsorted(coins[::-1], utxo[1], side="left")
+            )
+        self.store = self.store.insert(row, utxo)
+        self.alive = numpy.ones(len(self.store), dtype=bool)
+
+    def remove(self, utxo: Tuple[str, int, str]) -> None:
+        """ Removes a utxo, raising ValueError if it is not present """
+
+        if not self.discard(utxo):
+            raise ValueError(f"Runtime utxo not found: {utxo[0]}")
+
+    def to_store(self) -> UtxoStore:
+        """ Returns a store of the remaining utxos, in order """
+
+        self.compact()
+
+        return self.store
+
+
 class OpsState:
     # fmt: off
     # Class constants
@@ -20,9 +291,14 @@ class OpsState:
     MIN_BASH_VER: str = "4.4.0"                                           # Released in 2016
     WALLET_API_VER: str = "v2"
     WALLET_API_HEALTHCHECK: str = "network/information"
+    WALLET_API_RETRIES: int = 3                                           # Maximum retries of a wallet API GET returning a transient 5xx status
+    WALLET_API_RETRY_BACKOFF_SECONDS: float = 0.5                         # Initial wallet API retry delay, doubled with each retry
     WALLET_TO_CLI_HEIGHT_TOLERANCE: int = 5                               # Maximum tolerable blockHeight diff between wallet and cardano-cli for ops to proceed
-    TX_FEE_CALC_ATTEMPTS: int = 10                                        # Attempt a maximum number of fee calculation attempts for a stable fee
     TX_FEE_LOVELACE_TOLERANCE: int = 3000000                              # Minimum lovelace amount to pad Tx inputs to cover fees
+    KEY_CACHE_MAX_ENTRIES: int = 250000                                   # Maximum persistent key cache entries per wallet before the oldest are evicted
+    NETWORK_SLOT_LENGTH_SECONDS: float = 1.0                              # Shelley era slot length of all Cardano networks, the fallback when it can not be queried
+    TIP_ESTIMATE_MAX_SLOTS: int = 60                                      # Maximum slots estimated from the wall clock before re-querying the tip, well under TX_TTL_TOLERANCE
+    TRACKER_RESUBMIT_SECONDS: int = 120                                   # Age at which an unconfirmed Tx is resubmitted once over a node socket
     TX_TTL_TOLERANCE: int = 300                                           # Set a Tx ttl for cardano-cli transactions
     DEFAULT_ACCOUNT_INDEX: str = "0H"                                     # Set the default byron wallet account index
     DEFAULT_ADDRESS_INDEX: str = "444138633H"                             # Set the default byron wallet address index
@@ -40,31 +316,62 @@ class OpsState:
         self.g_cardano_wallet_tag: str = ""                               # The tag of cardano-wallet available in the script's shell path
         self.g_cardano_wallet_rev: str = ""                               # The rev of cardano-wallet available in the script's shell path
         self.g_cardano_cli_skeys: Dict[str, str] = {}                     # {base58_address: skey}
-        self.g_cardano_cli_utxo: List[Tuple[str, int, str]] = []          # [(tx_hash#tx_ix, lovelace, address), ...] from cardano-cli
+        self.g_cardano_cli_utxo: UtxoStore = UtxoStore.from_rows([])      # [(tx_hash#tx_ix, lovelace, address), ...] from cardano-cli
+        self.g_chain_backend: str = "cli"                                 # Chain read backend, either "cli" (cardano-cli) or "socket" (node-to-client)
         self.g_confirm: bool = True                                       # Whether to confirmation prompt on `--live` operations
         self.g_dynamic: bool = False                                      # Whether to support a dynamic wallet where utxos may disappear during runtime
+        self.g_cli_check: bool = False                                    # Whether to cross-check native tx building and signing with cardano-cli
         self.g_filter_tx_in_expr: Union[int, str] = ""                    # tx_in filter expression, if enabled
         self.g_filter_tx_in: bool = False                                 # Whether to enable a tx_in filter
         self.g_filter_tx_in_method: str = ""                              # tx_in filter method, if enabled
         self.g_filter_tx_in_target: str = ""                              # tx_in filter target, if enabled
+        self.g_filter_where: str = ""                                     # Compound tx_in filter expression of inputs to keep, if enabled
         self.g_frag: bool = True                                          # Whether in `frag` mode (True) or `defrag` mode (False)
         self.g_live: bool = False                                         # Submit generated Txs if true, otherwise dry-run
         self.g_logger: logging.Logger = logger                            # Set the logger
+        self.g_key_cache_addresses: Set[str] = set()                      # Addresses whose skeys were loaded from the persistent key cache
+        self.g_key_cache_path: str = ""                                   # Path to the opt-in encrypted persistent key cache, if enabled
         self.g_lookup_hits_cli_skey: int = 0                              # Tracks the number of hash map hits for the skey lookup table
         self.g_lookup_hits_sql_drvs: int = 0                              # Tracks the number of hash map hits for the sql drv lookup table
         self.g_mnemonics: str = ""                                        # 12 space delimited mnemonics
         self.g_network_id: str = ""                                       # Network id for the selected network
         self.g_network_min_utxo_override: bool = False                    # Whether a min utxo override has been specified from the cli
         self.g_network: str = "NOT_YET_SET"                               # "mainnet" or "testnet"
+        self.g_network_protocol_params_max_tx_size: int = 0               # Reference network protocol max tx size, in bytes
+        self.g_network_protocol_params_min_fee_a: int = 0                 # Reference network protocol fee per tx byte (minFeeA)
+        self.g_network_protocol_params_min_fee_b: int = 0                 # Reference network protocol fixed tx fee (minFeeB)
         self.g_network_protocol_params_min_utxo: int = 0                  # Reference network protocol min utxo
-        self.g_network_protocol_params: str = ""                          # Network protocol parameters for the selected network
-        self.g_runtime_utxos: List[Tuple[str, int, str]] = []             # Tracks remaining unprocessed utxos for the `frag` or `defrag` operation
+        self.g_network_protocol_params: Dict[str, Any] = {}               # Parsed network protocol parameters for the selected network
+        self.g_network_protocol_params_arg: str = ""                      # Compact json protocol parameters escaped once for cardano-cli command lines
+        self.g_network_protocol_params_epoch: int = -1                    # Tip epoch when the protocol parameters were queried, -1 if unknown
+        self.g_network_protocol_params_refresh: int = 3600                # Maximum protocol parameter cache age, in seconds, regardless of epoch
+        self.g_network_protocol_params_time: float = 0.0                  # Unix epoch time of the last protocol parameter query, 0 if never queried
+        self.g_network_slot_length: float = 0.0                           # Slot length in seconds from `--slot-length` or the node era history, 0 until known
+        self.g_node_buffers: Dict[int, bytearray] = {}                    # Partially received node messages by mini-protocol id
+        self.g_node_era: int = 0                                          # Hard fork era index of the node's current ledger state
+        self.g_node_lock: threading.Lock = threading.Lock()               # Serializes node socket exchanges across threads
+        self.g_node_socket: Optional[socket.socket] = None                # Persistent node-to-client socket, if connected
+        self.g_node_version: int = 0                                      # Negotiated node-to-client protocol version
+        self.g_pipeline_depth: int = 0                                    # Bounded queue depth between pipelined Tx stages, 0 to disable pipelining
+        self.g_pipeline_failed: threading.Event = threading.Event()       # Set once any pipelined Tx stage has failed
+        self.g_pipeline_queues: List[queue.Queue] = []                    # Bounded queues feeding each pipelined Tx stage
+        self.g_pipeline_threads: List[threading.Thread] = []              # Worker threads running each pipelined Tx stage
+        self.g_runtime_selection: Dict[str, Any] = {}                     # Prefix sum `max` input selection state over the runtime utxos
+        self.g_runtime_utxos: RuntimeUtxos = RuntimeUtxos()               # Tracks remaining unprocessed utxos for the `frag` or `defrag` operation
+        self.g_shelley_account_xprvs: Dict[int, bytes] = {}               # {account_ix: account extended private key bytes}
         self.g_shelley_address: str = ""                                  # Shelley era compatible cardano-address generated address
         self.g_shelley_prv: str = ""                                      # Shelley private key (byron type)
+        self.g_shelley_root_hd_passphrase: bytes = b""                    # Byron HD payload passphrase derived from the root public key
         self.g_shelley_root_prv: str = ""                                 # Shelley era compatible root private key
+        self.g_shelley_root_xprv: bytes = b""                             # Shelley era compatible root extended private key bytes
         self.g_shelley_root_pub: str = ""                                 # Shelley era compatible root public key
         self.g_shelley_skey: str = ""                                     # Shelley private key (shelley type)
         self.g_shelley_vkey: str = ""                                     # Shelley public key (shelley type)
+        self.g_shell_pool: queue.Queue = queue.Queue()                    # (coprocess, fifo dir) of idle warm bash coprocesses reused by shell commands
+        self.g_skey_warmup_lock: threading.Lock = threading.Lock()        # Serializes joining the skey warm-up across threads
+        self.g_skey_warmup_mb: int = 0                                    # Memory ceiling of the startup skey pre-derivation, in MB, 0 to disable
+        self.g_skey_warmup_skeys: Dict[str, Tuple[int, int, str]] = {}    # {base58_address: (account_ix, address_ix, skey)} derived by the warm-up, merged on join
+        self.g_skey_warmup_thread: Optional[threading.Thread] = None      # Running skey warm-up thread, joined before first signing
         self.g_socket_path: str = ""                                      # Socket path
         self.g_start_time: float = time.time()                            # Operation start time in unix epoch timestamp format
         self.g_sum_tx_count: int = 0                                      # Sum of transactions processed or submitted
@@ -72,6 +379,23 @@ class OpsState:
         self.g_sum_tx_inputs: int = 0                                     # Sum of the number of inputs processed or submitted
         self.g_sum_tx_outputs: int = 0                                    # Sum of the number of outputs processed or submitted
         self.g_timers: bool = False                                       # Whether to debug log detailed operation timings
+        self.g_tip_sync_epoch: int = -1                                   # Tip epoch at the last cardano-cli tip query, -1 if unknown
+        self.g_tip_sync_slot: int = 0                                     # Tip slot at the last cardano-cli tip query
+        self.g_tip_sync_time: float = 0.0                                 # Unix epoch time of the last cardano-cli tip query, 0 if never queried
+        self.g_tracker_dropped: List[Dict[str, Any]] = []                 # Dropped Txs whose inputs await release by the main loop
+        self.g_tracker_dropped_count: int = 0                             # Total Txs dropped after their ttl passed unconfirmed
+        self.g_tracker_interval: int = 0                                  # In-flight Tx confirmation poll interval in seconds, 0 to disable
+        self.g_tracker_latencies: List[float] = []                        # Submission to observed confirmation latencies, in seconds
+        self.g_tracker_lock: threading.Lock = threading.Lock()            # Serializes in-flight Tx tracker state across threads
+        self.g_tracker_resubmits: int = 0                                 # Total stalled Txs resubmitted
+        self.g_tracker_stop: threading.Event = threading.Event()          # Stops the tracker thread
+        self.g_tracker_thread: Optional[threading.Thread] = None          # Background in-flight Tx tracker thread, if running
+        self.g_tracker_tip_id: str = ""                                   # Tip block hash of the last in-flight Tx utxo query
+        self.g_tracker_txs: Dict[str, Dict[str, Any]] = {}                # {tx_id: in-flight Tx record} of submitted, unconfirmed Txs
+        self.g_tx_batch: int = 1                                          # Number of disjoint `defrag` Txs to select and build concurrently
+        self.g_tx_batch_txs: Deque[Dict[str, Any]] = collections.deque()  # Built and signed `defrag` batch Txs awaiting submission, in order
+        self.g_tx_chain_depth: int = 0                                    # Maximum unconfirmed `frag` Tx chain depth whose change may be re-spent, 0 to disable
+        self.g_tx_chain_depths: Dict[str, int] = {}                       # {tx_hash#tx_ix: unconfirmed chain depth} of re-spendable `frag` change utxos
         self.g_tx_max_inputs: int = 0                                     # Maximum number of inputs allowed per Tx
         self.g_tx_output_count: int = 0                                   # Output count per Tx using new byron addresses
         self.g_tx_output_evenly: bool = False                             # For `frag` ops, distribute lovelace total evenly if true (default: random)
@@ -79,18 +403,30 @@ class OpsState:
         self.g_tx_output_lovelace: int = 0                                # Total lovelace output per Tx
         self.g_tx_output_min_utxo: int = 0                                # Minimum UTxO size, in Lovelace.  Gets set to network params or overriden by cli.
         self.g_tx_repeat: int = 1                                         # Defines the repeat count for the transaction operation
+        self.g_wallet_address_pool: queue.Queue = queue.Queue()           # Pre-filled new byron addresses for `frag --new` ops
+        self.g_wallet_address_prefill: int = 1                            # Txs worth of new addresses to pre-fill, 0 to disable
+        self.g_wallet_address_stop: threading.Event = threading.Event()   # Stops the pre-fill thread
+        self.g_wallet_address_thread: Optional[threading.Thread] = None   # Background new address pre-fill thread, if running
+        self.g_wallet_address_wake: threading.Event = threading.Event()   # Wakes the pre-fill thread after addresses are taken
+        self.g_wallet_api_calls: int = 0                                  # Total wallet API calls made
+        self.g_wallet_api_lock: threading.Lock = threading.Lock()         # Serializes wallet API session creation and latency totals
+        self.g_wallet_api_time: float = 0.0                               # Total wallet API call latency, in seconds
         self.g_wallet_db_address_drvs: Dict[str, Dict[str, int]] = {}     # {base58_address: {account_ix|address_ix: value}} from cardano-wallet
         self.g_wallet_db_addresses: List[Tuple[str, int, int, str]] = []  # [(address, account_ix, address_ix, status), ...] from cardano-wallet
         self.g_wallet_db_path: str = ""                                   # Wallet db path
+        self.g_wallet_db_stats: Optional[Tuple[int, int, int]] = None     # Unfiltered (utxo, address, lovelace) counts of a filtered wallet db query
         self.g_wallet_id: str = ""                                        # Wallet id
         self.g_wallet_id_passphrase: str = ""                             # Wallet id passphrase
         self.g_wallet_ip: str = ""                                        # Wallet ip (ipv4 or ipv6)
         self.g_wallet_port: str = ""                                      # Wallet port (validated as int)
+        self.g_wallet_local_indices: Set[Tuple[int, int]] = set()         # Unhardened (account_ix, address_ix) pairs used or taken by `frag --local-new` ops
+        self.g_wallet_pool_size: int = 10                                 # Maximum kept-alive wallet API connections
         self.g_wallet_server_api: str = ""                                # Wallet api endpoint (assumes http)
+        self.g_wallet_session: Optional[requests.Session] = None          # Shared keep-alive wallet API session, once created
         self.g_wallet_tls: bool = False                                   # Sets http or https for wallet server url
         self.g_wallet_utxo_address_count: int = 0                         # Total utxo unique address count
         self.g_wallet_utxo_count: int = 0                                 # Total utxo count (excluding asset utxos)
         self.g_wallet_utxo_count_asset: int = 0                           # Total asset utxo count
-        self.g_wallet_utxo: List[Tuple[str, int, str]] = []               # [(tx_hash#tx_ix, lovelace, address), ...] from cardano-wallet
+        self.g_wallet_utxo: UtxoStore = UtxoStore.from_rows([])           # [(tx_hash#tx_ix, lovelace, address), ...] from cardano-wallet
         self.g_wallet_utxo_lovelace_count: int = 0                        # Total utxo lovelace sum
         # fmt: on
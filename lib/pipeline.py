@@ -0,0 +1,102 @@
+from typing import Any, Callable, Dict, List, Optional
+import lib.objects
+import queue
+import sys
+import threading
+
+
+def pipeline_put(ops: lib.objects.OpsState, tx: Dict[str, Any]) -> None:
+    """ Queues a selected transaction into the first pipeline stage """
+
+    # Stop producing new transactions as soon as any stage has failed
+    if ops.g_pipeline_failed.is_set():
+        pipeline_stop(ops)
+
+    ops.g_pipeline_queues[0].put(tx)
+
+
+def pipeline_stage(
+    ops: lib.objects.OpsState,
+    stage: Callable[[lib.objects.OpsState, Dict[str, Any]], None],
+    inbox: queue.Queue,
+    outbox: Optional[queue.Queue],
+) -> None:
+    """ Runs one pipeline stage over transactions until a stop marker is received """
+
+    logger = ops.g_logger
+
+    while True:
+        tx = inbox.get()
+        if tx is None:
+            if outbox is not None:
+                outbox.put(None)
+            return
+
+        # After a failure, keep draining so upstream stages never block on a full queue
+        if ops.g_pipeline_failed.is_set():
+            continue
+
+        try:
+            stage(ops, tx)
+        except SystemExit:
+            # Stage functions log their own errors before exiting
+            ops.g_pipeline_failed.set()
+            continue
+        except Exception:
+            logger.exception(f"ERROR: The pipeline stage {stage.__name__} failed.")
+            ops.g_pipeline_failed.set()
+            continue
+
+        if outbox is not None:
+            outbox.put(tx)
+
+
+def pipeline_start(
+    ops: lib.objects.OpsState,
+    stages: List[Callable[[lib.objects.OpsState, Dict[str, Any]], None]],
+) -> None:
+    """ Starts one thread per transaction stage joined by bounded queues and sets ops state """
+
+    queues: List[queue.Queue] = [
+        queue.Queue(maxsize=ops.g_pipeline_depth) for stage in stages
+    ]
+    threads = [
+        threading.Thread(
+            target=pipeline_stage,
+            args=(
+                ops,
+                stage,
+                queues[i],
+                queues[i + 1] if i + 1 < len(stages) else None,
+            ),
+            name=stage.__name__,
+            daemon=True,
+        )
+        for i, stage in enumerate(stages)
+    ]
+    for thread in threads:
+        thread.start()
+
+    setattr(ops, "g_pipeline_queues", queues)
+    setattr(ops, "g_pipeline_threads", threads)
+
+
+def pipeline_stop(ops: lib.objects.OpsState) -> None:
+    """ Waits for all queued transactions to pass through the pipeline and stops it """
+
+    logger = ops.g_logger
+
+    if not ops.g_pipeline_threads:
+        return
+
+    ops.g_pipeline_queues[0].put(None)
+    for thread in ops.g_pipeline_threads:
+        thread.join()
+    setattr(ops, "g_pipeline_queues", [])
+    setattr(ops, "g_pipeline_threads", [])
+
+    if ops.g_pipeline_failed.is_set():
+        logger.error(
+            "ERROR: A transaction pipeline stage failed; remaining Txs were not submitted."
+        )
+        sys.exit(1)
@@ -0,0 +1,260 @@
+from typing import Any, Dict, List, Set
+import lib.cardano
+import lib.node
+import lib.objects
+import lib.utility
+import lib.utxo
+import numpy
+import threading
+import time
+
+
+def tracker_add(ops: lib.objects.OpsState, tx: Dict[str, Any]) -> None:
+    """ Records a submitted transaction as in-flight and sets ops state """
+
+    # The change output always returns to the bootstrap address after the Tx outputs
+    with ops.g_tracker_lock:
+        ops.g_tracker_txs[tx["id"]] = {
+            "id": tx["id"],
+            "change_utxo": f"{tx['id']}#{len(tx['tx_outs'])}",
+            "selected_utxo": tx["selected_utxo"],
+            "signed": tx["signed"],
+            "submitted": time.time(),
+            "resubmitted": False,
+            "ttl": tx["ttl"],
+        }
+
+
+def tracker_poll(ops: lib.objects.OpsState) -> None:
+    """ Checks all in-flight transactions for confirmation in one batch and sets ops state """
+
+    logger = ops.g_logger
+
+    with ops.g_tracker_lock:
+        if not ops.g_tracker_txs:
+            return
+        change_utxos = [tx["change_utxo"] for tx in ops.g_tracker_txs.values()]
+
+    # The tip is queried before the utxos, so a change output missing from the
+    # utxos was not on chain at the tip slot either; the ledger only changes with
+    # a new tip block, so until then a poll only checks for stalled Txs
+    tip = lib.cardano.cardano_cli_tip_get(ops)
+    slot = lib.cardano.cardano_cli_tip_parse_slot(ops, tip)
+    tip_id = str(tip.get("hash", tip.get("headerHash", slot)))
+    advanced = tip_id != ops.g_tracker_tip_id
+    if advanced:
+        on_chain = tracker_query(ops, change_utxos)
+        setattr(ops, "g_tracker_tip_id", tip_id)
+    now = time.time()
+
+    with ops.g_tracker_lock:
+        txs = ops.g_tracker_txs
+
+        # A Tx is confirmed once its change is on chain, or once a confirmed Tx has
+        # spent its change, as chained `frag` Txs do
+        confirmed: Set[str] = set(
+            [
+                tx_id
+                for tx_id, tx in txs.items()
+                if advanced and tx["change_utxo"] in on_chain
+            ]
+        )
+        spent = set(
+            [
+                utxo
+                for tx_id in confirmed
+                for utxo, amount, address in txs[tx_id]["selected_utxo"]
+            ]
+        )
+        while True:
+            chained = set(
+                [
+                    tx_id
+                    for tx_id, tx in txs.items()
+                    if tx_id not in confirmed and tx["change_utxo"] in spent
+                ]
+            )
+            if not chained:
+                break
+            confirmed |= chained
+            spent |= set(
+                [
+                    utxo
+                    for tx_id in chained
+                    for utxo, amount, address in txs[tx_id]["selected_utxo"]
+                ]
+            )
+
+        for tx_id in confirmed:
+            tx = txs.pop(tx_id)
+            ops.g_tracker_latencies.append(now - tx["submitted"])
+            logger.debug(
+                f"Tx {tx_id} confirmed {lib.utility.time_delta_to_str(now - tx['submitted'])} after submission"
+            )
+
+        # A Tx not on chain once the tip passes its ttl can never be included
+        dropped = [tx_id for tx_id, tx in txs.items() if advanced and slot >= tx["ttl"]]
+        for tx_id in dropped:
+            ops.g_tracker_dropped.append(txs.pop(tx_id))
+
+        # Over a socket, Txs outstanding for long are resubmitted once in case the
+        # node dropped them from its mempool, which a reject reports as harmless
+        stalled: List[Dict[str, Any]] = []
+        if ops.g_chain_backend == "socket":
+            stalled = [
+                tx
+                for tx in txs.values()
+                if not tx["resubmitted"]
+                and now - tx["submitted"] > ops.TRACKER_RESUBMIT_SECONDS
+            ]
+            for tx in stalled:
+                tx["resubmitted"] = True
+
+    if stalled:
+        lib.cardano.cardano_node_tx_submit(ops, stalled)
+        for tx in stalled:
+            logger.debug(
+                f"Tx {tx['id']} resubmitted: {'accepted' if tx['submit_result'] is None else tx['submit_result']}"
+            )
+        setattr(ops, "g_tracker_resubmits", ops.g_tracker_resubmits + len(stalled))
+
+
+def tracker_query(ops: lib.objects.OpsState, change_utxos: List[str]) -> Set[str]:
+    """ Returns the change utxos of in-flight transactions which are on chain """
+
+    # Over a socket, a node which supports it is asked for just the change outputs;
+    # otherwise the whole bootstrap address utxo set is fetched and intersected
+    if (
+        ops.g_chain_backend == "socket"
+        and ops.g_node_version >= lib.node.NODE_TO_CLIENT_V9
+    ):
+        return set(lib.node.node_query_utxo_txin(ops, change_utxos))
+
+    return set(change_utxos) & set(
+        lib.cardano.cardano_cli_query_utxo_dict(ops, ops.g_shelley_address)
+    )
+
+
+def tracker_reconcile(ops: lib.objects.OpsState) -> None:
+    """ Releases the inputs of dropped transactions back to the runtime utxos and sets ops state """
+
+    logger = ops.g_logger
+
+    with ops.g_tracker_lock:
+        dropped = ops.g_tracker_dropped
+        setattr(ops, "g_tracker_dropped", [])
+    if not dropped:
+        return
+
+    # Change of a dropped Tx never existed, so it can not be spent, whether still in
+    # the runtime utxos or as a chained input of another dropped Tx, while the other
+    # inputs are unspent again
+    unspendable = set([tx["change_utxo"] for tx in dropped])
+    runtime_utxos = [utxo for utxo in ops.g_runtime_utxos if utxo[0] not in unspendable]
+    for tx in dropped:
+        released = [utxo for utxo in tx["selected_utxo"] if utxo[0] not in unspendable]
+        runtime_utxos.extend(released)
+        getattr(ops, "g_tx_chain_depths").pop(tx["change_utxo"], None)
+        logger.warning(
+            f"WARNING: Tx {tx['id']} was not confirmed before its ttl and was dropped; {len(released)} inputs were released."
+        )
+
+    # Runtime utxos are sorted descending for `frag` and ascending for `defrag`
+    setattr(
+        ops,
+        "g_runtime_utxos",
+        lib.objects.RuntimeUtxos(
+            lib.cardano.cardano_cli_utxo_list_sort(
+                runtime_utxos,
+                sort_lambda=lambda x: (x[1], x[0]),
+                ascending=not ops.g_frag,
+            )
+        ),
+    )
+    lib.utxo.selection_reset(ops)
+    setattr(ops, "g_tracker_dropped_count", ops.g_tracker_dropped_count + len(dropped))
+
+
+def tracker_run(ops: lib.objects.OpsState) -> None:
+    """ Polls in-flight transactions every tracker interval until stopped """
+
+    logger = ops.g_logger
+
+    while not ops.g_tracker_stop.wait(ops.g_tracker_interval):
+        try:
+            tracker_poll(ops)
+        except (Exception, SystemExit):
+            # Query functions log their own errors; a failed poll is retried next interval
+            logger.warning("WARNING: Unable to poll in-flight Tx confirmations.")
+
+
+def tracker_start(ops: lib.objects.OpsState) -> None:
+    """ Starts the background in-flight transaction tracker and sets ops state """
+
+    if not ops.g_live or ops.g_tracker_interval == 0:
+        return
+
+    thread = threading.Thread(
+        target=tracker_run, args=(ops,), name="tracker_run", daemon=True
+    )
+    thread.start()
+    setattr(ops, "g_tracker_thread", thread)
+
+
+def tracker_stop(ops: lib.objects.OpsState) -> None:
+    """ Waits for in-flight transactions to confirm or drop, stops the tracker and sets ops state """
+
+    logger = ops.g_logger
+
+    if ops.g_tracker_thread is None:
+        return
+
+    # Every in-flight Tx is resolved by the time the tip passes its ttl
+    deadline = (
+        time.time()
+        + ops.TX_TTL_TOLERANCE * lib.cardano.cardano_cli_slot_length(ops)
+        + 2 * ops.g_tracker_interval
+    )
+    with ops.g_tracker_lock:
+        in_flight = len(ops.g_tracker_txs)
+    if in_flight:
+        logger.info(f"Waiting for {in_flight} in-flight Txs to confirm...")
+    while in_flight and time.time() < deadline:
+        time.sleep(ops.g_tracker_interval)
+        with ops.g_tracker_lock:
+            in_flight = len(ops.g_tracker_txs)
+    if in_flight:
+        logger.warning(
+            f"WARNING: {in_flight} Txs were neither confirmed nor dropped when tracking stopped."
+        )
+
+    ops.g_tracker_stop.set()
+    ops.g_tracker_thread.join()
+    setattr(ops, "g_tracker_thread", None)
+    tracker_reconcile(ops)
+
+
+def tracker_summary(ops: lib.objects.OpsState) -> None:
+    """ Logs in-flight transaction tracker totals and confirmation latency percentiles """
+
+    logger = ops.g_logger
+
+    logger.info(
+        "Total transactions confirmed:".ljust(36) + str(len(ops.g_tracker_latencies))
+    )
+    logger.info(
+        "Total transactions dropped:".ljust(36)
+        + str(ops.g_tracker_dropped_count).ljust(16)
+        + f"({ops.g_tracker_resubmits} resubmitted)"
+    )
+    if ops.g_tracker_latencies:
+        percentiles: List[float] = numpy.percentile(
+            ops.g_tracker_latencies, [50, 90, 99]
+        )
+        logger.info(
+            "Confirmation latency p50/p90/p99:".ljust(36)
+            + " / ".join(
+                [lib.utility.time_delta_to_str(float(x), ms=False) for x in percentiles]
+            )
+            + "  (hh:mm:ss)"
+        )
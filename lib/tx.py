@@ -0,0 +1,282 @@
+from typing import Any, Dict, List, Optional, Tuple
+import binascii
+import hashlib
+import json
+import lib.cbor
+import lib.crypto
+import lib.objects
+import lib.utility
+import sys
+import zlib
+
+
+# Fixed serialized sizes of Mary era transaction components, in bytes
+TX_IN_TXID_SIZE: int = lib.cbor.cbor_bytes_len(32)  # Blake2b-256 tx hash
+TX_WITNESS_VKEY_SIZE: int = lib.cbor.cbor_bytes_len(32)  # Ed25519 public key
+TX_WITNESS_SIG_SIZE: int = lib.cbor.cbor_bytes_len(64)  # Ed25519 signature
+TX_WITNESS_CHAIN_CODE_SIZE: int = lib.cbor.cbor_bytes_len(32)  # BIP32 chain code
+
+
+def tx_byron_address_attributes(address: str) -> bytes:
+    """ Returns the raw CBOR attributes map from a base58 Byron address """
+
+    return tx_byron_address_parse(address)[1]
+
+
+def tx_byron_address_build(
+    xpub: bytes, hd_payload: bytes, network_magic: Optional[int]
+) -> str:
+    """ Builds a base58 random derivation Byron address for a child extended public key """
+
+    # Attribute values are CBOR serialized into byte strings: 1 holds the encrypted
+    # derivation path and 2 the network magic, which mainnet addresses omit
+    attributes = {1: lib.cbor.cbor_encode(hd_payload)}
+    if network_magic is not None:
+        attributes[2] = lib.cbor.cbor_encode(network_magic)
+    attributes_cbor = lib.cbor.cbor_encode(attributes)
+
+    payload = lib.cbor.cbor_encode(
+        [
+            tx_byron_address_root(xpub, attributes_cbor),
+            lib.cbor.CborRaw(attributes_cbor),
+            0,
+        ]
+    )
+    address = lib.cbor.cbor_encode([lib.cbor.CborTag(24, payload), zlib.crc32(payload)])
+
+    return lib.utility.base58_encode(address.hex())
+
+
+def tx_byron_address_hd_payload(address: str) -> bytes:
+    """ Returns the encrypted HD payload attribute from a base58 Byron address """
+
+    # Attribute 1 holds the CBOR serialized encrypted derivation path
+    attributes = lib.cbor.cbor_decode(tx_byron_address_parse(address)[1])
+    if not isinstance(attributes, dict) or 1 not in attributes:
+        raise ValueError(f"Byron address has no HD payload: {address}")
+
+    return lib.cbor.cbor_decode(attributes[1])
+
+
+def tx_byron_address_parse(address: str) -> Tuple[bytes, bytes]:
+    """ Returns the address root and raw CBOR attributes map from a base58 Byron address """
+
+    # A Byron address is [tag24(bytes(payload)), crc32] where the payload
+    # is [address_root, attributes, address_type]
+    try:
+        tagged_payload, crc = lib.cbor.cbor_decode(
+            binascii.unhexlify(lib.utility.base58_decode(address))
+        )
+        payload = tagged_payload.value
+        major, info, argument, offset = lib.cbor.cbor_decode_head(payload, 0)
+        if major != 4 or argument != 3:
+            raise ValueError(f"Unexpected Byron address payload structure: {address}")
+        address_root, offset = lib.cbor.cbor_decode_item(payload, offset)
+        attributes_end = lib.cbor.cbor_skip_item(payload, offset)
+    except Exception as e:
+        raise ValueError(f"Unable to parse Byron address {address}: {e}")
+
+    return address_root, payload[offset:attributes_end]
+
+
+def tx_byron_address_root(xpub: bytes, attributes: bytes) -> bytes:
+    """ Returns the Byron address root of a public key address with raw CBOR attributes """
+
+    # The root is the Blake2b-224 of the SHA3-256 of [0, [0, xpub], attributes]
+    return hashlib.blake2b(
+        hashlib.sha3_256(b"\x83\x00\x82\x00\x58\x40" + xpub + attributes).digest(),
+        digest_size=28,
+    ).digest()
+
+
+def tx_bootstrap_witness(
+    signing_key: bytes, address: str, tx_body_hash: bytes
+) -> Tuple[bytes, List[bytes]]:
+    """ Creates a Byron bootstrap witness and returns (key_hash, witness) """
+
+    public_key, chain_code = signing_key[64:96], signing_key[96:128]
+    address_root, attributes = tx_byron_address_parse(address)
+
+    # The witness key hash is the Byron address root
+    key_hash = tx_byron_address_root(public_key + chain_code, attributes)
+    if key_hash != address_root:
+        raise ValueError(f"Signing key does not witness address {address}")
+
+    signature = lib.crypto.crypto_ed25519_sign_extended(signing_key, tx_body_hash)
+
+    return key_hash, [public_key, signature, chain_code, attributes]
+
+
+def tx_body_build(
+    tx_ins: List[str], tx_outs: List[Tuple[str, int]], fee: int, ttl: int
+) -> bytes:
+    """ Serializes a Mary era ada only transaction body to CBOR """
+
+    # Inputs are a set in the ledger and serialize in (tx_hash, tx_ix) order
+    inputs = sorted(
+        [
+            (binascii.unhexlify(tx_hash), int(tx_ix))
+            for tx_hash, tx_ix in [tx_in.split("#") for tx_in in tx_ins]
+        ]
+    )
+    outputs = [
+        (binascii.unhexlify(lib.utility.base58_decode(address)), lovelace)
+        for address, lovelace in tx_outs
+    ]
+
+    return lib.cbor.cbor_encode({0: inputs, 1: outputs, 2: fee, 3: ttl})
+
+
+def tx_body_hash(tx_body: bytes) -> bytes:
+    """ Returns the Blake2b-256 hash of a serialized transaction body """
+
+    return hashlib.blake2b(tx_body, digest_size=32).digest()
+
+
+def tx_body_envelope(tx_body: bytes) -> str:
+    """ Wraps a serialized transaction body in a compact cardano-cli text envelope """
+
+    # The cardano-cli body envelope cbor is [tx_body, scripts, metadata]
+    cbor_hex = (
+        b"\x83" + tx_body + lib.cbor.cbor_encode([]) + lib.cbor.CBOR_NULL_BYTE
+    ).hex()
+
+    return json.dumps(
+        {"type": "TxBodyMary", "description": "", "cborHex": cbor_hex},
+        separators=(",", ":"),
+    )
+
+
+def tx_body_size(
+    tx_ins: List[str], tx_outs: List[Tuple[str, int]], fee: int, ttl: int
+) -> int:
+    """ Returns the exact serialized size of a Mary era ada only transaction body """
+
+    # Inputs are [tx_hash, tx_ix] and outputs are [address, lovelace]
+    ins_size = lib.cbor.cbor_head_len(len(tx_ins)) + sum(
+        [
+            1 + TX_IN_TXID_SIZE + lib.cbor.cbor_head_len(int(tx_in.split("#")[1]))
+            for tx_in in tx_ins
+        ]
+    )
+    outs_size = lib.cbor.cbor_head_len(len(tx_outs)) + sum(
+        [
+            1
+            + lib.cbor.cbor_bytes_len(len(lib.utility.base58_decode(address)) // 2)
+            + lib.cbor.cbor_head_len(lovelace)
+            for address, lovelace in tx_outs
+        ]
+    )
+
+    # Body map of {0: inputs, 1: outputs, 2: fee, 3: ttl}
+    return (
+        1
+        + (1 + ins_size)
+        + (1 + outs_size)
+        + (1 + lib.cbor.cbor_head_len(fee))
+        + (1 + lib.cbor.cbor_head_len(ttl))
+    )
+
+
+def tx_witness_set_size(witness_addresses: List[str]) -> int:
+    """ Returns the exact serialized size of a Byron bootstrap witness set """
+
+    # Each bootstrap witness is [vkey, signature, chain_code, attributes]
+    witnesses_size = lib.cbor.cbor_head_len(len(witness_addresses)) + sum(
+        [
+            1
+            + TX_WITNESS_VKEY_SIZE
+            + TX_WITNESS_SIG_SIZE
+            + TX_WITNESS_CHAIN_CODE_SIZE
+            + lib.cbor.cbor_bytes_len(len(tx_byron_address_attributes(address)))
+            for address in witness_addresses
+        ]
+    )
+
+    # Witness set map of {2: bootstrap_witnesses}
+    return 1 + 1 + witnesses_size
+
+
+def tx_fee_calc(
+    ops: lib.objects.OpsState,
+    tx_ins: List[str],
+    tx_outs: List[Tuple[str, int]],
+    input_sum: int,
+    change_address: str,
+    witness_addresses: List[str],
+    ttl: int,
+    params: Dict[str, Any],
+) -> Tuple[int, int, int]:
+    """ Calculates a stable minimum fee and returns (fee, change, tx_size) """
+
+    logger = ops.g_logger
+
+    output_sum = sum([lovelace for address, lovelace in tx_outs])
+    try:
+        # Size everything except the fee and change lovelace, whose encoded widths
+        # depend on the fee itself; the change output is sized with a zero amount
+        base_size = (
+            1
+            + tx_body_size(tx_ins, tx_outs + [(change_address, 0)], 0, ttl)
+            + tx_witness_set_size(witness_addresses)
+            + 1
+        ) - 2
+    except ValueError:
+        logger.exception("ERROR: Unable to size the transaction for fee calculation.")
+        sys.exit(1)
+
+    # Only the fee and change uint widths vary, so this settles within a few steps
+    tx_fee = 0
+    while True:
+        tx_change = input_sum - output_sum - tx_fee
+        if tx_change < 0:
+            logger.error(
+                f"ERROR: Tx inputs of {input_sum} lovelace do not cover outputs of {output_sum} lovelace plus fee of {tx_fee} lovelace."
+            )
+            sys.exit(1)
+        tx_size = (
+            base_size
+            + lib.cbor.cbor_head_len(tx_fee)
+            + lib.cbor.cbor_head_len(tx_change)
+        )
+        tx_fee_min = params["min_fee_a"] * tx_size + params["min_fee_b"]
+        if tx_fee_min <= tx_fee:
+            break
+        tx_fee = tx_fee_min
+
+    if tx_size > params["max_tx_size"]:
+        logger.error(
+            f"ERROR: The Tx size of {tx_size} bytes exceeds the network maximum of {params['max_tx_size']} bytes."
+        )
+        logger.error(
+            "Reduce the number of Tx inputs (`--max`) or outputs and try again."
+        )
+        sys.exit(1)
+
+    return tx_fee, tx_change, tx_size
+
+
+def tx_signed_build(
+    tx_body: bytes, witnesses: List[Tuple[bytes, List[bytes]]]
+) -> bytes:
+    """ Assembles a signed Mary era transaction from a body and bootstrap witnesses """
+
+    # Witnesses are a set in the ledger and serialize in key hash order
+    bootstrap_witnesses = [witness for key_hash, witness in sorted(witnesses)]
+
+    # The signed tx is [tx_body, {2: bootstrap_witnesses}, metadata]
+    return (
+        b"\x83"
+        + tx_body
+        + lib.cbor.cbor_encode({2: bootstrap_witnesses})
+        + lib.cbor.CBOR_NULL_BYTE
+    )
+
+
+def tx_signed_envelope(tx_signed: bytes) -> str:
+    """ Wraps a serialized signed transaction in a compact cardano-cli text envelope """
+
+    return json.dumps(
+        {"type": "Tx MaryEra", "description": "", "cborHex": tx_signed.hex()},
+        separators=(",", ":"),
+    )
@@ -1,16 +1,21 @@
 from datetime import datetime
-from typing import List, Union
+from typing import List, Tuple, Union
+import atexit
 import base58
 import binascii
 import docopt
 import lib.objects
+import lib.tracker
 import lib.validate
 import logging
 import os
 import pwd
+import queue
+import selectors
 import shutil
 import subprocess
 import sys
+import tempfile
 import time
 
 
@@ -64,6 +69,23 @@ def log_debug_header(logger: logging.Logger, arguments: docopt.Dict) -> None:
     logger.debug(arguments)
 
 
+# A warm bash coprocess reads length prefixed commands from stdin, counted in bytes
+# by localizing LC_ALL=C so commands still run in the user locale, and replies with
+# the return code.  Each command runs in a subshell, which an exit only ends, with
+# its stdout and stderr opened on the coprocess fifos; they are read to EOF, so the
+# output is kept whole, including trailing newlines and late process substitutions.
+SHELL_POOL_DRIVER: str = r"""
+read_cmd() { local LC_ALL=C; IFS= read -r -N "$1" cmd; }
+fifos=$1
+shift
+while IFS= read -r len; do
+  read_cmd "$len" || exit 1
+  (eval "$cmd") < /dev/null > "$fifos/stdout" 2> "$fifos/stderr"
+  printf '%d\n' "$?"
+done
+"""
+
+
 def shell_cmd(
     ops: lib.objects.OpsState,
     cmd: str,
@@ -76,21 +98,12 @@ def shell_cmd(
     """ Executes a shell command and returns stdout, stderr and return code """
 
     logger = ops.g_logger
-    bash_path = ops.g_bash_path
     shell_cmd: Union[List[str], str] = ""
 
     try:
         if shell is True:
             shell_cmd = cmd + " " + " ".join(args)
-            result = subprocess.run(
-                shell_cmd,
-                shell=True,
-                check=check,
-                universal_newlines=True,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                executable=bash_path,
-            )
+            result = shell_pool_cmd(ops, shell_cmd, check=check)
         else:
             shell_cmd = [cmd] + args
             result = subprocess.run(
@@ -120,6 +133,110 @@ def shell_cmd(
     return result
 
 
+def shell_pool_cmd(
+    ops: lib.objects.OpsState, cmd: str, check: bool = False
+) -> subprocess.CompletedProcess:
+    """ Executes a bash command on a warm coprocess from the pool, starting one if none are idle """
+
+    try:
+        worker, fifos = ops.g_shell_pool.get_nowait()
+    except queue.Empty:
+        worker = None
+    if worker is None or worker.poll() is not None:
+        if worker is not None:
+            shutil.rmtree(fifos, ignore_errors=True)
+        # The fifo directory is also removed at exit when an error ends the run
+        # before shell_pool_stop
+        fifos = tempfile.mkdtemp(prefix="defrag-ops-shell-")
+        atexit.register(shutil.rmtree, fifos, ignore_errors=True)
+        os.mkfifo(os.path.join(fifos, "stdout"), 0o600)
+        os.mkfifo(os.path.join(fifos, "stderr"), 0o600)
+        worker = subprocess.Popen(
+            [
+                ops.g_bash_path,
+                "--noprofile",
+                "--norc",
+                "-c",
+                SHELL_POOL_DRIVER,
+                "bash",
+                fifos,
+            ],
+            bufsize=0,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+        )
+
+    try:
+        stdout, returncode, stderr = shell_pool_read(worker, fifos, cmd.encode())
+    except Exception:
+        shutil.rmtree(fifos, ignore_errors=True)
+        raise
+
+    # Only a worker which replied in full is returned to the pool for reuse
+    ops.g_shell_pool.put((worker, fifos))
+
+    result = subprocess.CompletedProcess(
+        cmd, returncode, stdout.decode(), stderr.decode()
+    )
+    if check:
+        result.check_returncode()
+
+    return result
+
+
+def shell_pool_read(
+    worker: subprocess.Popen, fifos: str, request: bytes
+) -> Tuple[bytes, int, bytes]:
+    """ Sends one command to a warm coprocess and reads its stdout, return code and stderr """
+
+    # The fifos are opened without blocking before the command is sent, and read
+    # along with the return code line; a linux fifo only reports EOF once a writer
+    # has opened and closed it, so the reply is complete when the return code is
+    # read and every writer has closed both fifos, while a coprocess which exits
+    # early closes its stdout and fails the read instead of blocking forever
+    assert worker.stdin is not None and worker.stdout is not None
+    status_fd = worker.stdout.fileno()
+    fds = [
+        os.open(os.path.join(fifos, name), os.O_RDONLY | os.O_NONBLOCK)
+        for name in ["stdout", "stderr"]
+    ]
+    outputs = {fd: bytearray() for fd in fds + [status_fd]}
+    try:
+        worker.stdin.write(f"{len(request)}\n".encode() + request)
+        with selectors.DefaultSelector() as selector:
+            for fd in outputs:
+                selector.register(fd, selectors.EVENT_READ)
+            while selector.get_map():
+                for key, events in selector.select():
+                    chunk = os.read(key.fd, 65536)
+                    outputs[key.fd].extend(chunk)
+                    if key.fd == status_fd and not chunk:
+                        raise EOFError("The shell coprocess exited unexpectedly")
+                    elif not chunk or (
+                        key.fd == status_fd and outputs[status_fd].endswith(b"\n")
+                    ):
+                        selector.unregister(key.fd)
+    finally:
+        for fd in fds:
+            os.close(fd)
+
+    return bytes(outputs[fds[0]]), int(outputs[status_fd]), bytes(outputs[fds[1]])
+
+
+def shell_pool_stop(ops: lib.objects.OpsState) -> None:
+    """ Closes all idle warm coprocesses in the pool """
+
+    while True:
+        try:
+            worker, fifos = ops.g_shell_pool.get_nowait()
+        except queue.Empty:
+            break
+        worker.stdin.close()
+        worker.wait()
+        shutil.rmtree(fifos, ignore_errors=True)
+
+
 def time_delta_to_str(time_delta: float, ms: bool = True) -> str:
     """ Returns a user friendly hh:mm:ss[.SSS] string given a time().time delta """
 
@@ -177,6 +294,14 @@ def summary_footer(ops: lib.objects.OpsState) -> None:
         + str(ops.g_sum_tx_outputs).ljust(15)
         + " (not including change_addr)"
     )
+    if ops.g_live and ops.g_tracker_interval > 0:
+        lib.tracker.tracker_summary(ops)
+    if ops.g_timers and ops.g_wallet_api_calls:
+        logger.info(
+            "Wallet API calls (mean latency):".ljust(36)
+            + str(ops.g_wallet_api_calls).ljust(16)
+            + f"({time_delta_to_str(ops.g_wallet_api_time / ops.g_wallet_api_calls)})"
+        )
     logger.info(
         "Elapsed runtime:".ljust(36)
         + f"{time_delta_to_str(time.time() - ops.g_start_time, ms=False)}".ljust(16)
@@ -1,4 +1,5 @@
-from typing import cast, Dict, List, Optional, Tuple, Union
+from typing import Any, Callable, cast, Collection, Dict, List, Optional, Tuple, Union
+import itertools
 import lib.objects
 import lib.utility
 import numpy
@@ -7,68 +8,56 @@ import sys
 import time
 
 
+# Input filter comparisons, vectorized over the lovelace column, and regex targets
+FILTER_COMPARISONS: Dict[str, Callable[[Any, int], Any]] = {
+    "eq": numpy.equal,
+    "ne": numpy.not_equal,
+    "gt": numpy.greater,
+    "gte": numpy.greater_equal,
+    "lt": numpy.less,
+    "lte": numpy.less_equal,
+}
+FILTER_TARGET_COLUMNS: Dict[str, int] = {"utxo": 0, "lovelace": 1, "address": 2}
+
+
 def filter_inputs(ops: lib.objects.OpsState) -> None:
-    """ Filters utxos against a provided input filter and sets ops state """
+    """ Filters utxos against a provided input filter in a single pass and sets ops state """
 
     logger = ops.g_logger
 
+    # Defrag input filters are pushed down into the wallet db utxo query instead
     timer = time.time()
-    if not ops.g_filter_tx_in:
+    if not ops.g_filter_tx_in or not ops.g_frag:
         return
 
-    target: Union[int, str] = ""
-    filtered_utxos = ops.g_runtime_utxos.copy()
-    for utxo, amount, address in ops.g_runtime_utxos:
-        if ops.g_filter_tx_in_target == "utxo":
-            target = utxo
-        elif ops.g_filter_tx_in_target == "address":
-            target = address
-        elif ops.g_filter_tx_in_target == "lovelace":
-            target = amount
-
-        if ops.g_filter_tx_in_method in ["eq", "ne", "gt", "gte", "lt", "lte"]:
-            target_int = cast(int, target)
-            g_filter_tx_in_expr_int = cast(int, ops.g_filter_tx_in_expr)
-            if (
-                ops.g_filter_tx_in_method == "eq"
-                and target_int == g_filter_tx_in_expr_int
-            ):
-                filtered_utxos.remove((utxo, amount, address))
-            elif (
-                ops.g_filter_tx_in_method == "ne"
-                and target_int != g_filter_tx_in_expr_int
-            ):
-                filtered_utxos.remove((utxo, amount, address))
-            elif (
-                ops.g_filter_tx_in_method == "gt"
-                and target_int > g_filter_tx_in_expr_int
-            ):
-                filtered_utxos.remove((utxo, amount, address))
-            elif (
-                ops.g_filter_tx_in_method == "gte"
-                and target_int >= g_filter_tx_in_expr_int
-            ):
-                filtered_utxos.remove((utxo, amount, address))
-            elif (
-                ops.g_filter_tx_in_method == "lt"
-                and target_int < g_filter_tx_in_expr_int
-            ):
-                filtered_utxos.remove((utxo, amount, address))
-            elif (
-                ops.g_filter_tx_in_method == "lte"
-                and target_int <= g_filter_tx_in_expr_int
-            ):
-                filtered_utxos.remove((utxo, amount, address))
-
-        if ops.g_filter_tx_in_method == "re":
-            if re.search(cast(str, ops.g_filter_tx_in_expr), cast(str, target)):
-                filtered_utxos.remove((utxo, amount, address))
-
-    setattr(ops, "g_runtime_utxos", filtered_utxos)
+    # Utxos matching the filter are removed, so each row is kept where the compiled
+    # predicate is false; the predicate is evaluated once over a whole column
+    utxos = ops.g_runtime_utxos
+    if ops.g_filter_tx_in_method == "re":
+        pattern = re.compile(cast(str, ops.g_filter_tx_in_expr))
+        column = FILTER_TARGET_COLUMNS[ops.g_filter_tx_in_target]
+        keep = [not pattern.search(str(row[column])) for row in utxos]
+    else:
+        amounts = numpy.fromiter(
+            (amount for utxo, amount, address in utxos),
+            dtype=numpy.int64,
+            count=len(utxos),
+        )
+        keep = numpy.logical_not(
+            FILTER_COMPARISONS[ops.g_filter_tx_in_method](
+                amounts, cast(int, ops.g_filter_tx_in_expr)
+            )
+        ).tolist()
+    filtered_utxos = list(itertools.compress(utxos, keep))
+
+    setattr(ops, "g_runtime_utxos", lib.objects.RuntimeUtxos(filtered_utxos))
 
     if ops.g_timers:
+        elapsed = time.time() - timer
         logger.info(
-            f"Time to filter inputs: {lib.utility.time_delta_to_str(time.time() - timer)}"
+            f"Time to filter {len(utxos)} inputs, removing {len(utxos) - len(filtered_utxos)}"
+            + (f" at {len(utxos) / elapsed:.0f} rows/sec" if elapsed > 0 else "")
+            + f": {lib.utility.time_delta_to_str(elapsed)}"
         )
 
 
@@ -113,7 +102,7 @@ def generate_lovelace_list(
 
 def generate_tx_inputs(
     ops: lib.objects.OpsState,
-    utxos: List[Tuple[str, int, str]],
+    utxos: Collection[Tuple[str, int, str]],
     min_total: int,
     max_count: Optional[int] = None,
     strategy: str = "min",
@@ -172,36 +161,51 @@ def generate_tx_inputs(
     elif strategy == "max":
         # For defragmentation using the max strategy, utxos are populated from the
         # cardano-wallet sql db and pre-sorted by ascending lovelace value in
-        # fn wallet_db_query_utxo
-        utxo_element_list = []
-        max_allowed = max_count if len(utxos) >= max_count else len(utxos)
-        utxo_amounts = [amount for utxo, amount, address in utxos]
+        # fn wallet_db_query_utxo.  Selection resolves against prefix sums kept across
+        # Txs, where a rank is a utxo's 0 based place among those remaining by lovelace
+        state = selection_state(ops, utxos)
+        remaining = state["count"]
+        max_allowed = max_count if remaining >= max_count else remaining
+        utxo_rank_list = []
 
         # Pre-process the utxo selection to ensure min utxo value for the network plus fee tolerance is met
-        if sum(utxo_amounts[0:max_allowed]) > required_min:
-            utxo_element_list = list(range(0, max_allowed))
+        if selection_sum(state, max_allowed) > required_min:
+            utxo_rank_list = list(range(0, max_allowed))
         else:
             # If the smallest max_allowed utxo elements summed do not meet the required amount, start algorithm A selection
             # Algorithm A: Find a single utxo that added to (max_allowed - 1) smallest utxos summed will meet the required amount
-            utxo_window_sum = sum(utxo_amounts[0 : max_allowed - 1])
-            for utxo_position in range(max_allowed, len(utxo_amounts)):
-                if utxo_window_sum + utxo_amounts[utxo_position] > required_min:
-                    utxo_element_list = list(range(0, max_allowed - 1)) + [
-                        utxo_position
-                    ]
-                    algorithm = "sliding utxo"
-                    break
+            # As amounts are sorted, the first such utxo is found by binary search
+            utxo_window_sum = selection_sum(state, max_allowed - 1)
+            position = int(
+                numpy.searchsorted(
+                    state["store"].coins,
+                    max(required_min - utxo_window_sum, 0),
+                    side="right",
+                )
+            )
+            utxo_rank = max(selection_tree_sum(state["counts"], position), max_allowed)
+            if utxo_rank < remaining:
+                utxo_rank_list = list(range(0, max_allowed - 1)) + [utxo_rank]
+                algorithm = "sliding utxo"
             # If algorithm A does not work, fallback to algorithm B
             # Algorithm B: Slide a utxo window range toward increasing utxo value until the sum of the window range meets the required amount
-            # This algorithm is about 10 times slower than algorithm A
-            if utxo_element_list == []:
-                for offset in range(0, len(utxo_amounts) - (max_allowed - 1)):
-                    if sum(utxo_amounts[offset : max_allowed + offset]) > required_min:
-                        utxo_element_list = list(range(offset, max_allowed + offset))
-                        algorithm = "sliding window"
-                        break
-
-        if len(utxo_element_list) == 0:
+            # Window sums never decrease as the window slides, so the first qualifying offset is found by binary search
+            else:
+                low, high = 0, remaining - max_allowed + 1
+                while low < high:
+                    offset = (low + high) // 2
+                    window_sum = selection_sum(
+                        state, offset + max_allowed
+                    ) - selection_sum(state, offset)
+                    if window_sum > required_min:
+                        high = offset
+                    else:
+                        low = offset + 1
+                if low <= remaining - max_allowed:
+                    utxo_rank_list = list(range(low, low + max_allowed))
+                    algorithm = "sliding window"
+
+        if len(utxo_rank_list) == 0:
             logger.error(
                 "ERROR: Not enough input UTxOs are available to meet the minimum lovelace total required:"
             )
@@ -209,19 +213,22 @@ def generate_tx_inputs(
                 f"Required: {min_total} base Tx output + {ops.TX_FEE_LOVELACE_TOLERANCE} fee padding = {min_total + ops.TX_FEE_LOVELACE_TOLERANCE} lovelace"
             )
             logger.error(
-                f"Maximum available: {sum(utxo_amounts[-max_allowed:])} lovelace at {max_count} inputs"
+                f"Maximum available: {selection_sum(state, remaining) - selection_sum(state, remaining - max_allowed)} lovelace at {max_count} inputs"
             )
             sys.exit(1)
-        elif len(utxo_element_list) != max_allowed:
+        elif len(utxo_rank_list) != max_allowed:
             logger.error(
-                f"ERROR: UTxO input element list length is not an expected value of {max_allowed}: {len(utxo_element_list)}"
+                f"ERROR: UTxO input element list length is not an expected value of {max_allowed}: {len(utxo_rank_list)}"
             )
             sys.exit(1)
 
         # Apply pre-processed utxos element list to build the input list requirements
         count = 0
         total = 0
-        for utxo, amount, address in [utxos[element] for element in utxo_element_list]:
+        for utxo, amount, address in [
+            state["store"].row(selection_position(state, rank))
+            for rank in utxo_rank_list
+        ]:
             if count >= max_count:
                 break
             else:
@@ -280,14 +287,141 @@ def purge_missing_utxos(ops: lib.objects.OpsState) -> None:
     # Use updated ops state to purge any remaining runtime utxos which have disappeared from the network
     # This may occur if the wallet is being used while a frag or defrag operation is occurring
     timer = time.time()
-    if ops.g_frag:
-        missing_utxos = set(ops.g_runtime_utxos) - set(ops.g_cardano_cli_utxo)
-    else:
-        missing_utxos = set(ops.g_runtime_utxos) - set(ops.g_wallet_utxo)
+    source = ops.g_cardano_cli_utxo if ops.g_frag else ops.g_wallet_utxo
+    missing_utxos = [utxo for utxo in ops.g_runtime_utxos if utxo not in source]
     for missing_utxo in missing_utxos:
-        getattr(ops, "g_runtime_utxos").remove(missing_utxo)
+        ops.g_runtime_utxos.discard(missing_utxo)
+    if missing_utxos:
+        selection_reset(ops)
 
     if ops.g_timers:
         logger.info(
             f"Time to purge missing input utxos: {lib.utility.time_delta_to_str(time.time() - timer)}"
         )
+
+
+def selection_build(
+    ops: lib.objects.OpsState, utxos: Collection[Tuple[str, int, str]]
+) -> Dict[str, Any]:
+    """ Builds the prefix sum input selection state over a list of utxos and sets ops state """
+
+    logger = ops.g_logger
+
+    # Utxos are ranked by ascending lovelace, which is already their runtime order for
+    # `defrag`, and tracked in binary indexed trees of lovelace and remaining counts
+    # so prefix sums and ranks both update and resolve in O(log n)
+    timer = time.time()
+    if isinstance(utxos, lib.objects.RuntimeUtxos):
+        store = utxos.to_store()
+    else:
+        store = lib.objects.UtxoStore.from_rows(utxos)
+    if numpy.any(store.coins[1:] < store.coins[:-1]):
+        store = store.take(numpy.argsort(store.coins, kind="stable"))
+
+    # Tree node i holds the sum of the lowbit(i) elements ending at element i, which
+    # is a difference of cumulative sums
+    nodes = numpy.arange(1, len(store) + 1)
+    lowbits = nodes & -nodes
+    cumulative = numpy.concatenate(([0], numpy.cumsum(store.coins, dtype=numpy.int64)))
+    state = {
+        "store": store,
+        "alive": numpy.ones(len(store), dtype=bool),
+        "sums": numpy.concatenate(
+            ([0], cumulative[nodes] - cumulative[nodes - lowbits])
+        ),
+        "counts": numpy.concatenate(([0], lowbits)),
+        "count": len(store),
+    }
+
+    setattr(ops, "g_runtime_selection", state)
+
+    if ops.g_timers:
+        logger.info(
+            f"Time to build the input selection prefix sums over {len(store)} utxos: {lib.utility.time_delta_to_str(time.time() - timer)}"
+        )
+
+    return state
+
+
+def selection_consume(
+    ops: lib.objects.OpsState, utxos: List[Tuple[str, int, str]]
+) -> None:
+    """ Removes consumed utxos from the input selection prefix sums and sets ops state """
+
+    state = ops.g_runtime_selection
+    if not state:
+        return
+
+    for utxo in utxos:
+        row = state["store"].find(utxo)
+        if row < 0 or not state["alive"][row]:
+            # An unknown utxo means the runtime utxos changed underneath the selection
+            selection_reset(ops)
+            return
+        state["alive"][row] = False
+        selection_tree_add(state["sums"], row + 1, -int(state["store"].coins[row]))
+        selection_tree_add(state["counts"], row + 1, -1)
+        state["count"] -= 1
+
+
+def selection_position(state: Dict[str, Any], rank: int) -> int:
+    """ Returns the position of the remaining utxo at a 0 based rank in ascending lovelace order """
+
+    # Descend the remaining counts tree to the last position with fewer than rank + 1
+    # remaining utxos at or before it
+    counts = state["counts"]
+    position = 0
+    step = 1 << (len(counts) - 1).bit_length()
+    while step:
+        if position + step < len(counts) and counts[position + step] <= rank:
+            position += step
+            rank -= counts[position]
+        step >>= 1
+
+    return int(position)
+
+
+def selection_reset(ops: lib.objects.OpsState) -> None:
+    """ Discards the input selection prefix sums after a wholesale runtime utxo change """
+
+    setattr(ops, "g_runtime_selection", {})
+
+
+def selection_state(
+    ops: lib.objects.OpsState, utxos: Collection[Tuple[str, int, str]]
+) -> Dict[str, Any]:
+    """ Returns the input selection prefix sums for utxos, rebuilding them if stale """
+
+    state = ops.g_runtime_selection
+    if not state or state["count"] != len(utxos):
+        state = selection_build(ops, utxos)
+
+    return state
+
+
+def selection_sum(state: Dict[str, Any], rank: int) -> int:
+    """ Returns the lovelace sum of the remaining utxos ranked below rank """
+
+    if rank <= 0:
+        return 0
+
+    return selection_tree_sum(state["sums"], selection_position(state, rank - 1) + 1)
+
+
+def selection_tree_add(tree: numpy.ndarray, index: int, delta: int) -> None:
+    """ Adds delta at a 1 based index of a binary indexed tree """
+
+    while index < len(tree):
+        tree[index] += delta
+        index += index & -index
+
+
+def selection_tree_sum(tree: numpy.ndarray, index: int) -> int:
+    """ Returns the prefix sum up to and including a 1 based index of a binary indexed tree """
+
+    total = 0
+    while index > 0:
+        total += int(tree[index])
+        index -= index & -index
+
+    return total
@@ -1,6 +1,7 @@
 import docopt
 import ipaddress
 import lib.cardano
+import lib.db
 import lib.objects
 import lib.utility
 import lib.wallet
@@ -27,6 +28,27 @@ def confirm(logger: logging.Logger, level: int, prompt: str) -> bool:
     return False
 
 
+def validate_address_prefill(ops: lib.objects.OpsState, count: str) -> None:
+    """ Validates a new address pre-fill size in Txs and sets ops state """
+
+    logger = ops.g_logger
+
+    try:
+        count_int = int(count, 10)
+        if count_int < 0:
+            logger.error(
+                f"ERROR: Address pre-fill size given is not greater than or equal to 0: {count}"
+            )
+            sys.exit(1)
+    except Exception:
+        logger.exception(
+            f"ERROR: Address pre-fill size given is not an integer: {count}"
+        )
+        sys.exit(1)
+
+    setattr(ops, "g_wallet_address_prefill", count_int)
+
+
 def validate_args(ops: lib.objects.OpsState, arguments: docopt.Dict) -> None:
     """ Validates passed arguments from CLI and sets ops state """
 
@@ -73,9 +95,11 @@ def validate_args(ops: lib.objects.OpsState, arguments: docopt.Dict) -> None:
             setattr(ops, "g_tx_output_frag_address", "random")
         elif arguments["--new"]:
             setattr(ops, "g_tx_output_frag_address", "new")
+        elif arguments["--local-new"]:
+            setattr(ops, "g_tx_output_frag_address", "local-new")
         else:
             logger.error(
-                "ERROR: An output address type of `--bootstrap`, `--random`, or `--new` must be specified."
+                "ERROR: An output address type of `--bootstrap`, `--random`, `--new` or `--local-new` must be specified."
             )
             sys.exit(1)
 
@@ -83,22 +107,60 @@ def validate_args(ops: lib.objects.OpsState, arguments: docopt.Dict) -> None:
         if arguments["--even"]:
             setattr(ops, "g_tx_output_evenly", True)
 
+        validate_address_prefill(ops, arguments["--prefill"])
+        validate_tx_chain_depth(ops, arguments["--chain-depth"])
+
     if arguments["defrag"]:
         # Set the mode to `defrag`
         setattr(ops, "g_frag", False)
 
+        validate_tx_batch(ops, arguments["--batch"])
+
+        # Validate a compound input filter if given
+        if arguments["--where"]:
+            validate_filter_where(ops, arguments["--where"])
+
     if arguments["frag"] or arguments["defrag"]:
         validate_wallet_id(ops, arguments["--wid"])
         validate_wallet_id_passphrase(ops, arguments["--wpass"])
         validate_wallet_db(ops, arguments["--wdb"])
         validate_tx_max_inputs(ops, arguments["--max"])
         validate_tx_repeat_count(ops, arguments["--repeat"])
+        validate_pipeline_depth(ops, arguments["--pipeline-depth"])
+        validate_skey_warmup(ops, arguments["--warmup"])
+        validate_params_refresh(ops, arguments["--params-refresh"])
+        validate_chain_backend(ops, arguments["--chain"])
+        validate_tracker_interval(ops, arguments["--track"])
+
+        # Set a slot length, otherwise queried from the node or the fallback
+        if arguments["--slot-length"]:
+            validate_slot_length(ops, arguments["--slot-length"])
+
+        # Set the opt-in persistent key cache path
+        if arguments["--key-cache"]:
+            validate_key_cache(ops, arguments["--key-cache"])
+        if ops.g_tx_batch > 1 and ops.g_pipeline_depth > 0:
+            logger.error(
+                "ERROR: The `--batch` and `--pipeline-depth` options cannot be used together."
+            )
+            sys.exit(1)
+
+        # Chained Txs need each Tx id before the next selection and spend change
+        # which is not yet on chain, so a utxo refresh would purge it
+        if ops.g_tx_chain_depth > 0 and (
+            ops.g_pipeline_depth > 0 or arguments["--dynamic"]
+        ):
+            logger.error(
+                "ERROR: The `--chain-depth` option cannot be used with `--pipeline-depth` or `--dynamic`."
+            )
+            sys.exit(1)
         validate_node_socket_path(
             ops, arguments["--socket"], "CARDANO_NODE_SOCKET_PATH"
         )
         validate_wallet_ip(ops, arguments["--ip"])
         validate_wallet_port(ops, arguments["--port"])
         validate_timeout(ops, arguments["--timeout"])
+        validate_pool_size(ops, arguments["--pool-size"])
 
         # Set the no confirm flag
         if arguments["--no-confirm"]:
@@ -131,6 +193,10 @@ def validate_args(ops: lib.objects.OpsState, arguments: docopt.Dict) -> None:
         if arguments["--dynamic"]:
             setattr(ops, "g_dynamic", True)
 
+        # Set the fee cross-check flag
+        if arguments["--cli-check"]:
+            setattr(ops, "g_cli_check", True)
+
         # Set the http/s protocol
         if arguments["--tls"]:
             setattr(ops, "g_wallet_tls", True)
@@ -377,6 +443,20 @@ def validate_cardano_wallet_version(ops: lib.objects.OpsState) -> None:
     logger.debug(f"cardano-wallet rev: {cardano_wallet_rev}")
 
 
+def validate_chain_backend(ops: lib.objects.OpsState, backend: str) -> None:
+    """ Validates a chain query backend and sets ops state """
+
+    logger = ops.g_logger
+
+    if backend not in ["cli", "socket"]:
+        logger.error(
+            f'ERROR: The chain backend given is not one of "cli" or "socket": {backend}'
+        )
+        sys.exit(1)
+
+    setattr(ops, "g_chain_backend", backend)
+
+
 def validate_deps(ops: lib.objects.OpsState, arguments: docopt.Dict) -> None:
     """ Validates the required dependencies are available """
 
@@ -479,6 +559,20 @@ def validate_filter(
         setattr(ops, "g_filter_tx_in_expr", expression)
 
 
+def validate_filter_where(ops: lib.objects.OpsState, expression: str) -> None:
+    """ Validates a compound input filter expression compiles to SQL and sets ops state """
+
+    logger = ops.g_logger
+
+    try:
+        lib.db.wallet_db_filter_compile(expression)
+    except ValueError as e:
+        logger.error(f"ERROR: Input filter `--where` expression is invalid: {e}")
+        sys.exit(1)
+
+    setattr(ops, "g_filter_where", expression)
+
+
 def validate_ip(logger: logging.Logger, ip: str) -> str:
     """ Validates an IP is valid IPv4 or IPv6 """
 
@@ -492,6 +586,65 @@ def validate_ip(logger: logging.Logger, ip: str) -> str:
     return ip
 
 
+def validate_params_refresh(ops: lib.objects.OpsState, seconds: str) -> None:
+    """ Validates a protocol parameter refresh interval and sets ops state """
+
+    logger = ops.g_logger
+
+    try:
+        seconds_int = int(seconds, 10)
+        if seconds_int < 0:
+            logger.error(
+                f"ERROR: Protocol parameter refresh interval given is not greater than or equal to 0: {seconds}"
+            )
+            sys.exit(1)
+    except Exception:
+        logger.exception(
+            f"ERROR: Protocol parameter refresh interval given is not an integer: {seconds}"
+        )
+        sys.exit(1)
+
+    setattr(ops, "g_network_protocol_params_refresh", seconds_int)
+
+
+def validate_pipeline_depth(ops: lib.objects.OpsState, depth: str) -> None:
+    """ Validates a transaction pipeline depth and sets ops state """
+
+    logger = ops.g_logger
+
+    try:
+        depth_int = int(depth, 10)
+        if depth_int < 0:
+            logger.error(
+                f"ERROR: Transaction pipeline depth given is not greater than or equal to 0: {depth}"
+            )
+            sys.exit(1)
+    except Exception:
+        logger.exception(
+            f"ERROR: Transaction pipeline depth given is not an integer: {depth}"
+        )
+        sys.exit(1)
+
+    setattr(ops, "g_pipeline_depth", depth_int)
+
+
+def validate_pool_size(ops: lib.objects.OpsState, size: str) -> None:
+    """ Validates a wallet API connection pool size and sets ops state """
+
+    logger = ops.g_logger
+
+    try:
+        size_int = int(size, 10)
+        if size_int < 1:
+            logger.error(f"ERROR: Pool size given must be greater than 0: {size}")
+            sys.exit(1)
+    except Exception:
+        logger.exception(f"ERROR: Pool size given is not an integer: {size}")
+        sys.exit(1)
+
+    setattr(ops, "g_wallet_pool_size", size_int)
+
+
 def validate_port(logger: logging.Logger, port: str) -> str:
     """ Validates a port is valid """
 
@@ -506,6 +659,24 @@ def validate_port(logger: logging.Logger, port: str) -> str:
     return port
 
 
+def validate_key_cache(ops: lib.objects.OpsState, path: str) -> None:
+    """ Validates a persistent key cache path and sets ops state """
+
+    logger = ops.g_logger
+
+    directory = os.path.dirname(os.path.abspath(path))
+    if not os.path.isdir(directory) or not os.access(directory, os.W_OK):
+        logger.error(f"ERROR: The key cache directory is not writable: {directory}")
+        sys.exit(1)
+    if os.path.exists(path) and stat.S_IMODE(os.stat(path).st_mode) & 0o077:
+        logger.error(
+            f"ERROR: The key cache file must only be accessible by its owner (chmod 600): {path}"
+        )
+        sys.exit(1)
+
+    setattr(ops, "g_key_cache_path", path)
+
+
 def validate_magic(logger: logging.Logger, magic: str) -> None:
     """ Validates a non-default network magic number is a positive integer or zero """
 
@@ -561,6 +732,46 @@ def validate_node_socket_path(
             setattr(ops, "g_socket_path", cardano_node_socket_path)
 
 
+def validate_skey_warmup(ops: lib.objects.OpsState, megabytes: str) -> None:
+    """ Validates a skey warm-up memory ceiling and sets ops state """
+
+    logger = ops.g_logger
+
+    try:
+        megabytes_int = int(megabytes, 10)
+        if megabytes_int < 0:
+            logger.error(
+                f"ERROR: Skey warm-up memory ceiling given is not greater than or equal to 0: {megabytes}"
+            )
+            sys.exit(1)
+    except Exception:
+        logger.exception(
+            f"ERROR: Skey warm-up memory ceiling given is not an integer: {megabytes}"
+        )
+        sys.exit(1)
+
+    setattr(ops, "g_skey_warmup_mb", megabytes_int)
+
+
+def validate_slot_length(ops: lib.objects.OpsState, seconds: str) -> None:
+    """ Validates a network slot length and sets ops state """
+
+    logger = ops.g_logger
+
+    try:
+        seconds_float = float(seconds)
+        if not 0 < seconds_float <= 3600:
+            logger.error(
+                f"ERROR: Slot length given is not greater than 0 and at most 3600 seconds: {seconds}"
+            )
+            sys.exit(1)
+    except Exception:
+        logger.exception(f"ERROR: Slot length given is not a number: {seconds}")
+        sys.exit(1)
+
+    setattr(ops, "g_network_slot_length", seconds_float)
+
+
 def validate_socket_file(logger: logging.Logger, path: str) -> None:
     """ Validates a socket file exists """
 
@@ -594,6 +805,69 @@ def validate_timeout(ops: lib.objects.OpsState, seconds: str) -> None:
     setattr(ops, "g_api_timeout", seconds_int)
 
 
+def validate_tracker_interval(ops: lib.objects.OpsState, seconds: str) -> None:
+    """ Validates an in-flight transaction confirmation poll interval and sets ops state """
+
+    logger = ops.g_logger
+
+    try:
+        seconds_int = int(seconds, 10)
+        if seconds_int < 0:
+            logger.error(
+                f"ERROR: Tx tracking poll interval given is not greater than or equal to 0: {seconds}"
+            )
+            sys.exit(1)
+    except Exception:
+        logger.exception(
+            f"ERROR: Tx tracking poll interval given is not an integer: {seconds}"
+        )
+        sys.exit(1)
+
+    setattr(ops, "g_tracker_interval", seconds_int)
+
+
+def validate_tx_batch(ops: lib.objects.OpsState, count: str) -> None:
+    """ Validates a transaction batch size and sets ops state """
+
+    logger = ops.g_logger
+
+    try:
+        count_int = int(count, 10)
+        if count_int < 1:
+            logger.error(
+                f"ERROR: Transaction batch size given is not greater than or equal to 1: {count}"
+            )
+            sys.exit(1)
+    except Exception:
+        logger.exception(
+            f"ERROR: Transaction batch size given is not an integer: {count}"
+        )
+        sys.exit(1)
+
+    setattr(ops, "g_tx_batch", count_int)
+
+
+def validate_tx_chain_depth(ops: lib.objects.OpsState, depth: str) -> None:
+    """ Validates a maximum unconfirmed transaction chain depth and sets ops state """
+
+    logger = ops.g_logger
+
+    try:
+        depth_int = int(depth, 10)
+        if depth_int < 0:
+            logger.error(
+                f"ERROR: Transaction chain depth given is not greater than or equal to 0: {depth}"
+            )
+            sys.exit(1)
+    except Exception:
+        logger.exception(
+            f"ERROR: Transaction chain depth given is not an integer: {depth}"
+        )
+        sys.exit(1)
+
+    setattr(ops, "g_tx_chain_depth", depth_int)
+
+
 def validate_tx_max_inputs(ops: lib.objects.OpsState, count: str) -> None:
     """ Validates a maximum number of tx inputs as a constraint argument and sets ops state """
 
@@ -1,12 +1,70 @@
-import collections
+import concurrent.futures
 import json
+import lib.cardano
 import lib.utility
+import numpy
+import queue
 import random
 import requests
+import requests.adapters
 import sys
+import threading
 import time
 
 
+def wallet_address_prefill(ops):
+    """ Keeps the new address pool filled ahead of upcoming `frag` Txs until stopped """
+
+    # Never create more addresses than the remaining Tx repeats can use
+    target = ops.g_wallet_address_prefill * ops.g_tx_output_count
+    needed = ops.g_tx_repeat * ops.g_tx_output_count
+    created = 0
+    while not ops.g_wallet_address_stop.is_set():
+        ops.g_wallet_address_wake.clear()
+        deficit = min(target - ops.g_wallet_address_pool.qsize(), needed - created)
+        if deficit <= 0:
+            ops.g_wallet_address_wake.wait()
+            continue
+
+        try:
+            addresses = wallet_byron_addresses_create(ops, deficit)
+        except (Exception, SystemExit):
+            # Address creation logs its own errors; consumers are told to stop waiting
+            ops.g_wallet_address_pool.put(None)
+            return
+        for address in addresses:
+            ops.g_wallet_address_pool.put(address)
+        created += deficit
+
+
+def wallet_address_prefill_start(ops):
+    """ Starts the background new address pre-fill for `frag --new` ops and sets ops state """
+
+    if ops.g_tx_output_frag_address != "new" or ops.g_wallet_address_prefill == 0:
+        return
+
+    thread = threading.Thread(
+        target=wallet_address_prefill,
+        args=(ops,),
+        name="wallet_address_prefill",
+        daemon=True,
+    )
+    thread.start()
+    setattr(ops, "g_wallet_address_thread", thread)
+
+
+def wallet_address_prefill_stop(ops):
+    """ Stops the background new address pre-fill and sets ops state """
+
+    if ops.g_wallet_address_thread is None:
+        return
+
+    ops.g_wallet_address_stop.set()
+    ops.g_wallet_address_wake.set()
+    ops.g_wallet_address_thread.join()
+    setattr(ops, "g_wallet_address_thread", None)
+
+
 def wallet_api(
     ops, url, method="get", data={}, headers={"Content-type": "application/json"}
 ):
@@ -15,36 +73,68 @@ def wallet_api(
     logger = ops.g_logger
     timeout = (ops.g_api_timeout, ops.g_api_timeout)
 
-    try:
-        if method == "get":
-            request = requests.get(url, timeout=timeout)
-        elif method == "post":
-            request = requests.post(url, data=data, headers=headers, timeout=timeout)
-        else:
-            logger.error(f"ERROR: Unknown api method {method}")
+    session = wallet_session(ops)
+    for attempt in range(ops.WALLET_API_RETRIES + 1):
+        try:
+            timer = time.time()
+            if method == "get":
+                request = session.get(url, timeout=timeout)
+            elif method == "post":
+                request = session.post(url, data=data, headers=headers, timeout=timeout)
+            else:
+                logger.error(f"ERROR: Unknown api method {method}")
+                sys.exit(1)
+            wallet_api_latency(ops, method, url, time.time() - timer)
+
+            # Transient server errors are retried with exponential backoff, but only for
+            # idempotent GETs, as a POST may have succeeded server side, such as one
+            # creating addresses, which a retry would then create again
+            if (
+                method == "get"
+                and request.status_code >= 500
+                and attempt < ops.WALLET_API_RETRIES
+            ):
+                backoff = ops.WALLET_API_RETRY_BACKOFF_SECONDS * 2 ** attempt
+                logger.warning(
+                    f"WARNING: The endpoint returned status {request.status_code}, retrying in {backoff} seconds: {url}"
+                )
+                time.sleep(backoff)
+                continue
+            request.raise_for_status()
+        except requests.exceptions.HTTPError as e:
+            logger.error(f"ERROR: The endpoint returned an unhealthy status: {url}")
+            logger.error("Fix the server health and try again.")
+            logger.error(e)
             sys.exit(1)
-        request.raise_for_status()
-    except requests.exceptions.HTTPError as e:
-        logger.error(f"ERROR: The endpoint returned an unhealthy status: {url}")
-        logger.error("Fix the server health and try again.")
-        logger.error(e)
-        sys.exit(1)
-    except requests.exceptions.ConnectionError as e:
-        logger.error(f"ERROR: Could not connect to endpoint: {url}")
-        logger.error("Fix the server health and try again.")
-        logger.error(e)
-        sys.exit(1)
-    except requests.exceptions.Timeout as e:
-        logger.error(f"ERROR: Timed out trying to connect to: {url}")
-        logger.error("Fix the server health and try again.")
-        logger.error(e)
-        sys.exit(1)
-    except requests.exceptions.RequestException as e:
-        logger.error(f"Error: Exception on GET at endpoint: {url}")
-        logger.error("Fix the server health and try again.")
-        logger.error(e)
-        sys.exit(1)
-    return request
+        except requests.exceptions.ConnectionError as e:
+            logger.error(f"ERROR: Could not connect to endpoint: {url}")
+            logger.error("Fix the server health and try again.")
+            logger.error(e)
+            sys.exit(1)
+        except requests.exceptions.Timeout as e:
+            logger.error(f"ERROR: Timed out trying to connect to: {url}")
+            logger.error("Fix the server health and try again.")
+            logger.error(e)
+            sys.exit(1)
+        except requests.exceptions.RequestException as e:
+            logger.error(f"Error: Exception on GET at endpoint: {url}")
+            logger.error("Fix the server health and try again.")
+            logger.error(e)
+            sys.exit(1)
+        return request
+
+
+def wallet_api_latency(ops, method, url, latency):
+    """ Reports the latency of a wallet api call and sets ops state """
+
+    logger = ops.g_logger
+
+    logger.debug(
+        f"Wallet api {method.upper()} {url} latency: {lib.utility.time_delta_to_str(latency)}"
+    )
+    with ops.g_wallet_api_lock:
+        setattr(ops, "g_wallet_api_calls", ops.g_wallet_api_calls + 1)
+        setattr(ops, "g_wallet_api_time", ops.g_wallet_api_time + latency)
 
 
 def wallet_byron_address_create(ops):
@@ -74,6 +164,17 @@ def wallet_byron_address_create(ops):
     return byron_address_new["id"]
 
 
+def wallet_byron_addresses_create(ops, count):
+    """ Creates count new cardano wallet byron addresses concurrently """
+
+    # Concurrency is bounded by the wallet api connection pool size
+    workers = max(1, min(count, ops.g_wallet_pool_size))
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+        return list(
+            executor.map(lambda x: wallet_byron_address_create(ops), range(0, count))
+        )
+
+
 def wallet_output_addresses(ops, count):
     """ Creates a list of cardano byron addresses """
 
@@ -98,7 +199,26 @@ def wallet_output_addresses(ops, count):
                 )
             ]
     elif ops.g_tx_output_frag_address == "new":
-        addresses = [wallet_byron_address_create(ops) for x in range(0, count)]
+        if ops.g_wallet_address_thread is not None:
+            # Reading stops at the failure marker, or once the pre-fill thread has
+            # ended without leaving enough addresses, rather than waiting forever
+            addresses = []
+            while len(addresses) < count:
+                try:
+                    address = ops.g_wallet_address_pool.get(timeout=1)
+                except queue.Empty:
+                    if ops.g_wallet_address_thread.is_alive():
+                        continue
+                    address = None
+                if address is None:
+                    logger.error("ERROR: Unable to pre-fill new byron addresses.")
+                    sys.exit(1)
+                addresses.append(address)
+            ops.g_wallet_address_wake.set()
+        else:
+            addresses = wallet_byron_addresses_create(ops, count)
+    elif ops.g_tx_output_frag_address == "local-new":
+        addresses = lib.cardano.cardano_native_address_gen(ops, count)
     else:
         logger.error(
             f"ERROR: Unknown cardano wallet address mode: {ops.g_tx_output_frag_address}"
@@ -112,16 +232,49 @@ def wallet_output_addresses(ops, count):
     return addresses
 
 
+def wallet_session(ops):
+    """ Returns the shared keep-alive wallet api session, creating it if needed, and sets ops state """
+
+    with ops.g_wallet_api_lock:
+        if ops.g_wallet_session is None:
+            # One pooled adapter per scheme keeps up to g_wallet_pool_size
+            # connections alive, blocking further concurrent calls until one frees
+            session = requests.Session()
+            adapter = requests.adapters.HTTPAdapter(
+                pool_connections=1,
+                pool_maxsize=ops.g_wallet_pool_size,
+                pool_block=True,
+            )
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            setattr(ops, "g_wallet_session", session)
+
+    return ops.g_wallet_session
+
+
+def wallet_session_close(ops):
+    """ Closes the shared wallet api session and its pooled connections """
+
+    with ops.g_wallet_api_lock:
+        if ops.g_wallet_session is not None:
+            ops.g_wallet_session.close()
+            setattr(ops, "g_wallet_session", None)
+
+
 def wallet_stats(ops):
     """ Determine wallet total UTxO, address and lovelace count and sets ops state """
 
     logger = ops.g_logger
 
+    # Defrag input filters are applied by the wallet db query, which then also
+    # returns the statistics of the whole unfiltered utxo set
     timer = time.time()
-    utxos = len(ops.g_wallet_utxo)
-    addresses = [utxo[2] for utxo in ops.g_wallet_utxo]
-    unique_addresses = len(collections.Counter(addresses).keys())
-    lovelaces = sum([utxo[1] for utxo in ops.g_wallet_utxo])
+    if ops.g_wallet_db_stats is not None:
+        utxos, unique_addresses, lovelaces = ops.g_wallet_db_stats
+    else:
+        utxos = len(ops.g_wallet_utxo)
+        unique_addresses = len(numpy.unique(ops.g_wallet_utxo.address_ids))
+        lovelaces = int(ops.g_wallet_utxo.coins.sum())
 
     setattr(ops, "g_wallet_utxo_count", utxos)
     setattr(ops, "g_wallet_utxo_address_count", unique_addresses)
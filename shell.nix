@@ -17,10 +17,13 @@ mkShell {
     python3
     python3Packages.base58
     python3Packages.black
+    python3Packages.cbor2
     python3Packages.docopt
     python3Packages.flake8
     python3Packages.ipython
     python3Packages.numpy
+    python3Packages.pynacl
+    python3Packages.pytest
     python3Packages.requests
     python3Packages.semver
     shellcheck
@@ -0,0 +1,211 @@
+"""A minimal cardano-node stand-in serving node-to-client queries on a unix socket
+
+Usage: python3 -m tests.fakenode SOCKET_PATH [STATE_JSON]
+
+The optional STATE_JSON file overrides the default chain state below; its "utxo"
+entries are keyed by "tx_hash#tx_ix" with a hex "address" and an integer "value".
+Submitted transactions spending known utxos are accepted, consume them and add
+their outputs, and any others are rejected with a BadInputsUTxO reason.
+"""
+
+from typing import Any, Dict
+import binascii
+import json
+import lib.cbor
+import lib.node
+import lib.tx
+import os
+import socket
+import sys
+import tempfile
+import threading
+import time
+
+
+FAKE_NODE_STATE: Dict[str, Any] = {
+    "magic": 1097911063,
+    "era": 3,
+    "epoch": 120,
+    "slot": 25000000,
+    "hash": "00" * 32,
+    "block": 2500000,
+    "slot_lengths": [20000, 1000, 1000, 1000],
+    "pparams": [44, 155381, 65536, 16384, 1100, 2000000, 500000000, 18, 500]
+    + [[3, 10], [3, 1000], [2, 10], [0, 1], [0], 4, 0, 1000000, 340000000],
+    "utxo": {},
+}
+
+
+def fake_node_query(state: Dict[str, Any], query: Any) -> Any:
+    """ Answers a local-state-query the way a Mary era node would """
+
+    if query == lib.node.NODE_QUERY_CURRENT_ERA:
+        return state["era"]
+    elif query == lib.node.NODE_QUERY_ERA_HISTORY:
+        # Era bounds are not modeled, so every era starts at the origin
+        return [
+            [[0, 0, 0], None, [432000, slot_length, [0, 129600, [0]]]]
+            for slot_length in state["slot_lengths"][0 : state["era"] + 1]
+        ]
+
+    # All other supported queries are era queries which must match the current era
+    tag, (era, era_query) = query
+    if tag != 0 or era != state["era"]:
+        return [state["era"], era]
+
+    if era_query == lib.node.NODE_QUERY_EPOCH_NO:
+        return [state["epoch"]]
+    elif era_query == lib.node.NODE_QUERY_CURRENT_PPARAMS:
+        return [
+            [
+                lib.cbor.CborTag(30, value)
+                if isinstance(value, list) and i < 13
+                else value
+                for i, value in enumerate(state["pparams"])
+            ]
+        ]
+    elif era_query[0] == lib.node.NODE_QUERY_UTXO_BY_ADDRESS:
+        addresses = set(era_query[1].value)
+        utxos = {}
+        for utxo, output in state["utxo"].items():
+            tx_hash, tx_ix = utxo.split("#")
+            address = binascii.unhexlify(output["address"])
+            if address in addresses:
+                utxos[(binascii.unhexlify(tx_hash), int(tx_ix))] = [
+                    address,
+                    output["value"],
+                ]
+        return [utxos]
+    elif era_query[0] == lib.node.NODE_QUERY_UTXO_BY_TXIN:
+        utxos = {}
+        for tx_hash, tx_ix in era_query[1].value:
+            output = state["utxo"].get(f"{tx_hash.hex()}#{tx_ix}")
+            if output is not None:
+                utxos[(tx_hash, tx_ix)] = [
+                    binascii.unhexlify(output["address"]),
+                    output["value"],
+                ]
+        return [utxos]
+    else:
+        raise ValueError(f"Unsupported fake node query: {query}")
+
+
+def fake_node_submit(state: Dict[str, Any], gen_tx: Any) -> Any:
+    """ Accepts or rejects a submitted transaction the way a Mary era node would """
+
+    era, tagged_tx = gen_tx
+    if era != state["era"]:
+        return [2, [era, state["era"]]]
+
+    # A signed tx is [tx_body, witness_set, metadata] with the inputs in body field 0
+    # and the outputs in body field 1; the tx id hashes the body as serialized
+    major, info, argument, offset = lib.cbor.cbor_decode_head(tagged_tx.value, 0)
+    tx_body = tagged_tx.value[offset : lib.cbor.cbor_skip_item(tagged_tx.value, offset)]
+    body = lib.cbor.cbor_decode(tx_body)
+    tx_ins = [f"{tx_hash.hex()}#{tx_ix}" for tx_hash, tx_ix in body[0]]
+    bad_inputs = [tx_in for tx_in in tx_ins if tx_in not in state["utxo"]]
+    if bad_inputs:
+        return [2, [era, ["BadInputsUTxO", bad_inputs]]]
+    for tx_in in tx_ins:
+        del state["utxo"][tx_in]
+
+    # Outputs are spendable at once, as they would be by chained mempool Txs
+    tx_id = lib.tx.tx_body_hash(tx_body).hex()
+    for tx_ix, (address, value) in enumerate(body[1]):
+        state["utxo"][f"{tx_id}#{tx_ix}"] = {"address": address.hex(), "value": value}
+
+    return [1]
+
+
+def fake_node_send(conn: socket.socket, protocol: int, message: Any) -> None:
+    """ Sends a CBOR message from the responder side of a mini-protocol """
+
+    payload = lib.cbor.cbor_encode(message)
+    for offset in range(0, len(payload), lib.node.NODE_MUX_SDU_SIZE):
+        chunk = payload[offset : offset + lib.node.NODE_MUX_SDU_SIZE]
+        conn.sendall(
+            lib.node.NODE_MUX_HEADER.pack(
+                0, protocol | lib.node.NODE_MUX_RESPONDER, len(chunk)
+            )
+            + chunk
+        )
+
+
+def fake_node_serve(path: str, state: Dict[str, Any]) -> None:
+    """ Serves node-to-client connections on a unix socket until interrupted """
+
+    if os.path.exists(path):
+        os.unlink(path)
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(path)
+    server.listen()
+    while True:
+        conn, _ = server.accept()
+        threading.Thread(
+            target=fake_node_session, args=(conn, state), daemon=True
+        ).start()
+
+
+def fake_node_start(state: Dict[str, Any]) -> str:
+    """ Serves a fake node from a background thread and returns its socket path """
+
+    # Unix socket paths are length limited, so the socket is kept in a short tmp dir
+    socket_path = os.path.join(tempfile.mkdtemp(prefix="fakenode"), "node.socket")
+    threading.Thread(
+        target=fake_node_serve, args=(socket_path, state), daemon=True
+    ).start()
+    for _ in range(100):
+        if os.path.exists(socket_path):
+            break
+        time.sleep(0.01)
+
+    return socket_path
+
+
+def fake_node_session(conn: socket.socket, state: Dict[str, Any]) -> None:
+    """ Handles the mini-protocol messages of a single client connection """
+
+    buffers: Dict[int, bytes] = {}
+    with conn:
+        while True:
+            header = conn.recv(lib.node.NODE_MUX_HEADER.size, socket.MSG_WAITALL)
+            if len(header) < lib.node.NODE_MUX_HEADER.size:
+                return
+            timestamp, protocol, length = lib.node.NODE_MUX_HEADER.unpack(header)
+            buffers[protocol] = buffers.get(protocol, b"") + conn.recv(
+                length, socket.MSG_WAITALL
+            )
+            try:
+                message, offset = lib.cbor.cbor_decode_item(buffers[protocol], 0)
+            except (IndexError, ValueError):
+                continue
+            buffers[protocol] = buffers[protocol][offset:]
+
+            if protocol == lib.node.NODE_PROTOCOL_HANDSHAKE:
+                versions = message[1]
+                if state["magic"] not in versions.values():
+                    fake_node_send(conn, protocol, [2, [1, list(versions), "magic"]])
+                    return
+                fake_node_send(conn, protocol, [1, max(versions), state["magic"]])
+            elif protocol == lib.node.NODE_PROTOCOL_CHAIN_SYNC:
+                # The tip is read per request, so tests can advance it mid session
+                point = [state["slot"], binascii.unhexlify(state["hash"])]
+                fake_node_send(conn, protocol, [6, [point, state["block"]]])
+            elif protocol == lib.node.NODE_PROTOCOL_LOCAL_TX_SUBMISSION:
+                if message[0] == 0:
+                    fake_node_send(conn, protocol, fake_node_submit(state, message[1]))
+            elif protocol == lib.node.NODE_PROTOCOL_LOCAL_STATE_QUERY:
+                if message[0] in [0, 8]:
+                    fake_node_send(conn, protocol, [1])
+                elif message[0] == 3:
+                    fake_node_send(
+                        conn, protocol, [4, fake_node_query(state, message[1])]
+                    )
+
+
+if __name__ == "__main__":
+    fake_state = dict(FAKE_NODE_STATE)
+    if len(sys.argv) > 2:
+        with open(sys.argv[2]) as f:
+            fake_state.update(json.load(f))
+    fake_node_serve(sys.argv[1], fake_state)
@@ -0,0 +1,52 @@
+import lib.cardano
+import lib.crypto
+import lib.objects
+import lib.tx
+import logging
+import pytest
+import random
+import tests.test_crypto
+
+
+@pytest.fixture
+def ops() -> lib.objects.OpsState:
+    ops = lib.objects.OpsState(logging.getLogger("test_cardano"))
+    setattr(ops, "g_network", "testnet")
+    setattr(ops, "g_network_id", str(tests.test_crypto.TESTNET_MAGIC))
+    setattr(ops, "g_shelley_root_hd_passphrase", tests.test_crypto.HD_PASSPHRASE)
+    setattr(ops, "g_shelley_root_xprv", tests.test_crypto.ROOT_XPRV)
+
+    return ops
+
+
+def test_cardano_native_address_gen(
+    ops: lib.objects.OpsState, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    # The wallet db holds one used index without and one with the hardened offset
+    setattr(
+        ops,
+        "g_wallet_db_addresses",
+        [
+            ("82d818a0", lib.crypto.HARDENED_OFFSET, 1, "used"),
+            ("82d818b0", 0, lib.crypto.HARDENED_OFFSET + 5, "used"),
+        ],
+    )
+    candidates = iter([1, 5, 7, 1, 7, 9])
+    monkeypatch.setattr(random, "randrange", lambda stop: next(candidates))
+    addresses = lib.cardano.cardano_native_address_gen(ops, 2)
+
+    assert [
+        lib.crypto.crypto_hd_payload_decrypt(
+            tests.test_crypto.HD_PASSPHRASE,
+            lib.tx.tx_byron_address_hd_payload(address),
+        )
+        for address in addresses
+    ] == [
+        [lib.crypto.HARDENED_OFFSET, lib.crypto.HARDENED_OFFSET + 7],
+        [lib.crypto.HARDENED_OFFSET, lib.crypto.HARDENED_OFFSET + 9],
+    ]
+    assert [ops.g_wallet_db_address_drvs[address] for address in addresses] == [
+        {"account_ix": 0, "address_ix": 7},
+        {"account_ix": 0, "address_ix": 9},
+    ]
+    assert {(0, 1), (0, 5), (0, 7), (0, 9)} <= ops.g_wallet_local_indices
@@ -0,0 +1,262 @@
+from typing import List, Tuple
+import json
+import lib.cbor
+import lib.crypto
+import lib.tx
+import nacl.signing
+import pathlib
+import pytest
+import shutil
+import subprocess
+
+
+# Known answer vectors for the "abandon abandon ... about" test mnemonic, computed
+# outside this code base: keys and mainnet and testnet addresses with the Byron
+# legacy implementation in bip_utils 2.12, and witness signatures with the RFC 8032
+# section 6 reference code given the child kL and kR. Where cardano-address and
+# cardano-cli are installed, the vectors are also regenerated and compared with
+# `cardano-address key` / `address bootstrap` and `cardano-cli transaction sign`
+MNEMONIC = " ".join(["abandon"] * 11 + ["about"])
+ROOT_XPRV = bytes.fromhex(
+    "b85bcd28ce24b6e7644edb6d721b380f369627d543099b96e939f2688edd1758"
+    "d008fb1952dd4c90a7ae4ab9b27d1479f9a50abe7a51c80385db284dc5b36fbb"
+    "d1d55468e5ecb65c821e3908a7fd84ba1a101d37c4710301a0637f5af8367342"
+)
+ROOT_XPUB = bytes.fromhex(
+    "415c3fdca455fc0af81f0a47fceb3f6d724f62c0f2f8f9574102e91ec887adbc"
+    "d1d55468e5ecb65c821e3908a7fd84ba1a101d37c4710301a0637f5af8367342"
+)
+HD_PASSPHRASE = bytes.fromhex(
+    "fb8011eda18229a2099c602162cc5602e2738568807f763554d1409a16047078"
+)
+TESTNET_MAGIC = 1097911063
+TX_BODY_HASH = bytes(range(32))
+
+# (account index, address index, child xprv, mainnet address, testnet address,
+#  bootstrap witness signature over TX_BODY_HASH, address root)
+VECTORS = [
+    (
+        "0H",
+        "0H",
+        "54fd208622315257d20d11d343d5b5f5fefe3086c55933679a6af3596ffea800"
+        "dc953c02054114400a319df9521374c4b2f43025876b5f28098aab724dedada7"
+        "ae3692af986408895ab9322f8389a2c047193df463b4b2b5f6adca683c5864ee",
+        "DdzFFzCqrhsi45bifVfbvE2fpg1FhoWvouuw6U5owRcQ1BDEff8vk92cmhC2FuTgn88Z"
+        "SiqGNZACYrns6TtZxWzGPYr4GTh9i3nUmuuJ",
+        "37btjrVyb4KCnRYYDwQkWgK2AAJxdDAAnTk1gcJLUkttVMz3ziL9ScXeYMwAHvUpuw19"
+        "SMqE3BT4C7SLgEruHEeG8TacSjBcXS5Wdq8piVscVLXe1X",
+        "bfa15096e3787448113ccdda10b21d8f93cdd21f47406461454149ee8ed9f0a9"
+        "fec1db5ba51654512be957d5a3915ec28fee78a4b7d6ccbcf7b6b7969a0af90e",
+        "5cef054ea0f0f352e2e8bab0ccf95ab2cd01d9b8453f6bcf46cb3c18",
+    ),
+    (
+        "0H",
+        "1H",
+        "fed4a407d83647671e7f9ff9b0095b1767d6f85515424b7772e25b429766e808"
+        "479aa135d145ac90d01da7acd31f867099ce4ce88423bd760271539fd57e3efb"
+        "873e458a7256052aff9ab43e3f787a49f48f88083439e5bbe973e7065cb8a22f",
+        "DdzFFzCqrht62kKYECkRueB7PpazHWcsxnLWuGAQFm8qkMxyNj5LqmZuP2G1s8MovFZB"
+        "cu3DpbTdDHotCY7c8gXtQaE9cmJZS8ECmFzW",
+        "37btjrVyb4KB3doAniK7ym5Xzr8MuVH4xhQ2vBbVz8Hs94PrfMt8TS1VRXhjboEHToav"
+        "FcwwKFzEPt7gX78V8DS8J2ZNmvAPCG6Zw7heZLv4otAaCQ",
+        "614dddd308f19d9453fe0eacde2acf43053830742d8dbb6816454af01b340fc9"
+        "6d4561add166ffcfb712256da2f92ed504e55837a76d3518498475332554d10f",
+        "0d85be14616bcab2a43fc4ff0793fca58f097c31f3bbe7f1555f60cd",
+    ),
+    (
+        "1H",
+        "5H",
+        "28c6b21256b3e65e45939d17e46729332537a8b5f4021427aa3aabf156668801"
+        "bb4da56e16fe663b06eee2fbca848ef41af63cc70469f25b06fc720fc0873215"
+        "10830b2567b8b98592894fea10e3cd4fa4c6879f6697534d26a02e97301f31dd",
+        "DdzFFzCqrht5kJJEUBXey6UUkszxyxfezGtrNikA73mQd6y83vrGsa4DiQ2ySAdU39Ym"
+        "XyqqjNoNw7jbMSBMXH6w33jYMdoDaCfSUV1w",
+        "37btjrVyb4KEut2MFxaBnaht5XCR2qDsgnbdej21Aj3D9nFGuLLktx9CAJVAUT2m21s9"
+        "Vkq8K6Tt6vE8kKtCJbFqKMNEqFUEPXTbXiFGodN5pRFuoh",
+        "bca6f93cc5ea6fc68790c32d748447239fd50b27c2a68458a07ed2cc08f26a5c"
+        "ecbd93737b88f623ae08df597ecf3a29b18bf3f57845683ed63c604a1fc5d901",
+        "be346f13dc8910cd00bd4d1fba9f17cfa7e3eb25462637761f25299a",
+    ),
+    (
+        "14H",
+        "42H",
+        "4fb95ca9e5244d5e186aec605885aed98c0730268dc223df52cb1aca966ea101"
+        "61ffbf735501d88f5bafe2d5f4f3486a6fcf60383ddd2a261321df846e0ce905"
+        "3185eb3cb6f9aa9cf7238a8c380c8678626aae8bc2f6d616c8d0b6e5279d88cd",
+        "DdzFFzCqrhsjb6TPDyNeFGhMeviYwtqXpwj4owC42WNimSss39pukzGExSn7LDTC3EU1"
+        "81dZEwfKMyUoSsBc9jAoGVZH6xVmBhGRYQv3",
+        "37btjrVyb4KCK6awcLFdmgz4cBbQq2RyTK7R5qr633utHXnCePzNMhu6AwhbqZNnmQcn"
+        "Nv21RowPTqzJxvVJJuqjhCEMruBGxFWg9to1bFVt1iGo22",
+        "23383ac43ae00ae79afb528356d6c50a12a7e1f1def86b186b4b3e95dd252e46"
+        "defbedf2c7bb65033236c4e451670c6241a203f40672c545bfee72620a0ba90b",
+        "476723df2cf041e1433b77f1e5890a5f5724385e8cf74c5296e56dd9",
+    ),
+]
+
+
+def vector_path(account: str, address: str) -> List[int]:
+    """ Returns the hardened derivation path of a vector """
+
+    return [
+        lib.crypto.crypto_index_parse(account),
+        lib.crypto.crypto_index_parse(address),
+    ]
+
+
+def vector_signing_key(account: str, address: str) -> bytes:
+    """ Returns the 128 byte signing key of a vector """
+
+    return lib.crypto.crypto_xprv_to_signing_key(
+        lib.crypto.crypto_xprv_derive_v1(ROOT_XPRV, vector_path(account, address))
+    )
+
+
+def test_root_xpub() -> None:
+    assert lib.crypto.crypto_ed25519_public_key(ROOT_XPRV[0:32]) == ROOT_XPUB[0:32]
+    assert lib.crypto.crypto_hd_passphrase(ROOT_XPUB) == HD_PASSPHRASE
+
+
+@pytest.mark.parametrize("vector", VECTORS)
+def test_child_xprv(vector: Tuple[str, ...]) -> None:
+    account, address, xprv = vector[0:3]
+    child_xprv = lib.crypto.crypto_xprv_derive_v1(
+        ROOT_XPRV, vector_path(account, address)
+    )
+
+    assert child_xprv.hex() == xprv
+
+
+def test_child_xprv_soft_index() -> None:
+    with pytest.raises(ValueError):
+        lib.crypto.crypto_xprv_child_v1(ROOT_XPRV, 0)
+
+
+@pytest.mark.parametrize("vector", VECTORS)
+def test_byron_address(vector: Tuple[str, ...]) -> None:
+    account, address, _, mainnet, testnet = vector[0:5]
+    path = vector_path(account, address)
+    xpub = vector_signing_key(account, address)[64:128]
+    hd_payload = lib.crypto.crypto_hd_payload_encrypt(HD_PASSPHRASE, path)
+
+    assert lib.tx.tx_byron_address_build(xpub, hd_payload, None) == mainnet
+    assert lib.tx.tx_byron_address_build(xpub, hd_payload, TESTNET_MAGIC) == testnet
+
+
+@pytest.mark.parametrize("vector", VECTORS)
+def test_hd_payload_decrypt(vector: Tuple[str, ...]) -> None:
+    account, address, _, mainnet, testnet = vector[0:5]
+    for byron_address in [mainnet, testnet]:
+        hd_payload = lib.tx.tx_byron_address_hd_payload(byron_address)
+
+        assert lib.crypto.crypto_hd_payload_decrypt(
+            HD_PASSPHRASE, hd_payload
+        ) == vector_path(account, address)
+
+
+def test_hd_payload_decrypt_foreign_wallet() -> None:
+    hd_payload = lib.tx.tx_byron_address_hd_payload(VECTORS[0][3])
+
+    with pytest.raises(ValueError):
+        lib.crypto.crypto_hd_payload_decrypt(bytes(32), hd_payload)
+
+
+@pytest.mark.parametrize("vector", VECTORS)
+def test_bootstrap_witness(vector: Tuple[str, ...]) -> None:
+    account, address, _, _, testnet, signature, address_root = vector
+    signing_key = vector_signing_key(account, address)
+    key_hash, witness = lib.tx.tx_bootstrap_witness(signing_key, testnet, TX_BODY_HASH)
+
+    assert key_hash.hex() == address_root
+    assert lib.tx.tx_byron_address_parse(testnet)[0] == key_hash
+    assert witness[0] == signing_key[64:96]
+    assert witness[1].hex() == signature
+    assert witness[2] == signing_key[96:128]
+    assert witness[3] == lib.tx.tx_byron_address_attributes(testnet)
+    assert nacl.signing.VerifyKey(witness[0]).verify(TX_BODY_HASH, witness[1])
+
+
+def test_bootstrap_witness_wrong_address() -> None:
+    signing_key = vector_signing_key(VECTORS[0][0], VECTORS[0][1])
+
+    with pytest.raises(ValueError):
+        lib.tx.tx_bootstrap_witness(signing_key, VECTORS[1][4], TX_BODY_HASH)
+
+
+def cardano_address(args: List[str], stdin: str) -> str:
+    """ Runs a cardano-address command and returns its stripped stdout """
+
+    return subprocess.run(
+        ["cardano-address"] + args,
+        input=stdin,
+        check=True,
+        stdout=subprocess.PIPE,
+        universal_newlines=True,
+    ).stdout.strip()
+
+
+@pytest.mark.skipif(
+    shutil.which("cardano-address") is None, reason="needs cardano-address"
+)
+@pytest.mark.parametrize("vector", VECTORS)
+def test_vector_cardano_address(vector: Tuple[str, ...]) -> None:
+    account, address, xprv, mainnet, testnet = vector[0:5]
+    root_xsk = cardano_address(["key", "from-recovery-phrase", "Byron"], MNEMONIC)
+    root_xvk = cardano_address(["key", "public", "--with-chain-code"], root_xsk)
+    child_xsk = cardano_address(["key", "child", f"{account}/{address}"], root_xsk)
+    child_xvk = cardano_address(["key", "public", "--with-chain-code"], child_xsk)
+
+    assert lib.crypto.crypto_bech32_decode(root_xsk)[1] == ROOT_XPRV
+    assert lib.crypto.crypto_bech32_decode(root_xvk)[1] == ROOT_XPUB
+    assert lib.crypto.crypto_bech32_decode(child_xsk)[1].hex() == xprv
+    for network_tag, byron_address in [
+        ("mainnet", mainnet),
+        (str(TESTNET_MAGIC), testnet),
+    ]:
+        assert (
+            cardano_address(
+                ["address", "bootstrap", "--root", root_xvk]
+                + ["--network-tag", network_tag, f"{account}/{address}"],
+                child_xvk,
+            )
+            == byron_address
+        )
+
+
+@pytest.mark.skipif(
+    shutil.which("cardano-address") is None or shutil.which("cardano-cli") is None,
+    reason="needs cardano-address and cardano-cli",
+)
+@pytest.mark.parametrize("vector", VECTORS)
+def test_bootstrap_witness_cardano_cli(
+    vector: Tuple[str, ...], tmp_path: pathlib.Path
+) -> None:
+    account, address, _, _, testnet = vector[0:5]
+    root_xsk = cardano_address(["key", "from-recovery-phrase", "Byron"], MNEMONIC)
+    (tmp_path / "child.xsk").write_text(
+        cardano_address(["key", "child", f"{account}/{address}"], root_xsk)
+    )
+    tx_body = lib.tx.tx_body_build([f"{TX_BODY_HASH.hex()}#0"], [(testnet, 1)], 0, 0)
+    (tmp_path / "tx.body").write_text(lib.tx.tx_body_envelope(tx_body))
+    subprocess.run(
+        ["cardano-cli", "key", "convert-cardano-address-key", "--byron-payment-key"]
+        + ["--signing-key-file", str(tmp_path / "child.xsk")]
+        + ["--out-file", str(tmp_path / "child.skey")],
+        check=True,
+    )
+    subprocess.run(
+        ["cardano-cli", "transaction", "sign"]
+        + ["--tx-body-file", str(tmp_path / "tx.body")]
+        + ["--signing-key-file", str(tmp_path / "child.skey"), "--address", testnet]
+        + ["--testnet-magic", str(TESTNET_MAGIC)]
+        + ["--out-file", str(tmp_path / "tx.signed")],
+        check=True,
+    )
+    tx_signed = bytes.fromhex(
+        json.loads((tmp_path / "tx.signed").read_text())["cborHex"]
+    )
+    witness = lib.tx.tx_bootstrap_witness(
+        vector_signing_key(account, address), testnet, lib.tx.tx_body_hash(tx_body)
+    )
+
+    assert lib.cbor.cbor_decode(tx_signed)[1] == {2: [witness[1]]}
+    assert tx_signed == lib.tx.tx_signed_build(tx_body, [witness])
@@ -0,0 +1,200 @@
+from typing import Iterator, List
+import lib.db
+import lib.objects
+import lib.validate
+import logging
+import pytest
+import re
+import sqlite3
+
+
+HARDENED = 2147483648
+
+# (utxo, lovelace, address, (account_ix, address_ix) or None) where addresses
+# without indices are not wallet rnd addresses
+UTXOS = [
+    ("aa" * 32 + "#0", 1000000, "82d818a0", (HARDENED, HARDENED + 1)),
+    ("aa" * 32 + "#1", 2000000, "82d818b0", (HARDENED + 1, HARDENED + 5)),
+    ("bb" * 32 + "#0", 3000000, "82d818c0", (HARDENED, HARDENED + 7)),
+    ("bb" * 32 + "#1", 5000000, "82d818d0", None),
+    ("cc" * 32 + "#0", 5000000, "82d818a0", (HARDENED, HARDENED + 1)),
+]
+ASSET_UTXO = ("dd" * 32, 0, 4000000, "82d818a0")
+
+
+@pytest.fixture
+def db() -> Iterator[sqlite3.Connection]:
+    db = sqlite3.connect(":memory:")
+    db.executescript(
+        "CREATE TABLE utxo (input_tx_id TEXT, input_index INTEGER, output_coin INTEGER, output_address TEXT, slot INTEGER);"
+        + "CREATE TABLE utxo_token (tx_id TEXT, tx_index INTEGER, slot INTEGER);"
+        + "CREATE TABLE rnd_state_address (address TEXT, account_ix INTEGER, address_ix INTEGER, status TEXT, slot INTEGER);"
+        + "CREATE TABLE rnd_state_pending_address (address TEXT, account_ix INTEGER, address_ix INTEGER);"
+    )
+
+    # Stale slots are ignored, and the third address is only pending
+    for slot in [1, 2]:
+        db.executemany(
+            "INSERT INTO utxo VALUES (?, ?, ?, ?, ?)",
+            [
+                (*utxo.split("#"), lovelace, address, slot)
+                for utxo, lovelace, address, indices in UTXOS
+            ]
+            + [(*ASSET_UTXO, slot)],
+        )
+        db.execute("INSERT INTO utxo_token VALUES (?, ?, ?)", (*ASSET_UTXO[0:2], slot))
+        db.executemany(
+            "INSERT INTO rnd_state_address VALUES (?, ?, ?, ?, ?)",
+            [
+                (address, indices[0] + 2 - slot, indices[1], "used", slot)
+                for address, indices in [
+                    (UTXOS[0][2], UTXOS[0][3]),
+                    (UTXOS[1][2], UTXOS[1][3]),
+                ]
+            ],
+        )
+    db.execute(
+        "INSERT INTO rnd_state_pending_address VALUES (?, ?, ?)",
+        (UTXOS[2][2], *UTXOS[2][3]),
+    )
+    yield db
+
+    db.close()
+
+
+@pytest.fixture
+def ops() -> lib.objects.OpsState:
+    ops = lib.objects.OpsState(logging.getLogger("test_db"))
+    setattr(ops, "g_frag", False)
+
+    return ops
+
+
+def query_utxos(
+    ops: lib.objects.OpsState, db: sqlite3.Connection, where: str
+) -> List[int]:
+    """ Returns the positions in UTXOS of the utxos kept by a `--where` expression """
+
+    setattr(ops, "g_filter_where", where)
+    lib.db.wallet_db_query_utxo(ops, db)
+
+    return sorted(
+        [
+            [utxo for utxo, lovelace, address, indices in UTXOS].index(row[0])
+            for row in ops.g_wallet_utxo
+        ]
+    )
+
+
+@pytest.mark.parametrize(
+    "where, expected",
+    [
+        ("lovelace gte 1", [0, 1, 2, 3, 4]),
+        # and binds tighter than or, and operators are case insensitive
+        ("lovelace gt 2000000 or lovelace eq 1000000 and account_ix eq 1", [2, 3, 4]),
+        (
+            "lovelace gt 2000000 OR lovelace eq 2000000 AND account_ix eq 1",
+            [1, 2, 3, 4],
+        ),
+        ("( lovelace gt 2000000 or lovelace eq 2000000 ) and account_ix eq 0", [2, 4]),
+        ("(lovelace gt 2000000 or lovelace eq 2000000) and account_ix eq 0", [2, 4]),
+        (
+            "lovelace lt 5000000 and address_ix in 1..5 or utxo eq " + UTXOS[3][0],
+            [0, 1, 3],
+        ),
+        # not binds tighter than and, and may be repeated
+        ("not lovelace lt 3000000 and lovelace lt 5000000", [2]),
+        ("not ( lovelace lt 3000000 and lovelace gt 1000000 )", [0, 2, 3, 4]),
+        ("NOT not address_ix in 5..7", [1, 2]),
+        # A utxo at an address without indices never matches an index predicate,
+        # so it is kept by the negation of one rather than dropped as NULL
+        ("account_ix eq 0", [0, 2, 4]),
+        ("not account_ix eq 0", [1, 3]),
+        ("account_ix ne 0", [1]),
+        ("not address_ix in 0..100", [3]),
+        ("not account_ix re ^0$", [1, 3]),
+        # Regular expressions use python search semantics on the text of a column
+        ("address re ^82d818[ab]0$", [0, 1, 4]),
+        ("utxo re #1$", [1, 3]),
+        ("utxo re '#1$'", [1, 3]),
+        ("not utxo re ^aa", [2, 3, 4]),
+        ("lovelace re ^[23]", [1, 2]),
+        ("address ne 82d818a0 and address ne 82d818b0", [2, 3]),
+        ("lovelace gt 9000000", []),
+    ],
+)
+def test_wallet_db_filter_where(
+    ops: lib.objects.OpsState, db: sqlite3.Connection, where: str, expected: List[int]
+) -> None:
+    assert query_utxos(ops, db, where) == expected
+
+
+def test_wallet_db_filter_clause(
+    ops: lib.objects.OpsState, db: sqlite3.Connection
+) -> None:
+    # A `--filter` removes its matches, including inputs without indices
+    setattr(ops, "g_filter_tx_in", True)
+    setattr(ops, "g_filter_tx_in_target", "lovelace")
+    setattr(ops, "g_filter_tx_in_method", "eq")
+    setattr(ops, "g_filter_tx_in_expr", 5000000)
+
+    assert query_utxos(ops, db, "") == [0, 1, 2]
+    assert query_utxos(ops, db, "not account_ix eq 1") == [0, 2]
+    assert ops.g_wallet_db_stats == (5, 4, 16000000)
+
+
+def test_wallet_db_filter_compile() -> None:
+    assert lib.db.wallet_db_filter_compile(
+        "lovelace in 1..2 or not ( address eq x and utxo re y )"
+    ) == (
+        "(COALESCE(utxo.output_coin BETWEEN ? AND ?, 0) OR "
+        + "NOT (COALESCE(utxo.output_address = ?, 0) AND "
+        + "COALESCE((utxo.input_tx_id || '#' || utxo.input_index) REGEXP ?, 0)))",
+        [1, 2, "x", "y"],
+        False,
+    )
+    assert lib.db.wallet_db_filter_compile("address_ix gt 1")[2]
+
+
+@pytest.mark.parametrize(
+    "where, message",
+    [
+        ("", "empty"),
+        ("address eq 'abc", "tokenize"),
+        ("lovelace gt", "Incomplete"),
+        ("lovelace gt 1 and", "ends unexpectedly"),
+        ("not", "ends unexpectedly"),
+        ("( lovelace gt 1", "unclosed"),
+        ("lovelace gt 1 )", 'token: ")"'),
+        ("lovelace gt 1 lovelace lt 2", 'token: "lovelace"'),
+        ("lovelace gt 1 xor lovelace lt 2", 'token: "xor"'),
+        ("( )", "Incomplete"),
+        ("coin gt 1", "TARGET must be one of"),
+        ("lovelace like 1", "METHOD must be one of"),
+        ("lovelace gt 1.5", "requires an integer"),
+        ("account_ix eq x", "requires an integer"),
+        ("utxo gt 1", "must use a METHOD"),
+        ("address lte 1", "must use a METHOD"),
+        ("lovelace in 1-2", "LOW..HIGH"),
+        ("lovelace in 1..2..3", "LOW..HIGH"),
+        ("address in 1..2", "Invalid filter range"),
+        ("lovelace in 5..1", "Invalid filter range"),
+        ("lovelace in -1..2", "Invalid filter range"),
+        ("address re (", "Invalid python regular expression"),
+    ],
+)
+def test_wallet_db_filter_compile_invalid(
+    ops: lib.objects.OpsState, where: str, message: str
+) -> None:
+    with pytest.raises(ValueError, match=re.escape(message)):
+        lib.db.wallet_db_filter_compile(where)
+
+    with pytest.raises(SystemExit):
+        lib.validate.validate_filter_where(ops, where)
+    assert ops.g_filter_where == ""
+
+
+def test_validate_filter_where(ops: lib.objects.OpsState) -> None:
+    lib.validate.validate_filter_where(ops, "lovelace gt 1")
+
+    assert ops.g_filter_where == "lovelace gt 1"
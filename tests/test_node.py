@@ -0,0 +1,194 @@
+from typing import Any, Dict, Iterator
+import binascii
+import copy
+import lib.cbor
+import lib.node
+import lib.objects
+import lib.tx
+import logging
+import os
+import pytest
+import shutil
+import tests.fakenode
+
+
+ADDRESS = (
+    "37btjrVyb4KCnRYYDwQkWgK2AAJxdDAAnTk1gcJLUkttVMz3ziL9ScXeYMwAHvUpuw19"
+    "SMqE3BT4C7SLgEruHEeG8TacSjBcXS5Wdq8piVscVLXe1X"
+)
+ADDRESS_HEX = binascii.hexlify(lib.node.node_address_bytes(ADDRESS)).decode()
+POLICY_ID = bytes.fromhex("11" * 28)
+TX_HASH = "aa" * 32
+
+
+@pytest.fixture
+def state() -> Dict[str, Any]:
+    fake_state = copy.deepcopy(tests.fakenode.FAKE_NODE_STATE)
+    fake_state["utxo"] = {
+        f"{TX_HASH}#0": {"address": ADDRESS_HEX, "value": 5000000},
+        f"{TX_HASH}#1": {
+            "address": ADDRESS_HEX,
+            "value": [2000000, {POLICY_ID: {b"coin": 7}}],
+        },
+    }
+
+    return fake_state
+
+
+@pytest.fixture
+def ops(state: Dict[str, Any]) -> Iterator[lib.objects.OpsState]:
+    socket_path = tests.fakenode.fake_node_start(state)
+    ops = lib.objects.OpsState(logging.getLogger("test_node"))
+    setattr(ops, "g_api_timeout", 5)
+    setattr(ops, "g_network_id", str(state["magic"]))
+    setattr(ops, "g_socket_path", socket_path)
+    yield ops
+
+    lib.node.node_close(ops)
+    shutil.rmtree(os.path.dirname(socket_path))
+
+
+def test_handshake(ops: lib.objects.OpsState) -> None:
+    with ops.g_node_lock:
+        lib.node.node_connect(ops)
+
+    assert ops.g_node_version == max(lib.node.NODE_TO_CLIENT_VERSIONS)
+    assert ops.g_node_era == 3
+
+
+def test_handshake_refused(ops: lib.objects.OpsState) -> None:
+    setattr(ops, "g_network_id", "764824073")
+
+    with pytest.raises(SystemExit):
+        with ops.g_node_lock:
+            lib.node.node_connect(ops)
+
+    # The refused session is closed rather than left half set up
+    assert ops.g_node_socket is None
+
+
+def test_node_tip_get(ops: lib.objects.OpsState) -> None:
+    assert lib.node.node_tip_get(ops) == {
+        "epoch": 120,
+        "hash": "00" * 32,
+        "slot": 25000000,
+        "block": 2500000,
+        "era": "Mary",
+    }
+
+
+def test_node_tip_get_acquire_by_point(
+    ops: lib.objects.OpsState, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(
+        lib.node,
+        "NODE_TO_CLIENT_VERSIONS",
+        [v for v in lib.node.NODE_TO_CLIENT_VERSIONS if v < lib.node.NODE_TO_CLIENT_V8],
+    )
+
+    assert lib.node.node_tip_get(ops)["epoch"] == 120
+    assert ops.g_node_version < lib.node.NODE_TO_CLIENT_V8
+
+
+def test_node_slot_length(ops: lib.objects.OpsState, state: Dict[str, Any]) -> None:
+    state["slot_lengths"] = [20000, 2000, 500, 250]
+
+    assert lib.node.node_slot_length(ops) == 0.25
+
+
+def test_node_protocol_params(ops: lib.objects.OpsState) -> None:
+    assert lib.node.node_protocol_params(ops) == {
+        "txFeePerByte": 44,
+        "txFeeFixed": 155381,
+        "maxBlockBodySize": 65536,
+        "maxTxSize": 16384,
+        "maxBlockHeaderSize": 1100,
+        "keyDeposit": 2000000,
+        "poolDeposit": 500000000,
+        "poolRetireMaxEpoch": 18,
+        "stakePoolTargetNum": 500,
+        "poolPledgeInfluence": 0.3,
+        "monetaryExpansion": 0.003,
+        "treasuryCut": 0.2,
+        "decentralisationParam": 0.0,
+        "extraPraosEntropy": None,
+        "minUTxOValue": 1000000,
+        "minPoolCost": 340000000,
+        "protocolVersion": {"major": 4, "minor": 0},
+    }
+
+
+def test_node_query_utxo(ops: lib.objects.OpsState) -> None:
+    assert lib.node.node_query_utxo(ops, ADDRESS) == {
+        f"{TX_HASH}#0": {"address": ADDRESS, "value": {"lovelace": 5000000}},
+        f"{TX_HASH}#1": {
+            "address": ADDRESS,
+            "value": {"lovelace": 2000000, POLICY_ID.hex(): {b"coin".hex(): 7}},
+        },
+    }
+
+
+def test_node_query_utxo_split_sdu(
+    ops: lib.objects.OpsState, state: Dict[str, Any]
+) -> None:
+    for tx_ix in range(1000):
+        state["utxo"][f"{'bb' * 32}#{tx_ix}"] = {"address": ADDRESS_HEX, "value": 1}
+
+    # The reply is several times the mux segment size, so it spans several SDUs
+    reply = tests.fakenode.fake_node_query(
+        state,
+        [
+            0,
+            [
+                3,
+                [
+                    lib.node.NODE_QUERY_UTXO_BY_ADDRESS,
+                    lib.cbor.CborTag(258, [binascii.unhexlify(ADDRESS_HEX)]),
+                ],
+            ],
+        ],
+    )
+    assert len(lib.cbor.cbor_encode([4, reply])) > 3 * lib.node.NODE_MUX_SDU_SIZE
+
+    utxos = lib.node.node_query_utxo(ops, ADDRESS)
+    assert len(utxos) == 1002
+    assert utxos[f"{'bb' * 32}#999"] == {"address": ADDRESS, "value": {"lovelace": 1}}
+
+
+def test_node_query_utxo_txin(ops: lib.objects.OpsState) -> None:
+    assert lib.node.node_query_utxo_txin(ops, [f"{TX_HASH}#0", f"{'cc' * 32}#0"]) == {
+        f"{TX_HASH}#0": {"address": ADDRESS, "value": {"lovelace": 5000000}},
+    }
+
+
+def test_node_query_utxo_txin_unsupported(
+    ops: lib.objects.OpsState, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(
+        lib.node,
+        "NODE_TO_CLIENT_VERSIONS",
+        [v for v in lib.node.NODE_TO_CLIENT_VERSIONS if v < lib.node.NODE_TO_CLIENT_V9],
+    )
+
+    with pytest.raises(SystemExit):
+        lib.node.node_query_utxo_txin(ops, [f"{TX_HASH}#0"])
+
+
+def test_node_tx_submit_accepted(
+    ops: lib.objects.OpsState, state: Dict[str, Any]
+) -> None:
+    tx_body = lib.tx.tx_body_build([f"{TX_HASH}#0"], [(ADDRESS, 4800000)], 200000, 0)
+    tx_id = lib.tx.tx_body_hash(tx_body).hex()
+
+    # The fake node checks inputs only, so an unwitnessed tx is accepted
+    assert lib.node.node_tx_submit(ops, [lib.tx.tx_signed_build(tx_body, [])]) == [None]
+    assert f"{TX_HASH}#0" not in state["utxo"]
+    assert state["utxo"][f"{tx_id}#0"] == {"address": ADDRESS_HEX, "value": 4800000}
+
+
+def test_node_tx_submit_rejected(ops: lib.objects.OpsState) -> None:
+    tx_body = lib.tx.tx_body_build([f"{'cc' * 32}#0"], [(ADDRESS, 4800000)], 200000, 0)
+
+    assert lib.node.node_tx_submit(ops, [lib.tx.tx_signed_build(tx_body, [])]) == [
+        [3, ["BadInputsUTxO", [f"{'cc' * 32}#0"]]]
+    ]
@@ -0,0 +1,255 @@
+from typing import Any, Dict, Iterator, List, Tuple
+import copy
+import lib.cardano
+import lib.node
+import lib.objects
+import lib.tracker
+import lib.tx
+import lib.utility
+import logging
+import os
+import pytest
+import shutil
+import tests.fakenode
+import tests.test_node
+
+
+ADDRESS = tests.test_node.ADDRESS
+TX_HASH = tests.test_node.TX_HASH
+
+
+@pytest.fixture
+def state() -> Dict[str, Any]:
+    fake_state = copy.deepcopy(tests.fakenode.FAKE_NODE_STATE)
+    fake_state["utxo"] = {
+        f"{TX_HASH}#0": {"address": tests.test_node.ADDRESS_HEX, "value": 5000000},
+    }
+
+    return fake_state
+
+
+@pytest.fixture
+def ops(state: Dict[str, Any]) -> Iterator[lib.objects.OpsState]:
+    socket_path = tests.fakenode.fake_node_start(state)
+    ops = lib.objects.OpsState(logging.getLogger("test_tracker"))
+    setattr(ops, "g_api_timeout", 5)
+    setattr(ops, "g_cardano_cli_tag", "1.27.0")
+    setattr(ops, "g_chain_backend", "socket")
+    setattr(ops, "g_network_id", str(state["magic"]))
+    setattr(ops, "g_shelley_address", ADDRESS)
+    setattr(ops, "g_socket_path", socket_path)
+    yield ops
+
+    lib.node.node_close(ops)
+    shutil.rmtree(os.path.dirname(socket_path))
+
+
+def tracked_tx(
+    ops: lib.objects.OpsState,
+    selected_utxo: List[Tuple[str, int, str]],
+    ttl: int,
+    submit: bool = True,
+) -> Dict[str, Any]:
+    """ Builds an unwitnessed Tx paying change to the bootstrap address and tracks it """
+
+    tx_outs = [(ADDRESS, 1000000)]
+    change = sum([amount for utxo, amount, address in selected_utxo]) - 1200000
+    tx_body = lib.tx.tx_body_build(
+        [utxo for utxo, amount, address in selected_utxo],
+        tx_outs + [(ADDRESS, change)],
+        200000,
+        ttl,
+    )
+    tx = {
+        "id": lib.tx.tx_body_hash(tx_body).hex(),
+        "tx_outs": tx_outs,
+        "selected_utxo": selected_utxo,
+        "signed": lib.tx.tx_signed_envelope(lib.tx.tx_signed_build(tx_body, [])),
+        "ttl": ttl,
+    }
+    if submit:
+        lib.cardano.cardano_node_tx_submit(ops, [tx])
+        assert tx["submit_result"] is None
+    lib.tracker.tracker_add(ops, tx)
+
+    return tx
+
+
+def tip_advance(state: Dict[str, Any], slots: int) -> None:
+    """ Moves the fake node tip forward to a new block """
+
+    state["slot"] += slots
+    state["block"] += 1
+    state["hash"] = f"{state['block'] % 256:02x}" * 32
+
+
+@pytest.mark.parametrize("versions", ["txin", "address"])
+def test_tracker_poll_confirmed(
+    ops: lib.objects.OpsState,
+    state: Dict[str, Any],
+    monkeypatch: pytest.MonkeyPatch,
+    versions: str,
+) -> None:
+    # Nodes before V9 can not query by TxIn, so the bootstrap address is queried
+    if versions == "address":
+        monkeypatch.setattr(
+            lib.node,
+            "NODE_TO_CLIENT_VERSIONS",
+            [
+                v
+                for v in lib.node.NODE_TO_CLIENT_VERSIONS
+                if v < lib.node.NODE_TO_CLIENT_V9
+            ],
+        )
+    tx = tracked_tx(ops, [(f"{TX_HASH}#0", 5000000, ADDRESS)], 25000100)
+    lib.tracker.tracker_poll(ops)
+
+    assert ops.g_tracker_txs == {}
+    assert len(ops.g_tracker_latencies) == 1
+    assert ops.g_tracker_tip_id == "00" * 32
+    assert f"{tx['id']}#1" in state["utxo"]
+
+
+def test_tracker_poll_chained(ops: lib.objects.OpsState) -> None:
+    # The second Tx spends the first Tx's change, which is then no longer on chain
+    first = tracked_tx(ops, [(f"{TX_HASH}#0", 5000000, ADDRESS)], 25000100)
+    tracked_tx(ops, [(f"{first['id']}#1", 3800000, ADDRESS)], 25000100)
+    lib.tracker.tracker_poll(ops)
+
+    assert ops.g_tracker_txs == {}
+    assert len(ops.g_tracker_latencies) == 2
+
+
+def test_tracker_poll_new_tip(ops: lib.objects.OpsState, state: Dict[str, Any]) -> None:
+    tx = tracked_tx(ops, [(f"{TX_HASH}#0", 5000000, ADDRESS)], 25000100, False)
+    lib.tracker.tracker_poll(ops)
+    lib.cardano.cardano_node_tx_submit(ops, [tx])
+
+    # Utxos are only queried again once the tip moves to a new block
+    lib.tracker.tracker_poll(ops)
+    assert list(ops.g_tracker_txs) == [tx["id"]]
+
+    tip_advance(state, 20)
+    lib.tracker.tracker_poll(ops)
+    assert ops.g_tracker_txs == {}
+
+
+def test_tracker_poll_dropped(ops: lib.objects.OpsState, state: Dict[str, Any]) -> None:
+    tx = tracked_tx(ops, [(f"{TX_HASH}#0", 5000000, ADDRESS)], 25000100, False)
+    lib.tracker.tracker_poll(ops)
+    assert list(ops.g_tracker_txs) == [tx["id"]]
+
+    tip_advance(state, 100)
+    lib.tracker.tracker_poll(ops)
+    assert ops.g_tracker_txs == {}
+    assert [dropped["id"] for dropped in ops.g_tracker_dropped] == [tx["id"]]
+    assert ops.g_tracker_latencies == []
+
+
+def test_tracker_poll_resubmit(
+    ops: lib.objects.OpsState, state: Dict[str, Any]
+) -> None:
+    tx = tracked_tx(ops, [(f"{TX_HASH}#0", 5000000, ADDRESS)], 25000100, False)
+    ops.g_tracker_txs[tx["id"]]["submitted"] -= ops.TRACKER_RESUBMIT_SECONDS + 1
+
+    # A stalled Tx is resubmitted only once
+    lib.tracker.tracker_poll(ops)
+    lib.tracker.tracker_poll(ops)
+    assert ops.g_tracker_resubmits == 1
+    assert ops.g_tracker_txs[tx["id"]]["resubmitted"]
+    assert f"{tx['id']}#1" in state["utxo"]
+
+    tip_advance(state, 20)
+    lib.tracker.tracker_poll(ops)
+    assert ops.g_tracker_txs == {}
+
+
+@pytest.mark.parametrize(
+    "tip",
+    [
+        {"slot": 25000100, "hash": "ab" * 32, "block": 1},
+        {"slotNo": 25000100, "headerHash": "ab" * 32, "blockNo": 1},
+    ],
+)
+def test_tracker_poll_cli_tip(
+    ops: lib.objects.OpsState, monkeypatch: pytest.MonkeyPatch, tip: Dict[str, Any]
+) -> None:
+    # cardano-cli tips of node 1.25.1 and earlier name the slot "slotNo"
+    setattr(ops, "g_chain_backend", "cli")
+    monkeypatch.setattr(lib.cardano, "cardano_cli_tip_get", lambda ops: tip)
+    monkeypatch.setattr(lib.tracker, "tracker_query", lambda ops, utxos: set())
+    tx = tracked_tx(ops, [(f"{TX_HASH}#0", 5000000, ADDRESS)], 25000100, False)
+    lib.tracker.tracker_poll(ops)
+
+    assert ops.g_tracker_tip_id == "ab" * 32
+    assert [dropped["id"] for dropped in ops.g_tracker_dropped] == [tx["id"]]
+
+
+def test_tracker_poll_cli_tip_invalid(
+    ops: lib.objects.OpsState, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(lib.cardano, "cardano_cli_tip_get", lambda ops: {"block": 1})
+    tracked_tx(ops, [(f"{TX_HASH}#0", 5000000, ADDRESS)], 25000100, False)
+
+    with pytest.raises(SystemExit):
+        lib.tracker.tracker_poll(ops)
+
+
+@pytest.mark.parametrize("frag", [True, False])
+def test_tracker_reconcile(ops: lib.objects.OpsState, frag: bool) -> None:
+    utxos = [(f"{'%02x' % i * 32}#0", i * 1000000, ADDRESS) for i in range(1, 6)]
+    first = tracked_tx(ops, utxos[1:3], 25000100, False)
+    first_change = (f"{first['id']}#1", 5800000, ADDRESS)
+    second = tracked_tx(ops, [first_change, utxos[3]], 25000100, False)
+    second_change = (f"{second['id']}#1", 8600000, ADDRESS)
+
+    # Both Txs were dropped after a `frag` run chained the second into the runtime utxos
+    setattr(ops, "g_frag", frag)
+    setattr(ops, "g_runtime_utxos", lib.objects.RuntimeUtxos([second_change, utxos[0]]))
+    setattr(ops, "g_tx_chain_depths", {first_change[0]: 1, second_change[0]: 2})
+    setattr(ops, "g_runtime_selection", {"count": 2})
+    setattr(
+        ops,
+        "g_tracker_dropped",
+        [ops.g_tracker_txs.pop(tx["id"]) for tx in [first, second]],
+    )
+    lib.tracker.tracker_reconcile(ops)
+
+    assert list(ops.g_runtime_utxos) == sorted(
+        utxos[0:4], key=lambda x: x[1], reverse=frag
+    )
+    assert ops.g_tx_chain_depths == {}
+    assert ops.g_runtime_selection == {}
+    assert ops.g_tracker_dropped == []
+    assert ops.g_tracker_dropped_count == 2
+
+    # Nothing is released twice
+    lib.tracker.tracker_reconcile(ops)
+    assert len(ops.g_runtime_utxos) == 4
+    assert ops.g_tracker_dropped_count == 2
+
+
+def test_tracker_summary(
+    ops: lib.objects.OpsState, caplog: pytest.LogCaptureFixture
+) -> None:
+    caplog.set_level(logging.INFO)
+    lib.tracker.tracker_summary(ops)
+    assert [record.getMessage() for record in caplog.records] == [
+        "Total transactions confirmed:".ljust(36) + "0",
+        "Total transactions dropped:".ljust(36) + "0".ljust(16) + "(0 resubmitted)",
+    ]
+
+    caplog.clear()
+    setattr(ops, "g_tracker_latencies", [float(x) for x in range(1, 101)])
+    setattr(ops, "g_tracker_dropped_count", 2)
+    setattr(ops, "g_tracker_resubmits", 1)
+    lib.tracker.tracker_summary(ops)
+    assert [record.getMessage() for record in caplog.records] == [
+        "Total transactions confirmed:".ljust(36) + "100",
+        "Total transactions dropped:".ljust(36) + "2".ljust(16) + "(1 resubmitted)",
+        "Confirmation latency p50/p90/p99:".ljust(36)
+        + " / ".join(
+            [lib.utility.time_delta_to_str(x, ms=False) for x in [50.5, 90.1, 99.01]]
+        )
+        + "  (hh:mm:ss)",
+    ]
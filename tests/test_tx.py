@@ -0,0 +1,332 @@
+from typing import List, Tuple
+import binascii
+import hashlib
+import json
+import lib.objects
+import lib.tx
+import lib.utility
+import logging
+import pathlib
+import pytest
+import shutil
+import subprocess
+import tests.test_crypto
+
+
+# Body bytes are checked against an independent CBOR encoder and, where
+# cardano-cli is installed, against `cardano-cli transaction build-raw`
+cbor2 = pytest.importorskip("cbor2")
+
+ADDRESSES = [vector[4] for vector in tests.test_crypto.VECTORS]
+
+# (input count, output count, fee, ttl) spanning the CBOR uint and array widths
+CASES = [
+    (1, 1, 0, 0),
+    (2, 3, 170000, 23),
+    (23, 1, 255, 24),
+    (24, 2, 65535, 65536),
+    (70, 24, 4294967295, 4294967296),
+]
+
+
+def case_tx_ins(count: int) -> List[str]:
+    """ Returns unsorted tx inputs whose indexes span the CBOR uint widths """
+
+    return [
+        f"{hashlib.blake2b(bytes([i]), digest_size=32).hexdigest()}#{(i * 97) % 300}"
+        for i in range(count)
+    ]
+
+
+def case_tx_outs(count: int) -> List[Tuple[str, int]]:
+    """ Returns tx outputs whose lovelace amounts span the CBOR uint widths """
+
+    return [
+        (ADDRESSES[i % len(ADDRESSES)], [1, 24, 1000000, 4294967296][i % 4] + i)
+        for i in range(count)
+    ]
+
+
+def cbor2_tx_body(
+    tx_ins: List[str], tx_outs: List[Tuple[str, int]], fee: int, ttl: int
+) -> bytes:
+    """ Encodes a Mary era ada only tx body with cbor2 """
+
+    inputs = sorted(
+        [
+            [bytes.fromhex(tx_in.split("#")[0]), int(tx_in.split("#")[1])]
+            for tx_in in tx_ins
+        ]
+    )
+    outputs = [
+        [binascii.unhexlify(lib.utility.base58_decode(address)), lovelace]
+        for address, lovelace in tx_outs
+    ]
+
+    return cbor2.dumps({0: inputs, 1: outputs, 2: fee, 3: ttl})
+
+
+@pytest.mark.parametrize("case", CASES)
+def test_tx_body_build(case: Tuple[int, int, int, int]) -> None:
+    tx_ins, tx_outs = case_tx_ins(case[0]), case_tx_outs(case[1])
+    tx_body = lib.tx.tx_body_build(tx_ins, tx_outs, case[2], case[3])
+
+    assert tx_body == cbor2_tx_body(tx_ins, tx_outs, case[2], case[3])
+
+
+@pytest.mark.parametrize("case", CASES)
+def test_tx_body_size(case: Tuple[int, int, int, int]) -> None:
+    tx_ins, tx_outs = case_tx_ins(case[0]), case_tx_outs(case[1])
+
+    assert lib.tx.tx_body_size(tx_ins, tx_outs, case[2], case[3]) == len(
+        cbor2_tx_body(tx_ins, tx_outs, case[2], case[3])
+    )
+
+
+def test_tx_body_envelope() -> None:
+    tx_body = lib.tx.tx_body_build(case_tx_ins(2), case_tx_outs(1), 170000, 23)
+    envelope = json.loads(lib.tx.tx_body_envelope(tx_body))
+
+    assert envelope["type"] == "TxBodyMary"
+    assert cbor2.loads(bytes.fromhex(envelope["cborHex"])) == [
+        cbor2.loads(tx_body),
+        [],
+        None,
+    ]
+
+
+@pytest.mark.skipif(shutil.which("cardano-cli") is None, reason="needs cardano-cli")
+@pytest.mark.parametrize("case", CASES)
+def test_tx_body_build_cardano_cli(
+    case: Tuple[int, int, int, int], tmp_path: pathlib.Path
+) -> None:
+    tx_ins, tx_outs = case_tx_ins(case[0]), case_tx_outs(case[1])
+    tx_body_file = str(tmp_path / "tx.body")
+    subprocess.run(
+        ["cardano-cli", "transaction", "build-raw"]
+        + [arg for tx_in in tx_ins for arg in ["--tx-in", tx_in]]
+        + [arg for out in tx_outs for arg in ["--tx-out", f"{out[0]}+{out[1]}"]]
+        + ["--fee", str(case[2]), "--ttl", str(case[3]), "--out-file", tx_body_file],
+        check=True,
+    )
+    with open(tx_body_file) as f:
+        envelope_cli = json.load(f)
+    envelope = json.loads(
+        lib.tx.tx_body_envelope(lib.tx.tx_body_build(tx_ins, tx_outs, case[2], case[3]))
+    )
+
+    assert (envelope["type"], envelope["cborHex"]) == (
+        envelope_cli["type"],
+        envelope_cli["cborHex"],
+    )
+
+
+# Mary era fee parameters of the public testnet
+PROTOCOL_PARAMS = {
+    "txFeePerByte": 44,
+    "minUTxOValue": 1000000,
+    "decentralisationParam": 0,
+    "maxTxSize": 16384,
+    "poolDeposit": 500000000,
+    "maxBlockHeaderSize": 1100,
+    "maxBlockBodySize": 65536,
+    "keyDeposit": 2000000,
+    "protocolVersion": {"major": 4, "minor": 0},
+    "eMax": 18,
+    "extraEntropy": {"tag": "NeutralNonce"},
+    "minPoolCost": 340000000,
+    "monetaryExpansion": 0.003,
+    "nOpt": 500,
+    "poolPledgeInfluence": 0.3,
+    "treasuryCut": 0.2,
+    "txFeeFixed": 155381,
+}
+PARAMS = {
+    "min_fee_a": PROTOCOL_PARAMS["txFeePerByte"],
+    "min_fee_b": PROTOCOL_PARAMS["txFeeFixed"],
+    "max_tx_size": PROTOCOL_PARAMS["maxTxSize"],
+}
+
+
+@pytest.fixture
+def ops() -> lib.objects.OpsState:
+    return lib.objects.OpsState(logging.getLogger("test_tx"))
+
+
+def case_signed_tx(
+    tx_ins: List[str],
+    tx_outs: List[Tuple[str, int]],
+    fee: int,
+    change: int,
+    witness_count: int,
+) -> bytes:
+    """ Builds and signs a tx paying change to the first vector address """
+
+    tx_body = lib.tx.tx_body_build(
+        tx_ins, tx_outs + [(ADDRESSES[0], change)], fee, 4294967296
+    )
+    witnesses = [
+        lib.tx.tx_bootstrap_witness(
+            tests.test_crypto.vector_signing_key(vector[0], vector[1]),
+            vector[4],
+            lib.tx.tx_body_hash(tx_body),
+        )
+        for vector in tests.test_crypto.VECTORS[0:witness_count]
+    ]
+
+    return lib.tx.tx_signed_build(tx_body, witnesses)
+
+
+@pytest.mark.parametrize("witness_count", [0, 1, 2, 4])
+def test_tx_witness_set_size(witness_count: int) -> None:
+    tx_signed = case_signed_tx(case_tx_ins(1), [], 0, 0, witness_count)
+    tx_body = cbor2.dumps(cbor2.loads(tx_signed)[0])
+
+    assert tx_signed[1 : 1 + len(tx_body)] == tx_body
+    assert lib.tx.tx_witness_set_size(ADDRESSES[0:witness_count]) == (
+        len(tx_signed) - len(tx_body) - 2
+    )
+
+
+@pytest.mark.parametrize("case", CASES)
+@pytest.mark.parametrize("witness_count", [1, 4])
+def test_tx_fee_calc(
+    ops: lib.objects.OpsState, case: Tuple[int, int, int, int], witness_count: int
+) -> None:
+    tx_ins, tx_outs = case_tx_ins(case[0]), case_tx_outs(case[1])
+    input_sum = sum([lovelace for address, lovelace in tx_outs]) + 5000000000
+    fee, change, size = lib.tx.tx_fee_calc(
+        ops,
+        tx_ins,
+        tx_outs,
+        input_sum,
+        ADDRESSES[0],
+        ADDRESSES[0:witness_count],
+        4294967296,
+        PARAMS,
+    )
+    tx_signed = case_signed_tx(tx_ins, tx_outs, fee, change, witness_count)
+
+    # The fee is the minimum that covers the signed tx it is serialized into
+    assert size == len(tx_signed)
+    assert fee == PARAMS["min_fee_a"] * len(tx_signed) + PARAMS["min_fee_b"]
+    assert change == input_sum - sum([lovelace for address, lovelace in tx_outs]) - fee
+
+
+def test_tx_fee_calc_change_width(ops: lib.objects.OpsState) -> None:
+    tx_ins, tx_outs = case_tx_ins(1), case_tx_outs(1)
+    output_sum = sum([lovelace for address, lovelace in tx_outs])
+
+    # Change amounts around each CBOR uint width boundary, where deducting the
+    # fee can shrink the change encoding while the fee settles
+    for boundary in [24, 256, 65536, 4294967296]:
+        fee_base = lib.tx.tx_fee_calc(
+            ops,
+            tx_ins,
+            tx_outs,
+            output_sum + 10 ** 6 + boundary,
+            ADDRESSES[0],
+            ADDRESSES[0:1],
+            4294967296,
+            PARAMS,
+        )[0]
+        for offset in range(-min(boundary // 2, 400), 400):
+            input_sum = output_sum + fee_base + boundary + offset
+            fee, change, size = lib.tx.tx_fee_calc(
+                ops,
+                tx_ins,
+                tx_outs,
+                input_sum,
+                ADDRESSES[0],
+                ADDRESSES[0:1],
+                4294967296,
+                PARAMS,
+            )
+            tx_signed = case_signed_tx(tx_ins, tx_outs, fee, change, 1)
+            fee_min = PARAMS["min_fee_a"] * len(tx_signed) + PARAMS["min_fee_b"]
+
+            # A shrinking change width can leave the settled fee a few bytes over
+            assert size == len(tx_signed)
+            assert fee_min <= fee <= fee_min + PARAMS["min_fee_a"] * 8
+            assert change == input_sum - output_sum - fee
+
+
+def test_tx_fee_calc_insufficient_inputs(ops: lib.objects.OpsState) -> None:
+    with pytest.raises(SystemExit):
+        lib.tx.tx_fee_calc(
+            ops,
+            case_tx_ins(1),
+            case_tx_outs(1),
+            case_tx_outs(1)[0][1] + 1000,
+            ADDRESSES[0],
+            ADDRESSES[0:1],
+            0,
+            PARAMS,
+        )
+
+
+def test_tx_fee_calc_max_tx_size(ops: lib.objects.OpsState) -> None:
+    with pytest.raises(SystemExit):
+        lib.tx.tx_fee_calc(
+            ops,
+            case_tx_ins(70),
+            case_tx_outs(200),
+            10 ** 15,
+            ADDRESSES[0],
+            ADDRESSES,
+            0,
+            PARAMS,
+        )
+
+
+@pytest.mark.skipif(shutil.which("cardano-cli") is None, reason="needs cardano-cli")
+@pytest.mark.parametrize("case", CASES)
+def test_tx_fee_calc_cardano_cli(
+    ops: lib.objects.OpsState, case: Tuple[int, int, int, int], tmp_path: pathlib.Path
+) -> None:
+    tx_ins, tx_outs = case_tx_ins(case[0]), case_tx_outs(case[1])
+    tx_body = lib.tx.tx_body_build(tx_ins, tx_outs, case[2], case[3])
+    tx_body_file = tmp_path / "tx.body"
+    tx_body_file.write_text(lib.tx.tx_body_envelope(tx_body))
+    params_file = tmp_path / "params.json"
+    params_file.write_text(json.dumps(PROTOCOL_PARAMS))
+
+    def cli_min_fee(byron_witness_count: int) -> int:
+        result = subprocess.run(
+            ["cardano-cli", "transaction", "calculate-min-fee"]
+            + ["--tx-body-file", str(tx_body_file)]
+            + ["--testnet-magic", str(tests.test_crypto.TESTNET_MAGIC)]
+            + ["--protocol-params-file", str(params_file)]
+            + ["--tx-in-count", str(len(tx_ins)), "--tx-out-count", str(len(tx_outs))]
+            + ["--witness-count", "0"]
+            + ["--byron-witness-count", str(byron_witness_count)],
+            check=True,
+            stdout=subprocess.PIPE,
+            universal_newlines=True,
+        )
+        assert "Lovelace" in result.stdout
+
+        return int(result.stdout.split()[0])
+
+    # Without witnesses the cli sizes the tx exactly as [body, {}, null]
+    assert (
+        cli_min_fee(0)
+        == PARAMS["min_fee_a"]
+        * (lib.tx.tx_body_size(tx_ins, tx_outs, case[2], case[3]) + 3)
+        + PARAMS["min_fee_b"]
+    )
+
+    # With Byron witnesses the cli estimate uses dummy witnesses without
+    # derivation path attributes, so it never exceeds the exact native fee
+    for witness_count in [1, 4]:
+        fee, change, size = lib.tx.tx_fee_calc(
+            ops,
+            tx_ins,
+            tx_outs[:-1],
+            sum([lovelace for address, lovelace in tx_outs]) + 10 ** 10,
+            tx_outs[-1][0],
+            ADDRESSES[0:witness_count],
+            case[3],
+            PARAMS,
+        )
+        assert cli_min_fee(witness_count) <= fee
@@ -0,0 +1,61 @@
+from typing import Iterator
+import lib.objects
+import lib.utility
+import logging
+import pytest
+import shutil
+
+
+@pytest.fixture
+def ops() -> Iterator[lib.objects.OpsState]:
+    ops = lib.objects.OpsState(logging.getLogger("test_utility"))
+    setattr(ops, "g_bash_path", shutil.which("bash"))
+    yield ops
+
+    lib.utility.shell_pool_stop(ops)
+
+
+@pytest.mark.parametrize(
+    "cmd, stdout, returncode, stderr",
+    [
+        ("printf 'a\\n\\n'", "a\n\n", 0, ""),
+        ("printf 'a\\n\\n'; echo e >&2; exit 3", "a\n\n", 3, "e\n"),
+        ("echo x; (exit 4)", "x\n", 4, ""),
+        ("bash -c 'cat <(printf héllo) > >(cat -)'", "héllo", 0, ""),
+    ],
+)
+def test_shell_pool_cmd(
+    ops: lib.objects.OpsState, cmd: str, stdout: str, returncode: int, stderr: str
+) -> None:
+    result = lib.utility.shell_pool_cmd(ops, cmd)
+
+    assert (result.stdout, result.returncode, result.stderr) == (
+        stdout,
+        returncode,
+        stderr,
+    )
+
+
+def test_shell_pool_cmd_reuse(ops: lib.objects.OpsState) -> None:
+    lib.utility.shell_pool_cmd(ops, "cd /; x=1; exit 1")
+    result = lib.utility.shell_pool_cmd(ops, "echo ${x:-unset}")
+
+    assert result.stdout == "unset\n"
+    assert ops.g_shell_pool.qsize() == 1
+
+
+def test_shell_pool_cmd_large_stderr(ops: lib.objects.OpsState) -> None:
+    # More stderr than a pipe buffer holds must not block the command
+    result = lib.utility.shell_pool_cmd(
+        ops, "head -c 300000 /dev/zero >&2; head -c 200000 /dev/zero"
+    )
+
+    assert (len(result.stdout), len(result.stderr)) == (200000, 300000)
+
+
+def test_shell_pool_cmd_worker_exit(ops: lib.objects.OpsState) -> None:
+    # A coprocess killed mid-command fails the command instead of blocking forever
+    with pytest.raises(EOFError):
+        lib.utility.shell_pool_cmd(ops, "echo a; kill -9 $$")
+
+    assert lib.utility.shell_pool_cmd(ops, "echo b").stdout == "b\n"
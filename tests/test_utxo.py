@@ -0,0 +1,135 @@
+from typing import List, Optional, Tuple
+import hashlib
+import lib.objects
+import lib.utxo
+import logging
+import pytest
+import random
+
+
+@pytest.fixture
+def ops() -> lib.objects.OpsState:
+    return lib.objects.OpsState(logging.getLogger("test_utxo"))
+
+
+def random_utxos(rng: random.Random, count: int) -> List[Tuple[str, int, str]]:
+    """ Returns utxos in ascending lovelace order with many duplicate amounts """
+
+    amounts = sorted(
+        [rng.choice([1, 2, 3, 1000000, 1000000, 2500000, rng.randint(1, 10 ** 7)])]
+        for _ in range(count)
+    )
+
+    return [
+        (
+            f"{hashlib.blake2b(bytes([i % 256, i // 256]), digest_size=32).hexdigest()}#{i % 3}",
+            amount[0],
+            f"82d818{i % 5:02x}",
+        )
+        for i, amount in enumerate(amounts)
+    ]
+
+
+def linear_select(
+    utxos: List[Tuple[str, int, str]], required_min: int, max_count: int
+) -> Optional[Tuple[List[int], str]]:
+    """ Selects max strategy input positions with the linear scans that predate the prefix sums """
+
+    utxo_element_list: List[int] = []
+    algorithm = "simple"
+    max_allowed = max_count if len(utxos) >= max_count else len(utxos)
+    utxo_amounts = [amount for utxo, amount, address in utxos]
+
+    if sum(utxo_amounts[0:max_allowed]) > required_min:
+        utxo_element_list = list(range(0, max_allowed))
+    else:
+        utxo_window_sum = sum(utxo_amounts[0 : max_allowed - 1])
+        for utxo_position in range(max_allowed, len(utxo_amounts)):
+            if utxo_window_sum + utxo_amounts[utxo_position] > required_min:
+                utxo_element_list = list(range(0, max_allowed - 1)) + [utxo_position]
+                algorithm = "sliding utxo"
+                break
+        if utxo_element_list == []:
+            for offset in range(0, len(utxo_amounts) - (max_allowed - 1)):
+                if sum(utxo_amounts[offset : max_allowed + offset]) > required_min:
+                    utxo_element_list = list(range(offset, max_allowed + offset))
+                    algorithm = "sliding window"
+                    break
+
+    if len(utxo_element_list) != max_allowed or max_allowed == 0:
+        return None
+
+    return utxo_element_list, algorithm
+
+
+@pytest.mark.parametrize("seed", range(40))
+def test_generate_tx_inputs_max_differential(
+    ops: lib.objects.OpsState, seed: int
+) -> None:
+    rng = random.Random(seed)
+    remaining = random_utxos(rng, rng.randint(0, 300))
+    max_count = rng.randint(1, 80)
+    lib.utxo.selection_reset(ops)
+
+    # Select and consume Txs until the set is exhausted, checking each selection and
+    # each insufficient funds exit against the linear scans on the remaining utxos
+    for _ in range(400):
+        total = sum([amount for utxo, amount, address in remaining])
+        min_total = rng.choice(
+            [
+                0,
+                rng.randint(0, 3 * 10 ** 6),
+                rng.randint(0, max(total, 1)),
+                total,
+                total + 1,
+            ]
+        )
+        required_min = min_total + ops.TX_FEE_LOVELACE_TOLERANCE
+        expected = linear_select(remaining, required_min, max_count)
+        if expected is None:
+            with pytest.raises(SystemExit):
+                lib.utxo.generate_tx_inputs(ops, remaining, min_total, max_count, "max")
+            if not remaining:
+                break
+            continue
+
+        inputs, addresses, selected, algorithm = lib.utxo.generate_tx_inputs(
+            ops, remaining, min_total, max_count, "max"
+        )
+
+        assert (selected, algorithm) == (
+            [remaining[position] for position in expected[0]],
+            expected[1],
+        )
+        assert inputs["sum"] == sum([amount for utxo, amount, address in selected])
+
+        lib.utxo.selection_consume(ops, selected)
+        remaining = [utxo for utxo in remaining if utxo not in selected]
+
+    assert not remaining or ops.g_runtime_selection["count"] == len(remaining)
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_selection_sum_position(ops: lib.objects.OpsState, seed: int) -> None:
+    rng = random.Random(seed)
+    utxos = random_utxos(rng, rng.randint(1, 200))
+    state = lib.utxo.selection_build(ops, utxos)
+    consumed = rng.sample(utxos, rng.randint(0, len(utxos)))
+    lib.utxo.selection_consume(ops, consumed)
+    remaining = [utxo for utxo in utxos if utxo not in consumed]
+
+    assert state["count"] == len(remaining)
+    for rank in range(len(remaining) + 1):
+        assert lib.utxo.selection_sum(state, rank) == sum(
+            [amount for utxo, amount, address in remaining[0:rank]]
+        )
+    for rank, utxo in enumerate(remaining):
+        assert state["store"].row(lib.utxo.selection_position(state, rank)) == utxo
+
+
+def test_selection_consume_unknown(ops: lib.objects.OpsState) -> None:
+    utxos = random_utxos(random.Random(0), 10)
+    lib.utxo.selection_build(ops, utxos[1:])
+    lib.utxo.selection_consume(ops, utxos[0:2])
+
+    assert ops.g_runtime_selection == {}